@@ -0,0 +1,63 @@
+"""
+Synthetic ground-truth and cluster assignments for benchmarking pairwise metrics.
+
+Each case pairs a class-size distribution with a kind of cluster assignment: uniform or Zipf (heavy-tailed) class
+sizes, many singletons, DBSCAN-style noise (-1), and string labels.
+"""
+import numpy as np
+
+
+def class_sizes_labels(n_samples, n_classes, skew, rng):
+    """
+    :param skew:    'uniform' class sizes, or 'zipf' (a few huge classes and a long tail of small ones).
+    :return: ground-truth label [ Nx1 ] (int64)
+    """
+    if skew == 'uniform':
+        return rng.randint(0, n_classes, size=n_samples).astype(np.int64)
+    if skew == 'zipf':
+        return (rng.zipf(1.3, size=n_samples) - 1) % n_classes
+    raise ValueError("Unknown skew '{}' (expected 'uniform' or 'zipf')".format(skew))
+
+
+def make_labels(n_samples, n_classes=None, skew='uniform', error_rate=0.1, singletons=0.0, noise=0.0,
+                label_type='int', random_state=0):
+    """
+    Ground-truth and a cluster assignment agreeing with it but for a fraction of samples.
+    :param n_samples:   Number of samples N.
+    :param n_classes:   Number of classes (default sqrt(N)).
+    :param skew:        Distribution of class sizes ('uniform' or 'zipf').
+    :param error_rate:  Fraction of samples assigned a random cluster.
+    :param singletons:  Fraction of samples assigned a cluster of their own.
+    :param noise:       Fraction of samples labeled -1 (i.e., DBSCAN noise, one cluster in pairwise terms).
+    :param label_type:  'int' IDs, or 'str' labels (object arrays, e.g., names).
+    :param random_state: Seed.
+    :return: true_ids [ Nx1 ], cluster_ids [ Nx1 ]
+    """
+    rng = np.random.RandomState(random_state)
+    n_classes = n_classes or max(1, int(np.sqrt(n_samples)))
+    true_ids = class_sizes_labels(n_samples, n_classes, skew, rng)
+    cluster_ids = true_ids.copy()
+
+    draw = rng.random_sample(n_samples)
+    wrong = draw < error_rate
+    cluster_ids[wrong] = rng.randint(0, n_classes, size=int(wrong.sum()))
+    alone = (draw >= error_rate) & (draw < error_rate + singletons)
+    cluster_ids[alone] = n_classes + np.arange(int(alone.sum()))
+    cluster_ids[(draw >= error_rate + singletons) & (draw < error_rate + singletons + noise)] = -1
+
+    if label_type == 'str':
+        return (np.array(['class-{}'.format(i) for i in true_ids.tolist()], dtype=object),
+                np.array(['cluster-{}'.format(i) for i in cluster_ids.tolist()], dtype=object))
+    if label_type != 'int':
+        raise ValueError("Unknown label type '{}' (expected 'int' or 'str')".format(label_type))
+    return true_ids, cluster_ids
+
+
+# benchmark cases: name -> keyword arguments of make_labels
+CASES = {
+    'uniform': dict(skew='uniform'),
+    'zipf': dict(skew='zipf'),
+    'singletons': dict(skew='uniform', singletons=0.5),
+    'noise': dict(skew='zipf', noise=0.3),
+    'strings': dict(skew='uniform', label_type='str'),
+}
@@ -0,0 +1,145 @@
+"""
+Time and memory-profile pairwise metrics across N, class skew, and label types, and compare against a baseline.
+
+Usage (from the root of the repo):
+    python -m benchmarks.run_benchmarks --save benchmarks/baseline.json
+    python -m benchmarks.run_benchmarks --compare benchmarks/baseline.json
+    python -m benchmarks.run_benchmarks --sizes 1e3 1e8 --cases zipf --targets confusion_matrix_values
+
+Each target is timed (best of --repeat runs) and its peak memory traced (tracemalloc, in a separate run so tracing
+does not inflate times). Comparing flags every (case, N, target) slower than the baseline by more than --tolerance,
+and exits with status 1 if any (status 2 if there is no baseline to compare against).
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+import numpy as np
+from pairwise.metrics import Metrics
+from pairwise.sweep import sweep
+from benchmarks.generators import CASES, make_labels
+
+METRICS = ('precision', 'recall', 'accuracy', 'specificity', 'f1score', 'fbeta_score', 'jaccard', 'fowlkes_mallows',
+           'adjusted_rand_index')
+BATCH_SIZE = 8
+
+
+def quantize(X, width):
+    # stand-in clustering for the sweep: bins of a 1-D feature
+    return np.floor(X[:, 0] / width).astype(np.int64)
+
+
+def make_targets(true_ids, cluster_ids):
+    """
+    :return: {name: callable} of every benchmarked entry point, on the given labels (dictionary)
+    """
+    mm = Metrics(cache_size=0)
+    targets = {'confusion_matrix_values': lambda: mm.confusion_matrix_values(true_ids, cluster_ids),
+               'all_metrics': lambda: mm.all_metrics(true_ids, cluster_ids)}
+    for name in METRICS:
+        targets[name] = (lambda method: lambda: method(true_ids, cluster_ids))(getattr(mm, name))
+
+    rng = np.random.RandomState(0)
+    batch = [np.where(rng.random_sample(len(cluster_ids)) < 0.01, cluster_ids[0], cluster_ids)
+             for _ in range(BATCH_SIZE)]
+    targets['evaluate_batch'] = lambda: mm.evaluate_batch(true_ids, batch)
+
+    # features whose bins recover the classes more or less well depending on the width
+    codes = np.unique(true_ids, return_inverse=True)[1]
+    X = (codes + rng.random_sample(len(codes)) * 0.5)[:, None]
+    targets['sweep'] = lambda: sweep(X, true_ids, np.linspace(0.5, 4.0, BATCH_SIZE), cluster_fn=quantize, n_jobs=1)
+    return targets
+
+
+def measure(target, repeat):
+    seconds = min(_timed(target) for _ in range(repeat))
+    tracemalloc.start()
+    try:
+        target()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return seconds, peak
+
+
+def _timed(target):
+    start = time.perf_counter()
+    target()
+    return time.perf_counter() - start
+
+
+def run(sizes, cases, targets=None, repeat=3, log=print):
+    """
+    :return: list of {case, n_samples, target, seconds, peak_bytes}
+    """
+    results = []
+    for case in cases:
+        for n_samples in sizes:
+            true_ids, cluster_ids = make_labels(n_samples, **CASES[case])
+            for name, target in make_targets(true_ids, cluster_ids).items():
+                if targets and name not in targets:
+                    continue
+                seconds, peak = measure(target, repeat)
+                results.append(dict(case=case, n_samples=n_samples, target=name, seconds=seconds, peak_bytes=peak))
+                log("{:<12} N={:<11} {:<24} {:10.4f}s {:10.1f}MB".format(case, n_samples, name, seconds, peak / 2 ** 20))
+    return results
+
+
+def environment():
+    return dict(python=platform.python_version(), numpy=np.__version__, machine=platform.machine(),
+                processor=platform.processor())
+
+
+def compare(results, baseline, tolerance=0.25):
+    """
+    :return: list of (result, baseline result, ratio of times) of results slower than the baseline beyond tolerance
+    """
+    reference = {(row['case'], row['n_samples'], row['target']): row for row in baseline['results']}
+    regressions = []
+    for row in results:
+        base = reference.get((row['case'], row['n_samples'], row['target']))
+        if base is None or not base['seconds']:
+            continue
+        ratio = row['seconds'] / base['seconds']
+        if ratio > 1 + tolerance:
+            regressions.append((row, base, ratio))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[1])
+    parser.add_argument('--sizes', nargs='+', type=float, default=[1e3, 1e4, 1e5, 1e6],
+                        help='numbers of samples N (up to 1e8, memory permitting)')
+    parser.add_argument('--cases', nargs='+', choices=sorted(CASES), default=sorted(CASES))
+    parser.add_argument('--targets', nargs='+', help='only benchmark these entry points')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--save', help='write results to this JSON file (e.g., as the baseline)')
+    parser.add_argument('--compare', help='baseline JSON file to compare results against')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='relative slowdown allowed by --compare')
+    args = parser.parse_args(argv)
+    if args.compare and not os.path.isfile(args.compare):
+        parser.error("no baseline at '{}', record one first with --save (i.e., make bench-baseline)".format(
+            args.compare))
+
+    results = run([int(n) for n in args.sizes], args.cases, targets=args.targets, repeat=args.repeat)
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(dict(environment=environment(), results=results), f, indent=1)
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if baseline.get('environment') != environment():
+            print("[WARNING] baseline was recorded on {}".format(baseline.get('environment')))
+        regressions = compare(results, baseline, args.tolerance)
+        for row, base, ratio in regressions:
+            print("[REGRESSION] {case} N={n_samples} {target}: ".format(**row) +
+                  "{:.4f}s vs {:.4f}s ({:.2f}x)".format(row['seconds'], base['seconds'], ratio))
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,155 @@
+import math
+import time
+import numpy as np
+from pairwise.contingency import count_pairs, pairs, stats_from_totals
+from pairwise.encoding import factorize
+from pairwise.report import PairwiseReport
+
+
+# Approximate pairwise confusion stats by sampling pairs, trading accuracy for latency on very large N.
+#
+# Totals of pairs sharing a cluster (P = TP + FP) and sharing a class (Q = TP + FN) only need group sizes. What is
+# costly is how the two overlap, which is estimated by stratified sampling: pairs drawn uniformly among those sharing a
+# cluster estimate p = TP / P (i.e., precision), and pairs drawn uniformly among those sharing a class estimate
+# r = TP / Q (i.e., recall). Drawing within groups covers positives however rare they are among all N^2 pairs. Both
+# strata hence estimate TP (as pP and rQ), which are combined by inverse variance into a single estimate with a normal
+# interval; precision, recall, and their bounds all follow from it (i.e., TP / P and TP / Q), such that every estimate
+# lies within its own bounds. Group sizes may themselves come from a uniform subsample of rows (max_samples), in which
+# case P and Q are scaled up.
+
+
+class ApproximateReport(PairwiseReport):
+    """
+    PairwiseReport of estimated confusion stats, with confidence bounds.
+    """
+
+    def __init__(self, stats, intervals, n_sampled, confidence):
+        """
+        :param stats:       Estimated confusion stats {TP, FP, TN, FN} (dictionary)
+        :param intervals:   Bounds (low, high) of TP, precision, and recall (dictionary)
+        :param n_sampled:   Number of pairs drawn.
+        :param confidence:  Coverage of the bounds.
+        """
+        super().__init__(stats)
+        self.intervals = intervals
+        self.n_sampled = n_sampled
+        self.confidence = confidence
+
+    def __repr__(self):
+        return "ApproximateReport(precision={:.4f} {}, recall={:.4f} {}, {} pairs sampled)".format(
+            self.precision, self.intervals['precision'], self.recall, self.intervals['recall'], self.n_sampled)
+
+
+def normal_quantile(q):
+    """
+    Quantile of the standard normal distribution (by bisection of math.erf).
+    """
+    low, high = -40.0, 40.0
+    for _ in range(100):
+        middle = (low + high) / 2
+        if (1 + math.erf(middle / math.sqrt(2))) / 2 < q:
+            low = middle
+        else:
+            high = middle
+    return (low + high) / 2
+
+
+class _PairSampler:
+    # draws pairs uniformly among all pairs of samples sharing a group
+
+    def __init__(self, group_codes, n_groups, rng):
+        self.rng = rng
+        sizes = np.bincount(group_codes, minlength=n_groups)
+        self.order = np.argsort(group_codes, kind='stable')
+        self.starts = np.r_[0, np.cumsum(sizes)[:-1]]
+        self.sizes = sizes
+        weights = pairs(sizes).astype(np.float64)
+        self.total = weights.sum()
+        self.cumulative = np.cumsum(weights) / self.total if self.total else None
+
+    def draw(self, n):
+        groups = np.minimum(np.searchsorted(self.cumulative, self.rng.random_sample(n), side='right'),
+                            len(self.sizes) - 1)
+        sizes = self.sizes[groups]
+        first = (self.rng.random_sample(n) * sizes).astype(np.int64)
+        second = (self.rng.random_sample(n) * (sizes - 1)).astype(np.int64)
+        second += second >= first  # distinct members
+        return self.order[self.starts[groups] + first], self.order[self.starts[groups] + second]
+
+
+def approximate_confusion(true_ids, cluster_ids, n_pairs=100000, time_budget=None, max_samples=None,
+                          confidence=0.95, batch_size=10000, random_state=None):
+    """
+    Estimate pairwise confusion stats by stratified sampling of pairs.
+    :param true_ids:        Ground-truth label [ Nx1 ] (e.g., np.memmap).
+    :param cluster_ids:     Cluster assignment [ Nx1 ].
+    :param n_pairs:         Budget of pairs to draw (split between both strata).
+    :param time_budget:     Alternatively (or also), seconds to keep drawing pairs for (at least one of n_pairs and
+                            time_budget must be set).
+    :param max_samples:     Estimate group sizes from a uniform subsample of this many rows (default all rows). Bounds
+                            then only account for the sampling of pairs, not of rows.
+    :param confidence:      Coverage of the bounds.
+    :param batch_size:      Pairs drawn per stratum at a time.
+    :param random_state:    Seed (or np.random.RandomState).
+    :return: ApproximateReport
+    """
+    if n_pairs is None and time_budget is None:
+        raise ValueError("Expected a budget of pairs (n_pairs) or of seconds (time_budget)")
+    rng = random_state if isinstance(random_state, np.random.RandomState) else np.random.RandomState(random_state)
+    # arrays (e.g., np.memmap) are indexed as they are, such that only the subsampled rows are read
+    true_ids = true_ids if isinstance(true_ids, np.ndarray) else np.asarray(true_ids)
+    cluster_ids = cluster_ids if isinstance(cluster_ids, np.ndarray) else np.asarray(cluster_ids)
+    n_samples = len(true_ids)
+    if len(cluster_ids) != n_samples:
+        raise ValueError("Label vectors differ in length: {} and {}".format(n_samples, len(cluster_ids)))
+    rows = slice(None)
+    if max_samples is not None and max_samples < n_samples:
+        rows = np.sort(rng.choice(n_samples, size=max_samples, replace=False))
+    true_codes, classes = factorize(np.asarray(true_ids[rows]))
+    cluster_codes, clusters = factorize(np.asarray(cluster_ids[rows]))
+
+    # totals of pairs sharing a cluster (P) and a class (Q), scaled from the subsample to all N samples
+    scale = count_pairs([n_samples]) / max(count_pairs([len(true_codes)]), 1)
+    npositive = count_pairs(np.bincount(cluster_codes, minlength=len(clusters))) * scale
+    nsame = count_pairs(np.bincount(true_codes, minlength=len(classes))) * scale
+
+    by_cluster = _PairSampler(cluster_codes, len(clusters), rng)
+    by_class = _PairSampler(true_codes, len(classes), rng)
+    hits = {'precision': 0, 'recall': 0}
+    trials = {'precision': 0, 'recall': 0}
+    deadline = time.perf_counter() + time_budget if time_budget is not None else None
+    while True:
+        remaining = n_pairs - trials['precision'] - trials['recall'] if n_pairs is not None else batch_size * 2
+        if remaining <= 0 or (deadline is not None and time.perf_counter() > deadline):
+            break
+        for key, sampler, same in (('precision', by_cluster, true_codes), ('recall', by_class, cluster_codes)):
+            n = min(batch_size, (remaining + 1) // 2)
+            if not sampler.total or not n:
+                continue
+            first, second = sampler.draw(n)
+            hits[key] += int(np.count_nonzero(same[first] == same[second]))
+            trials[key] += n
+        if not by_cluster.total and not by_class.total:
+            break
+
+    # TP is estimated from both strata, combined by inverse variance
+    estimates, variances = [], []
+    for total, key in ((npositive, 'precision'), (nsame, 'recall')):
+        n = trials[key]
+        if n:
+            rate = hits[key] / n
+            estimates.append(total * rate)
+            variances.append(total * total * max(rate * (1 - rate), 1.0 / n) / n)
+    tp, spread = 0.0, 0.0
+    if estimates:
+        weights = 1 / np.asarray(variances)
+        tp = float(np.dot(weights, estimates) / weights.sum())
+        spread = normal_quantile(0.5 + confidence / 2) * math.sqrt(1 / weights.sum())
+    upper = min(npositive, nsame)
+    tp = min(tp, upper)
+    intervals = {'TP': (max(0.0, tp - spread), min(upper, tp + spread))}
+    intervals['precision'] = tuple(bound / npositive if npositive else 0.0 for bound in intervals['TP'])
+    intervals['recall'] = tuple(bound / nsame if nsame else 0.0 for bound in intervals['TP'])
+
+    stats = stats_from_totals(tp, npositive, nsame, count_pairs([n_samples]))
+    return ApproximateReport(stats, intervals, trials['precision'] + trials['recall'], confidence)
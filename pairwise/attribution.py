@@ -0,0 +1,92 @@
+import numpy as np
+from pairwise.contingency import build_contingency, pairs
+from pairwise.encoding import factorize
+
+
+# Attribute pairwise errors to the clusters and classes causing them, from the same contingency as the global stats.
+#
+# Per cluster i: TP_i = sum_j C(n_ij, 2) and FP_i = C(a_i, 2) - TP_i, i.e., the global TP and FP are sums over
+# clusters. Likewise, per class j: TP_j = sum_i C(n_ij, 2) and FN_j = C(b_j, 2) - TP_j. All are sums over the non-empty
+# cells, hence array operations in O(cells) whatever the number of clusters.
+
+
+def _sum_by(index, values, length):
+    sums = np.zeros(length, dtype=np.int64)
+    np.add.at(sums, index, values)
+    return sums
+
+
+def _top(values, labels, k):
+    k = min(k, len(values))
+    if k <= 0:
+        return labels[:0], values[:0]
+    top = np.argpartition(-values, k - 1)[:k]
+    top = top[np.argsort(-values[top], kind='stable')]
+    return labels[top], values[top]
+
+
+class ErrorBreakdown:
+    """
+    Per-cluster TP/FP and per-class TP/FN of a cluster assignment.
+    """
+
+    def __init__(self, contingency, clusters, classes):
+        """
+        :param contingency: Contingency (or SparseContingency) of encoded labels.
+        :param clusters:    Cluster ID of each row of the contingency [ Kx1 ].
+        :param classes:     Class label of each column of the contingency [ Cx1 ].
+        """
+        self.clusters = np.asarray(clusters)
+        self.classes = np.asarray(classes)
+        self.cluster_sizes = contingency.cluster_sizes
+        self.class_sizes = contingency.class_sizes
+
+        rows, cols, counts = contingency.cells()
+        cell_tp = pairs(counts)
+        self.cluster_tp = _sum_by(rows, cell_tp, contingency.n_clusters)
+        self.cluster_fp = pairs(self.cluster_sizes) - self.cluster_tp
+        self.class_tp = _sum_by(cols, cell_tp, contingency.n_classes)
+        self.class_fn = pairs(self.class_sizes) - self.class_tp
+        # number of classes mixed in each cluster, and of clusters each class is split across
+        self.cluster_classes = np.bincount(rows, minlength=contingency.n_clusters)
+        self.class_clusters = np.bincount(cols, minlength=contingency.n_classes)
+
+    def __repr__(self):
+        return "ErrorBreakdown({} clusters, {} classes)".format(len(self.clusters), len(self.classes))
+
+    def worst_clusters(self, k=10):
+        """
+        Clusters contributing the most false positives (i.e., merging the most pairs of different classes).
+        :param k:   Number of clusters.
+        :return: cluster IDs [ kx1 ], their FP [ kx1 ]
+        """
+        return _top(self.cluster_fp, self.clusters, k)
+
+    def worst_classes(self, k=10):
+        """
+        Classes contributing the most false negatives (i.e., split into the most pairs across clusters).
+        :param k:   Number of classes.
+        :return: class labels [ kx1 ], their FN [ kx1 ]
+        """
+        return _top(self.class_fn, self.classes, k)
+
+    def most_split_classes(self, k=10):
+        """
+        Classes spread across the most clusters.
+        :return: class labels [ kx1 ], number of clusters of each [ kx1 ]
+        """
+        return _top(self.class_clusters, self.classes, k)
+
+
+def error_breakdown(true_ids, cluster_ids, sparse=None):
+    """
+    Attribute FP to clusters and FN to classes.
+    :param true_ids:    Ground-truth label [ Nx1 ].
+    :param cluster_ids: Cluster assignment [ Nx1 ].
+    :param sparse:      Force the sparse (True) or dense (False) contingency.
+    :return: ErrorBreakdown
+    """
+    true_codes, classes = factorize(true_ids)
+    cluster_codes, clusters = factorize(cluster_ids)
+    contingency = build_contingency(true_codes, cluster_codes, len(classes), len(clusters), sparse=sparse)
+    return ErrorBreakdown(contingency, clusters, classes)
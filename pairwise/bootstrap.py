@@ -0,0 +1,114 @@
+import numpy as np
+from pairwise.contingency import build_contingency, count_pairs, pairs, stats_from_totals
+from pairwise.encoding import factorize
+from pairwise.report import PairwiseReport
+
+
+# Bootstrap confidence intervals of pairwise metrics, resampling contingency counts rather than label vectors.
+#
+# Resampling N samples with replacement only changes how many samples fall in each (cluster, class) cell, i.e., the
+# cell counts of a replicate are multinomial with probabilities n_ij / N. Resampling whole classes instead repeats each
+# class column m_j times (m multinomial over the C classes), each copy counting as a distinct class, without pairing
+# copies with one another. Either way, a replicate is a reweighting of the non-empty cells, and the stats of all
+# replicates are array operations over a (replicates x cells) matrix, costing O(B x cells) rather than B evaluations
+# over N samples.
+
+
+def _group_sums(matrix, index, length):
+    # sums of the columns of matrix [ B x cells ] sharing an index, for every row at once
+    order = np.argsort(index, kind='stable')
+    index = index[order]
+    starts = np.flatnonzero(np.r_[True, index[1:] != index[:-1]]) if len(index) else np.zeros(0, dtype=np.int64)
+    sums = np.zeros((matrix.shape[0], length), dtype=np.int64)
+    if len(starts):
+        sums[:, index[starts]] = np.add.reduceat(matrix[:, order], starts, axis=1)
+    return sums
+
+
+def _replicate_stats(rows, cols, counts, n_clusters, n_classes, n_replicates, level, rng):
+    if level == 'sample':
+        n_samples = int(counts.sum())
+        cells = rng.multinomial(n_samples, counts / n_samples, size=n_replicates)
+        tp = pairs(cells).sum(axis=1)
+        npositive = pairs(_group_sums(cells, rows, n_clusters)).sum(axis=1)
+        nsame = pairs(_group_sums(cells, cols, n_classes)).sum(axis=1)
+        npairs = np.full(n_replicates, count_pairs([n_samples]), dtype=np.int64)
+    elif level == 'class':
+        multiplicity = rng.multinomial(n_classes, np.full(n_classes, 1.0 / n_classes), size=n_replicates)
+        class_sizes = np.zeros(n_classes, dtype=np.int64)
+        np.add.at(class_sizes, cols, counts)
+        # each copy of a class is a class of its own, and pairs across copies of a class (i.e., of duplicated
+        # samples) are left out: a cell contributes n_ij^2 such pairs per pair of copies
+        copies = pairs(multiplicity)
+        tp = multiplicity[:, cols] @ pairs(counts)
+        cluster_sizes = _group_sums(multiplicity[:, cols] * counts, rows, n_clusters)
+        npositive = pairs(cluster_sizes).sum(axis=1) - copies[:, cols] @ (counts * counts)
+        nsame = multiplicity @ pairs(class_sizes)
+        npairs = pairs(multiplicity @ class_sizes) - copies @ (class_sizes * class_sizes)
+    else:
+        raise ValueError("Unknown level '{}' (expected 'sample' or 'class')".format(level))
+
+    return stats_from_totals(tp, npositive, nsame, npairs)
+
+
+class BootstrapResult:
+    """
+    Metrics of the original assignment along with those of each bootstrap replicate.
+    """
+
+    def __init__(self, estimate, replicates):
+        """
+        :param estimate:    PairwiseReport of the original labels.
+        :param replicates:  PairwiseReport whose stats are arrays over replicates [ Bx1 ].
+        """
+        self.estimate = estimate
+        self.replicates = replicates
+
+    def __repr__(self):
+        return "BootstrapResult({} replicates)".format(len(self.replicates.tp))
+
+    def interval(self, metric, confidence=0.95):
+        """
+        Percentile confidence interval of a metric.
+        :param metric:      Name of a metric of PairwiseReport (e.g., 'precision').
+        :param confidence:  Coverage of the interval.
+        :return: (low, high)
+        """
+        alpha = (1 - confidence) / 2
+        low, high = np.nanquantile(getattr(self.replicates, metric), [alpha, 1 - alpha])
+        return low, high
+
+    def standard_error(self, metric):
+        return float(np.nanstd(getattr(self.replicates, metric), ddof=1))
+
+    def summary(self, confidence=0.95):
+        """
+        :return: {metric: (estimate, low, high)} for every metric (dictionary)
+        """
+        return {metric: (getattr(self.estimate, metric),) + self.interval(metric, confidence)
+                for metric in self.estimate.metric_names}
+
+
+def bootstrap(true_ids, cluster_ids, n_replicates=1000, level='sample', random_state=None, batch_cells=1 << 24):
+    """
+    Bootstrap the pairwise metrics of a cluster assignment.
+    :param true_ids:        Ground-truth label [ Nx1 ].
+    :param cluster_ids:     Cluster assignment [ Nx1 ].
+    :param n_replicates:    Number of replicates B.
+    :param level:           Resample 'sample's (with replacement), or whole 'class'es (e.g., identities).
+    :param random_state:    Seed (or np.random.RandomState).
+    :param batch_cells:     Maximum size of the (replicates x cells) matrix held at once.
+    :return: BootstrapResult
+    """
+    rng = random_state if isinstance(random_state, np.random.RandomState) else np.random.RandomState(random_state)
+    true_codes, classes = factorize(true_ids)
+    cluster_codes, clusters = factorize(cluster_ids)
+    contingency = build_contingency(true_codes, cluster_codes, len(classes), len(clusters))
+    rows, cols, counts = (np.asarray(column, dtype=np.int64) for column in contingency.cells())
+
+    batch = max(1, batch_cells // max(len(counts), 1))
+    parts = [_replicate_stats(rows, cols, counts, len(clusters), len(classes), min(batch, n_replicates - start),
+                              level, rng)
+             for start in range(0, n_replicates, batch)]
+    stats = {key: np.concatenate([part[key] for part in parts]) for key in ('TP', 'FP', 'FN', 'TN')}
+    return BootstrapResult(PairwiseReport(contingency.pair_stats()), PairwiseReport(stats))
@@ -0,0 +1,103 @@
+"""
+Evaluate cluster assignments against ground-truth from the command line, e.g.,
+
+    pairwise-eval truth.parquet predictions.npy --truth-column identity -o report.json
+    pairwise-eval truth.csv run-*.csv --key path --truth-column label --pred-column cluster --jobs 4
+
+Files (.npy, .csv, .parquet, .arrow/.feather) are read in chunks. Rows are matched by position, or by a key column
+(--key) when predictions are not in the order of the ground-truth. Several prediction files are evaluated in parallel,
+one per process. The report (confusion stats and every pairwise metric of each file) is written as JSON.
+"""
+import argparse
+import json
+import math
+import sys
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='pairwise-eval', description=__doc__.strip().split('\n')[0],
+                                     epilog=__doc__.split('\n\n', 1)[1].strip(),
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('truth', help='ground-truth labels file')
+    parser.add_argument('predictions', nargs='+', help='cluster assignment file(s)')
+    parser.add_argument('-o', '--output', help='JSON report path (default stdout)')
+    parser.add_argument('--truth-column', help='label column of the ground-truth file')
+    parser.add_argument('--pred-column', help='cluster column of the prediction files')
+    parser.add_argument('--key', help='key column joining rows of both sides (sets --truth-key and --pred-key)')
+    parser.add_argument('--truth-key', help='key column of the ground-truth file')
+    parser.add_argument('--pred-key', help='key column of the prediction files')
+    parser.add_argument('--chunk-size', type=int, default=1 << 22, help='rows read at a time (default %(default)s)')
+    parser.add_argument('--beta', type=float, default=1.0, help='beta of the F-beta score (default %(default)s)')
+    parser.add_argument('-j', '--jobs', type=int, default=None,
+                        help='processes evaluating prediction files (default the number of CPUs)')
+    return parser
+
+
+def _jsonable(value):
+    # NumPy scalars to Python numbers, NaN (i.e., undefined metric) to null
+    value = value.item() if hasattr(value, 'item') else value
+    if isinstance(value, float) and math.isnan(value):
+        return None
+    return value
+
+
+def evaluate_file(truth, predictions, truth_column=None, pred_column=None, truth_key=None, pred_key=None,
+                  chunk_size=1 << 22, beta=1.0):
+    """
+    Report of a single prediction file (see the command-line options for the arguments).
+    :return: dictionary, ready to be serialized as JSON
+    """
+    from pairwise.io import evaluate_files, evaluate_joined
+    from pairwise.report import PairwiseReport
+
+    result = {'predictions': predictions}
+    if truth_key is not None or pred_key is not None:
+        if truth_key is None or pred_key is None:
+            raise ValueError("Joining by key requires the key column of both sides")
+        report, join = evaluate_joined(truth, predictions, truth_key, pred_key, true_column=truth_column,
+                                       pred_column=pred_column, chunk_size=chunk_size)
+        result['join'] = join
+    else:
+        report = evaluate_files(truth, predictions, chunk_size=chunk_size, true_column=truth_column,
+                                pred_column=pred_column)
+    report = PairwiseReport(report.stats, beta=beta)
+    result['metrics'] = {name: _jsonable(value) for name, value in report.to_dict().items()}
+    return result
+
+
+def _evaluate(kwargs):
+    return evaluate_file(**kwargs)
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    truth_key = args.truth_key or args.key
+    pred_key = args.pred_key or args.key
+    tasks = [dict(truth=args.truth, predictions=predictions, truth_column=args.truth_column,
+                  pred_column=args.pred_column, truth_key=truth_key, pred_key=pred_key, chunk_size=args.chunk_size,
+                  beta=args.beta)
+             for predictions in args.predictions]
+
+    try:
+        if len(tasks) == 1 or args.jobs == 1:
+            results = [_evaluate(task) for task in tasks]
+        else:
+            # imported here, so that single-file runs do not pay for process pools
+            from concurrent.futures import ProcessPoolExecutor
+            with ProcessPoolExecutor(max_workers=args.jobs) as executor:
+                results = list(executor.map(_evaluate, tasks))
+    except (OSError, ValueError, ImportError) as error:
+        print('pairwise-eval: error: {}'.format(error), file=sys.stderr)
+        return 1
+
+    output = json.dumps({'truth': args.truth, 'beta': args.beta, 'results': results}, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+    else:
+        print(output)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,358 @@
+import numpy as np
+from pairwise.dependencies import import_optional
+from pairwise.encoding import factorize
+
+
+# Cluster x class contingency counts, i.e., the single table all pairwise confusion stats are derived from.
+#
+# Let n_ij be the number of samples of class j assigned to cluster i, a_i = sum_j n_ij the size of cluster i, and
+# b_j = sum_i n_ij the size of class j. Counting pairs then reduces to,
+#
+#   TP = sum_ij C(n_ij, 2)              pairs of the same class in the same cluster
+#   FP = sum_i C(a_i, 2) - TP           pairs in the same cluster, but of different classes
+#   FN = sum_j C(b_j, 2) - TP           pairs of the same class, but in different clusters
+#   TN = C(N, 2) - TP - FP - FN         everything else
+#
+# where C(n, 2) = n(n-1)/2. Hence, a single O(N) pass to build the table replaces looping over clusters.
+#
+# With sample weights, a pair counts as w_i w_j, and C(n, 2) over a bin generalizes to (W^2 - S) / 2, where W and S are
+# the sums of the weights and of the squared weights in the bin (i.e., n and n for unit weights).
+
+
+# n(n-1)/2 of any count below this bound (and the sum over counts totalling less) fits in int64
+SAFE_PAIR_COUNT = 1 << 32
+
+
+def pairs(counts):
+    """
+    Number of pairs within each bin, i.e., n choose 2 element-wise, in exact integer arithmetic. Counts of at least
+    SAFE_PAIR_COUNT fall back to Python integers (object array), which never overflow.
+    :param counts:  Scalar or array of counts (negative counts have no pairs, as n choose 2 is 0 for n < 2).
+    :return: n(n-1)/2 for each count (int64 array, object array, or int)
+    """
+    counts = np.asarray(counts)
+    if counts.size and counts.max() >= SAFE_PAIR_COUNT:
+        result = np.array([n * (n - 1) // 2 if n > 1 else 0 for n in counts.ravel().tolist()],
+                          dtype=object).reshape(counts.shape)
+    else:
+        # n(n-1) < 2^64 for n < 2^32, hence the product is exact in unsigned arithmetic before halving; counts below 1
+        # are raised to 1 (no pairs either), such that n - 1 never wraps around
+        unsigned = np.maximum(counts, 1).astype(np.uint64)
+        result = (unsigned * (unsigned - np.uint64(1)) // np.uint64(2)).astype(np.int64)
+    return result.item() if result.ndim == 0 else result
+
+
+def count_pairs(counts):
+    """
+    Sum of n choose 2 over an array of counts (i.e., the number of pairs that can be formed within each bin).
+    :param counts:  Array of counts (negative counts have no pairs, see pairs).
+    :return:        Total number of pairs (int)
+    """
+    counts = np.asarray(counts)
+    if not counts.size:
+        return 0
+    if counts.sum(dtype=np.uint64) < SAFE_PAIR_COUNT:
+        return int(pairs(counts).sum())
+    return sum(n * (n - 1) // 2 for n in counts.ravel().tolist() if n > 1)
+
+
+def stats_from_totals(tp, npositive, nsame, npairs):
+    """
+    Confusion stats from pair totals (scalars or arrays alike).
+    :param tp:          Number of pairs sharing both a cluster and a class.
+    :param npositive:   Number of pairs sharing a cluster.
+    :param nsame:       Number of pairs sharing a class.
+    :param npairs:      Number of pairs overall.
+    :return: Confusion stats {TP, FP, TN, FN} (dictionary)
+    """
+    stats = {}
+    stats['TP'] = tp
+    stats['FP'] = npositive - tp
+    stats['FN'] = nsame - tp
+    stats['TN'] = npairs - npositive - stats['FN']
+    return stats
+
+
+def fits_dense(n_clusters, n_classes, n_samples):
+    """
+    Whether a dense K x C table is small relative to the number of samples (i.e., worth a bincount over its cells).
+    """
+    return n_clusters * n_classes <= 4 * n_samples + 1024
+
+
+def cell_counts(true_codes, cluster_codes, n_classes, n_clusters):
+    """
+    Number of samples in each non-empty (cluster, class) cell. Counted with a bincount when the dense table is small
+    relative to N, otherwise by sorting the flattened cell indices (i.e., memory never exceeds O(N)).
+    :param true_codes:      Ground-truth labels encoded as 0, .., C-1 [ Nx1 ].
+    :param cluster_codes:   Cluster assignments encoded as 0, .., K-1 [ Nx1 ].
+    :param n_classes:       Number of classes C.
+    :param n_clusters:      Number of clusters K.
+    :return: Counts of non-empty cells (order unspecified)
+    """
+    cells = np.asarray(cluster_codes, dtype=np.int64) * n_classes + true_codes
+    if fits_dense(n_clusters, n_classes, len(cells)):
+        counts = np.bincount(cells, minlength=n_clusters * n_classes)
+        return counts[counts > 0]
+    return np.unique(cells, return_counts=True)[1]
+
+
+def weighted_pairs(weight_sums, square_sums):
+    """
+    Sum of w_i w_j over the pairs within each bin, i.e., (W^2 - S) / 2 with W the sum and S the sum of squares of the
+    weights of the bin (exact for integer weights while W^2 < 2^53).
+    :param weight_sums: Sum of the weights in each bin.
+    :param square_sums: Sum of the squared weights in each bin.
+    :return: Weighted number of pairs of each bin (float)
+    """
+    weight_sums = np.asarray(weight_sums, dtype=np.float64)
+    return (weight_sums * weight_sums - square_sums) / 2
+
+
+def weighted_pair_stats(true_codes, cluster_codes, n_classes, n_clusters, sample_weight):
+    """
+    Confusion stats where a pair counts as the product of the weights of its samples. Every stat is a sum of weighted
+    pairs over bins (cells, clusters, classes, or all samples), hence follows from weighted bincounts in O(N).
+    :param true_codes:      Ground-truth labels encoded as 0, .., C-1 [ Nx1 ].
+    :param cluster_codes:   Cluster assignments encoded as 0, .., K-1 [ Nx1 ].
+    :param n_classes:       Number of classes C.
+    :param n_clusters:      Number of clusters K.
+    :param sample_weight:   Non-negative weight of each sample [ Nx1 ].
+    :return: Confusion stats {TP, FP, TN, FN} (dictionary of floats)
+    """
+    if np.shape(true_codes) != np.shape(cluster_codes):
+        raise ValueError("Label vectors differ in shape: {} and {}".format(np.shape(true_codes),
+                                                                         np.shape(cluster_codes)))
+    weights = np.asarray(sample_weight, dtype=np.float64)
+    if weights.shape != np.shape(true_codes):
+        raise ValueError("Expected a weight per sample, got shape {} for {} samples".format(weights.shape,
+                                                                                         len(true_codes)))
+    if not np.all(np.isfinite(weights)) or np.any(weights < 0):
+        raise ValueError("Sample weights must be finite and non-negative")
+    squares = weights * weights
+
+    cells = np.asarray(cluster_codes, dtype=np.int64) * n_classes + true_codes
+    if not fits_dense(n_clusters, n_classes, len(cells)):
+        cells = np.unique(cells, return_inverse=True)[1].ravel()
+    tp = weighted_pairs(np.bincount(cells, weights), np.bincount(cells, squares)).sum()
+    npositive = weighted_pairs(np.bincount(cluster_codes, weights, minlength=n_clusters),
+                               np.bincount(cluster_codes, squares, minlength=n_clusters)).sum()
+    nsame = weighted_pairs(np.bincount(true_codes, weights, minlength=n_classes),
+                           np.bincount(true_codes, squares, minlength=n_classes)).sum()
+    npairs = weighted_pairs(weights.sum(), squares.sum())
+
+    return stats_from_totals(float(tp), float(npositive), float(nsame), float(npairs))
+
+
+def pair_stats_batch(true_codes, n_classes, cluster_ids_batch):
+    """
+    Confusion stats of many cluster assignments of the same samples. Everything that depends on the ground-truth only
+    (i.e., the number of classes and the pairs sharing a class) is computed once.
+    :param true_codes:          Ground-truth labels encoded as 0, .., C-1 [ Nx1 ].
+    :param n_classes:           Number of classes C.
+    :param cluster_ids_batch:   2D array [ BxN ] or iterable of B cluster assignments [ Nx1 ].
+    :return: Confusion stats {TP, FP, TN, FN}, each an array [ Bx1 ] (dictionary)
+    """
+    true_codes = np.asarray(true_codes, dtype=np.int64)
+    n_samples = len(true_codes)
+    nsame = count_pairs(np.bincount(true_codes, minlength=n_classes))
+    npairs = count_pairs([n_samples])
+
+    tp, npositive = [], []
+    for cluster_ids in cluster_ids_batch:
+        if np.shape(cluster_ids) != true_codes.shape:
+            raise ValueError("Label vectors differ in shape: {} and {}".format(true_codes.shape,
+                                                                             np.shape(cluster_ids)))
+        cluster_codes, clusters = factorize(cluster_ids)
+        tp.append(count_pairs(cell_counts(true_codes, cluster_codes, n_classes, len(clusters))))
+        npositive.append(count_pairs(np.bincount(cluster_codes, minlength=len(clusters))))
+
+    tp = np.array(tp, dtype=np.int64)
+    npositive = np.array(npositive, dtype=np.int64)
+    return stats_from_totals(tp, npositive, nsame, npairs)
+
+
+class Contingency:
+    """
+    Cluster x class count table, along with its marginals (i.e., cluster and class sizes).
+    """
+
+    def __init__(self, table):
+        """
+        :param table:   Counts [ K x C ], where K is the number of clusters and C the number of classes.
+        """
+        self.table = np.asarray(table)
+        self.cluster_sizes = self.table.sum(axis=1)
+        self.class_sizes = self.table.sum(axis=0)
+        self.n_samples = int(self.cluster_sizes.sum())
+
+    def __repr__(self):
+        return "Contingency({} samples, {} clusters, {} classes)".format(self.n_samples, self.n_clusters,
+                                                                         self.n_classes)
+
+    @classmethod
+    def from_codes(cls, true_codes, cluster_codes, n_classes=None, n_clusters=None):
+        """
+        Build table in a single pass over encoded labels.
+        :param true_codes:      Ground-truth labels encoded as 0, .., C-1 [ Nx1 ].
+        :param cluster_codes:   Cluster assignments encoded as 0, .., K-1 [ Nx1 ].
+        :param n_classes:       Number of classes C (inferred from true_codes if not set).
+        :param n_clusters:      Number of clusters K (inferred from cluster_codes if not set).
+        :return: Contingency
+        """
+        true_codes = np.asarray(true_codes, dtype=np.int64)
+        cluster_codes = np.asarray(cluster_codes, dtype=np.int64)
+        if true_codes.shape != cluster_codes.shape:
+            raise ValueError("Label vectors differ in shape: {} and {}".format(true_codes.shape,
+                                                                             cluster_codes.shape))
+        if n_classes is None:
+            n_classes = int(true_codes.max()) + 1 if true_codes.size else 0
+        if n_clusters is None:
+            n_clusters = int(cluster_codes.max()) + 1 if cluster_codes.size else 0
+
+        # flatten (cluster, class) into one index and count all cells at once
+        table = np.bincount(cluster_codes * n_classes + true_codes, minlength=n_clusters * n_classes)
+        return cls(table.reshape(n_clusters, n_classes))
+
+    def cells(self):
+        """
+        Non-empty cells of the table.
+        :return: Cluster index, class index, and count of each cell (tuple of arrays)
+        """
+        rows, cols = np.nonzero(self.table)
+        return rows, cols, self.table[rows, cols]
+
+    def toarray(self):
+        return self.table
+
+    @property
+    def n_clusters(self):
+        return len(self.cluster_sizes)
+
+    @property
+    def n_classes(self):
+        return len(self.class_sizes)
+
+    def _counts(self):
+        return self.table
+
+    def true_positives(self):
+        """Pairs of the same class assigned to the same cluster."""
+        return count_pairs(self._counts())
+
+    def false_positives(self):
+        """Pairs of different classes assigned to the same cluster."""
+        return count_pairs(self.cluster_sizes) - self.true_positives()
+
+    def false_negatives(self):
+        """Pairs of the same class assigned to different clusters."""
+        return count_pairs(self.class_sizes) - self.true_positives()
+
+    def true_negatives(self):
+        """Pairs of different classes assigned to different clusters."""
+        return self.pair_stats()['TN']
+
+    def pair_stats(self):
+        """
+        Calculate TP, FP, TN, and FN from the table and store in dictionary container.
+        :return: Confusion stats {TP, FP, TN, FN} (dictionary)
+        """
+        tp = count_pairs(self._counts())
+        npositive = count_pairs(self.cluster_sizes)  # pairs sharing a cluster
+        nsame = count_pairs(self.class_sizes)  # pairs sharing a class
+        npairs = count_pairs([self.n_samples])  # total number of pairs
+
+        return stats_from_totals(tp, npositive, nsame, npairs)
+
+
+class SparseContingency(Contingency):
+    """
+    Cluster x class counts stored as coordinates of the non-empty cells (COO), i.e., memory proportional to the
+    number of non-empty cells rather than to K x C. Same interface (and stats) as the dense Contingency.
+    """
+
+    def __init__(self, rows, cols, counts, n_clusters=None, n_classes=None):
+        """
+        :param rows:        Cluster index of each non-empty cell.
+        :param cols:        Class index of each non-empty cell.
+        :param counts:      Number of samples in each cell.
+        :param n_clusters:  Number of clusters K (inferred from rows if not set).
+        :param n_classes:   Number of classes C (inferred from cols if not set).
+        """
+        self.rows = np.asarray(rows, dtype=np.int64)
+        self.cols = np.asarray(cols, dtype=np.int64)
+        self.counts = np.asarray(counts, dtype=np.int64)
+        if n_clusters is None:
+            n_clusters = int(self.rows.max()) + 1 if self.rows.size else 0
+        if n_classes is None:
+            n_classes = int(self.cols.max()) + 1 if self.cols.size else 0
+        self.cluster_sizes = self._sum(self.rows, n_clusters)
+        self.class_sizes = self._sum(self.cols, n_classes)
+        self.n_samples = int(self.counts.sum())
+
+    def __repr__(self):
+        return "SparseContingency({} samples, {} clusters, {} classes, {} cells)".format(
+            self.n_samples, self.n_clusters, self.n_classes, len(self.counts))
+
+    def _sum(self, index, length):
+        sums = np.zeros(length, dtype=np.int64)
+        np.add.at(sums, index, self.counts)
+        return sums
+
+    @classmethod
+    def from_codes(cls, true_codes, cluster_codes, n_classes=None, n_clusters=None):
+        """
+        Build table by sorting the flattened (cluster, class) index of each sample.
+        :param true_codes:      Ground-truth labels encoded as 0, .., C-1 [ Nx1 ].
+        :param cluster_codes:   Cluster assignments encoded as 0, .., K-1 [ Nx1 ].
+        :param n_classes:       Number of classes C (inferred from true_codes if not set).
+        :param n_clusters:      Number of clusters K (inferred from cluster_codes if not set).
+        :return: SparseContingency
+        """
+        true_codes = np.asarray(true_codes, dtype=np.int64)
+        cluster_codes = np.asarray(cluster_codes, dtype=np.int64)
+        if true_codes.shape != cluster_codes.shape:
+            raise ValueError("Label vectors differ in shape: {} and {}".format(true_codes.shape,
+                                                                             cluster_codes.shape))
+        if n_classes is None:
+            n_classes = int(true_codes.max()) + 1 if true_codes.size else 0
+        if n_clusters is None:
+            n_clusters = int(cluster_codes.max()) + 1 if cluster_codes.size else 0
+
+        keys, counts = np.unique(cluster_codes * n_classes + true_codes, return_counts=True)
+        return cls(keys // max(n_classes, 1), keys % max(n_classes, 1), counts, n_clusters=n_clusters,
+                   n_classes=n_classes)
+
+    def cells(self):
+        return self.rows, self.cols, self.counts
+
+    def toarray(self):
+        table = np.zeros((self.n_clusters, self.n_classes), dtype=np.int64)
+        table[self.rows, self.cols] = self.counts
+        return table
+
+    def to_scipy(self):
+        """
+        :return: scipy.sparse.csr_matrix [ K x C ]
+        """
+        sparse = import_optional('scipy.sparse')
+        return sparse.csr_matrix((self.counts, (self.rows, self.cols)), shape=(self.n_clusters, self.n_classes))
+
+    def _counts(self):
+        return self.counts
+
+
+def build_contingency(true_codes, cluster_codes, n_classes, n_clusters, sparse=None):
+    """
+    Contingency of encoded labels, dense when the K x C table is small relative to N, sparse otherwise.
+    :param true_codes:      Ground-truth labels encoded as 0, .., C-1 [ Nx1 ].
+    :param cluster_codes:   Cluster assignments encoded as 0, .., K-1 [ Nx1 ].
+    :param n_classes:       Number of classes C.
+    :param n_clusters:      Number of clusters K.
+    :param sparse:          Force the sparse (True) or dense (False) representation.
+    :return: Contingency or SparseContingency
+    """
+    if sparse is None:
+        sparse = not fits_dense(n_clusters, n_classes, len(true_codes))
+    backend = SparseContingency if sparse else Contingency
+    return backend.from_codes(true_codes, cluster_codes, n_classes=n_classes, n_clusters=n_clusters)
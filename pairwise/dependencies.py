@@ -0,0 +1,27 @@
+import importlib
+
+
+# Dependencies beyond NumPy are optional, and imported only by the functions needing them (i.e., never at module
+# load). This keeps `import pairwise` cheap for worker processes and short-lived jobs.
+
+# pip package providing each optional module
+PACKAGES = {
+    'sklearn': 'scikit-learn',
+    'scipy': 'scipy',
+    'pyarrow': 'pyarrow',
+    'pandas': 'pandas',
+}
+
+
+def import_optional(name):
+    """
+    Import an optional dependency on first use.
+    :param name:    Module name (e.g., 'sklearn.cluster').
+    :return: module
+    """
+    try:
+        return importlib.import_module(name)
+    except ImportError as error:
+        package = PACKAGES.get(name.split('.')[0], name.split('.')[0])
+        raise ImportError("'{}' is required for this feature, install it with: pip install {}".format(
+            name, package)) from error
@@ -0,0 +1,78 @@
+import numpy as np
+
+
+# Factorize label vectors, i.e., map arbitrary labels (ints, strings, object IDs) to codes 0, .., M-1, where M is the
+# number of unique labels.
+#
+# Integer labels spanning a range comparable to N (e.g., cluster IDs of DBSCAN, noise as -1, or labels that are already
+# encoded) are mapped through a lookup table built with a bincount, i.e., O(N) without sorting. Object labels are
+# hashed. Anything else (strings, sparse integer IDs, floats) falls back to sorting via np.unique. Codes are stored in
+# the smallest unsigned integer type that fits M.
+
+
+def code_dtype(n_unique):
+    """
+    Smallest unsigned integer type able to represent codes 0, .., n_unique-1.
+    """
+    return np.min_scalar_type(max(n_unique - 1, 0))
+
+
+def _factorize_range(labels, low, span):
+    offset = labels.astype(np.intp, copy=False)
+    if low:
+        offset = offset - low
+    present = np.bincount(offset, minlength=span) > 0
+    if present.all():
+        # already dense (e.g., encoded labels or 0, .., K-1 cluster IDs): shift at most
+        return offset.astype(code_dtype(span), copy=False), np.arange(low, low + span).astype(labels.dtype)
+    uniques = np.flatnonzero(present) + low
+    lut = (np.cumsum(present) - 1).astype(code_dtype(len(uniques)))
+    return lut[offset], uniques.astype(labels.dtype)
+
+
+def _factorize_hash(labels):
+    table = {}
+    codes = np.fromiter((table.setdefault(label, len(table)) for label in labels), dtype=np.int64,
+                        count=len(labels))
+    uniques = np.empty(len(table), dtype=object)
+    uniques[:] = list(table)
+    return codes.astype(code_dtype(len(uniques))), uniques
+
+
+def factorize(labels):
+    """
+    Encode labels as 0, .., M-1, where M is the number of unique labels. Uniques are in sorted order, except for object
+    labels, which are in order of first appearance.
+    :param labels:  Labels [ Nx1 ].
+    :return: codes [ Nx1 ] (smallest unsigned integer type), unique labels [ Mx1 ]
+    """
+    labels = np.asarray(labels)
+    if labels.ndim != 1:
+        labels = labels.ravel()
+    if not len(labels):
+        return np.zeros(0, dtype=np.uint8), labels
+
+    if labels.dtype.kind == 'f' and np.isfinite(labels).all():
+        as_int = labels.astype(np.int64)
+        if np.array_equal(as_int, labels):
+            codes, uniques = factorize(as_int)
+            return codes, uniques.astype(labels.dtype)
+
+    if labels.dtype.kind == 'b':
+        codes, uniques = factorize(labels.view(np.uint8))
+        return codes, uniques.astype(bool)
+
+    if labels.dtype.kind in 'iu':
+        low, high = int(labels.min()), int(labels.max())
+        span = high - low + 1
+        if span <= 2 * len(labels) + (1 << 16) and high <= np.iinfo(np.intp).max:
+            return _factorize_range(labels, low, span)
+    elif labels.dtype.hasobject:
+        try:
+            return _factorize_hash(labels)
+        except TypeError:
+            # unhashable labels (e.g., lists), resort to sorting
+            pass
+
+    uniques, codes = np.unique(labels, return_inverse=True)
+    return codes.ravel().astype(code_dtype(len(uniques))), uniques
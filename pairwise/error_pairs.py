@@ -0,0 +1,93 @@
+import numpy as np
+from itertools import islice
+from pairwise.encoding import factorize
+
+
+# Enumerate the actual sample pairs behind FP and FN (e.g., to inspect image pairs wrongly clustered together).
+#
+# A false positive is a pair within a cluster whose samples differ in class; a false negative is a pair within a class
+# whose samples differ in cluster. Both are pairs within a group (cluster or class, respectively) across different
+# sub-groups (class or cluster). Samples are sorted by group once, then pairs are generated lazily one group at a time,
+# so memory beyond the label vectors is proportional to the largest group and the first pairs come back right away.
+#
+# In order, pairs of a group come sub-group block by sub-group block, i.e., the first pairs all share a sample. Shuffled,
+# members are permuted and pairs enumerated by offset instead: offset d pairs each member with the one d places later,
+# so the first pairs (taken in random order within an offset) are spread over all members and sub-groups, while every
+# pair is still generated exactly once.
+
+
+def _shuffled_pairs(label, members, sub_codes, rng):
+    # pairs (members[k], members[k + d]) of different sub-groups, offset d by offset
+    subs = sub_codes[members]
+    if np.all(subs == subs[0]):
+        return
+    for offset in range(1, len(members)):
+        found = np.flatnonzero(subs[:-offset] != subs[offset:])
+        for k in rng.permutation(found).tolist():
+            i, j = int(members[k]), int(members[k + offset])
+            yield label, min(i, j), max(i, j)
+
+
+def _group_pairs(group_ids, sub_ids, limit=None, per_group=None, shuffle=False, random_state=None):
+    group_codes, groups = factorize(group_ids)
+    sub_codes = factorize(sub_ids)[0]
+    if len(group_codes) != len(sub_codes):
+        raise ValueError("Label vectors differ in length: {} and {}".format(len(sub_codes), len(group_codes)))
+    rng = np.random.RandomState(random_state) if shuffle else None
+
+    order = np.argsort(group_codes, kind='stable')
+    bounds = np.r_[0, np.cumsum(np.bincount(group_codes, minlength=len(groups)))]
+    visit = rng.permutation(len(groups)) if shuffle else range(len(groups))
+
+    def generate():
+        for group in visit:
+            members = order[bounds[group]:bounds[group + 1]]
+            if len(members) < 2:
+                continue
+            label = groups[group]
+            if shuffle:
+                yield from islice(_shuffled_pairs(label, rng.permutation(members), sub_codes, rng), per_group)
+                continue
+            # sort members by sub-group, such that pairs across blocks are exactly the pairs across sub-groups
+            members = members[np.argsort(sub_codes[members], kind='stable')]
+            starts = np.flatnonzero(np.r_[True, np.diff(sub_codes[members].astype(np.int64)) != 0])
+            ends = np.r_[starts[1:], len(members)]
+            if len(starts) < 2:
+                continue
+            pairs = ((label, min(i, j), max(i, j))
+                     for start, end in zip(starts, ends)
+                     for i in members[start:end].tolist()
+                     for j in members[end:].tolist())
+            yield from islice(pairs, per_group)
+
+    return islice(generate(), limit)
+
+
+def iter_false_positives(true_ids, cluster_ids, limit=None, per_group=None, shuffle=False, random_state=None):
+    """
+    Lazily generate false positive pairs (i.e., samples of different classes in the same cluster), cluster by cluster.
+    :param true_ids:        Ground-truth label [ Nx1 ].
+    :param cluster_ids:     Cluster assignment [ Nx1 ].
+    :param limit:           Maximum number of pairs in total.
+    :param per_group:       Maximum number of pairs per cluster.
+    :param shuffle:         Visit clusters in random order, and spread the pairs taken from each (see above).
+    :param random_state:    Seed of the random order.
+    :return: generator of (cluster ID, index i, index j), i < j, e.g., to look up allpaths[i] and allpaths[j]
+    """
+    return _group_pairs(cluster_ids, true_ids, limit=limit, per_group=per_group, shuffle=shuffle,
+                        random_state=random_state)
+
+
+def iter_false_negatives(true_ids, cluster_ids, limit=None, per_group=None, shuffle=False, random_state=None):
+    """
+    Lazily generate false negative pairs (i.e., samples of the same class in different clusters), class by class.
+    :param true_ids:        Ground-truth label [ Nx1 ].
+    :param cluster_ids:     Cluster assignment [ Nx1 ].
+    :param limit:           Maximum number of pairs in total.
+    :param per_group:       Maximum number of pairs per class.
+    :param shuffle:         Visit classes in random order, and spread the pairs taken from each (see above).
+    :param random_state:    Seed of the random order.
+    :return: generator of (class label, index i, index j), i < j
+    """
+    return _group_pairs(true_ids, cluster_ids, limit=limit, per_group=per_group, shuffle=shuffle,
+                        random_state=random_state)
@@ -0,0 +1,110 @@
+import numpy as np
+from pairwise.contingency import stats_from_totals
+from pairwise.encoding import factorize
+from pairwise.hierarchy import MergeTally
+from pairwise.report import SweepResult
+
+
+# Pairwise confusion stats of threshold-graph clustering (i.e., connected components of the graph linking samples
+# closer than t, as single-linkage cut at t) for many thresholds at once.
+#
+# Edges are sorted by distance once. Sweeping thresholds in increasing order, each edge joins two components of a
+# union-find, whose roots carry the class histograms of their components (see hierarchy.MergeTally), so stats at every
+# threshold come from a single pass over the edges rather than re-clustering per threshold.
+
+
+def block_distances(X, metric='euclidean'):
+    """
+    Distance function over blocks of rows, with per-sample terms (norms) computed once.
+    :param X:       Features [ NxD ].
+    :param metric:  'euclidean' or 'cosine'.
+    :return: Callable mapping indices (or slice) of a block [ Bx1 ] to its distances to all samples [ BxN ]
+    """
+    X = np.asarray(X, dtype=np.float64)
+    if metric == 'cosine':
+        normed = X / np.maximum(np.linalg.norm(X, axis=1, keepdims=True), np.finfo(X.dtype).tiny)
+        return lambda rows: 1 - normed[rows] @ normed.T
+    if metric != 'euclidean':
+        raise ValueError("Unknown metric '{}' (expected 'euclidean' or 'cosine')".format(metric))
+    squared = np.einsum('ij,ij->i', X, X)
+    return lambda rows: np.sqrt(np.maximum(squared[rows, None] - 2 * X[rows] @ X.T + squared[None, :], 0))
+
+
+def candidate_edges(X, max_distance, metric='euclidean', block_size=1024):
+    """
+    All pairs (i < j) of samples within a maximum distance, computed in blocks of rows (i.e., O(N x block) memory
+    besides the edges kept).
+    :param X:               Features [ NxD ].
+    :param max_distance:    Largest distance of an edge.
+    :param metric:          'euclidean' or 'cosine'.
+    :param block_size:      Number of rows per block.
+    :return: Endpoints i, j and distance of each edge (tuple of arrays)
+    """
+    distance = block_distances(X, metric=metric)
+    sources, targets, distances = [], [], []
+    for start in range(0, len(X), block_size):
+        block = distance(slice(start, start + block_size))
+        i, j = np.nonzero(block <= max_distance)
+        i += start
+        keep = j > i
+        sources.append(i[keep])
+        targets.append(j[keep])
+        distances.append(block[i[keep] - start, j[keep]])
+    if not sources:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64), np.zeros(0)
+    return np.concatenate(sources), np.concatenate(targets), np.concatenate(distances)
+
+
+def threshold_curve(true_ids, thresholds, X=None, edges=None, metric='euclidean', block_size=1024):
+    """
+    Pairwise confusion stats of the connected components of the graph of edges with distance at most t, for each
+    threshold t. Same stats as Metrics.confusion_matrix_values on each thresholded labeling.
+    :param true_ids:    Ground-truth label [ Nx1 ].
+    :param thresholds:  Distance thresholds [ Tx1 ].
+    :param X:           Features [ NxD ], to consider all pairs of samples as edges.
+    :param edges:       Alternatively, candidate edges as (i, j, distance) arrays (e.g., from a kNN graph).
+    :param metric:      Distance between features, 'euclidean' or 'cosine' (if X is set).
+    :param block_size:  Rows per block when computing distances between features.
+    :return: SweepResult over thresholds (in the order given)
+    """
+    thresholds = np.asarray(thresholds, dtype=np.float64)
+    if (X is None) == (edges is None):
+        raise ValueError("Expected either features (X) or edges")
+    if edges is None:
+        edges = candidate_edges(X, thresholds.max() if thresholds.size else -np.inf, metric=metric,
+                                block_size=block_size)
+    sources, targets, distances = (np.asarray(column) for column in edges)
+
+    true_codes, classes = factorize(true_ids)
+    order = np.argsort(distances, kind='stable')
+    sources, targets, distances = sources[order].tolist(), targets[order].tolist(), distances[order]
+
+    tally = MergeTally(true_codes, len(classes))
+    parent = list(range(len(true_codes)))
+    size = [1] * len(true_codes)
+
+    def find(node):
+        while parent[node] != node:
+            parent[node] = parent[parent[node]]  # path halving
+            node = parent[node]
+        return node
+
+    # number of edges within each threshold, visiting thresholds in increasing order
+    ends = np.searchsorted(distances, thresholds, side='right')
+    tp, npositive = np.zeros(len(thresholds), dtype=np.int64), np.zeros(len(thresholds), dtype=np.int64)
+    edge = 0
+    for t in np.argsort(thresholds, kind='stable'):
+        while edge < ends[t]:
+            a, b = find(sources[edge]), find(targets[edge])
+            if a != b:
+                # union by size, the root kept carries the merged histogram
+                if size[a] < size[b]:
+                    a, b = b, a
+                parent[b] = a
+                size[a] += size[b]
+                tally.merge(a, b, a)
+            edge += 1
+        tp[t], npositive[t] = tally.tp, tally.npositive
+
+    stats = stats_from_totals(tp, npositive, tally.nsame, tally.npairs)
+    return SweepResult(thresholds, stats)
@@ -0,0 +1,130 @@
+import json
+import os
+import numpy as np
+from pairwise.contingency import cell_counts, count_pairs, stats_from_totals
+from pairwise.encoding import factorize
+from pairwise.report import PairwiseReport
+
+
+# Ground-truth encoded once, persisted, and shared by every evaluation against it.
+#
+# All that pairwise stats need of the ground-truth is its encoded labels, the class sizes, and the number of pairs
+# sharing a class. These are computed once and saved as a directory of .npy files (plus metadata in JSON), which many
+# processes open at once with mmap_mode='r', i.e., the codes are read from the page cache shared between processes
+# rather than copied into each. Evaluating a labeling then only encodes the predictions and counts the non-empty
+# (cluster, class) cells.
+
+FORMAT_VERSION = 1
+METADATA = 'index.json'
+
+
+class GroundTruthIndex:
+    """
+    Encoded ground-truth labels with their class sizes and the number of pairs sharing a class.
+    """
+
+    def __init__(self, codes, classes, class_sizes, nsame=None):
+        """
+        :param codes:       Labels encoded as 0, .., C-1 [ Nx1 ] (e.g., np.memmap).
+        :param classes:     Label of each code [ Cx1 ].
+        :param class_sizes: Number of samples of each class [ Cx1 ].
+        :param nsame:       Number of pairs sharing a class (computed from class_sizes if not set).
+        """
+        self.codes = codes
+        self.classes = classes
+        self.class_sizes = class_sizes
+        self.n_samples = len(codes)
+        self.nsame = count_pairs(class_sizes) if nsame is None else nsame
+        self.npairs = count_pairs([self.n_samples])
+
+    def __repr__(self):
+        return "GroundTruthIndex({} samples, {} classes)".format(self.n_samples, self.n_classes)
+
+    def __len__(self):
+        return self.n_samples
+
+    @property
+    def n_classes(self):
+        return len(self.classes)
+
+    @classmethod
+    def from_labels(cls, true_ids):
+        """
+        :param true_ids:    Ground-truth label [ Nx1 ].
+        :return: GroundTruthIndex
+        """
+        codes, classes = factorize(true_ids)
+        return cls(codes, classes, np.bincount(codes, minlength=len(classes)))
+
+    def save(self, path):
+        """
+        Write the index to a directory (created if needed).
+        :param path:    Directory path.
+        """
+        classes = np.asarray(self.classes)
+        if classes.dtype.hasobject:
+            # e.g., strings, stored as a fixed-width array instead
+            if len(set(type(label) for label in classes.tolist())) > 1:
+                raise ValueError("Class labels of mixed types cannot be saved without pickling")
+            classes = np.asarray(classes.tolist())
+            if classes.dtype.hasobject:
+                raise ValueError("Class labels of type {} cannot be saved without pickling".format(
+                    type(classes[0]).__name__))
+        os.makedirs(path, exist_ok=True)
+        np.save(os.path.join(path, 'codes.npy'), np.asarray(self.codes))
+        np.save(os.path.join(path, 'classes.npy'), classes)
+        np.save(os.path.join(path, 'class_sizes.npy'), np.asarray(self.class_sizes, dtype=np.int64))
+        # metadata last, such that readers never see a partially written index
+        with open(os.path.join(path, METADATA), 'w') as f:
+            json.dump({'version': FORMAT_VERSION, 'n_samples': self.n_samples, 'n_classes': self.n_classes,
+                       'nsame': self.nsame}, f)
+
+    @classmethod
+    def load(cls, path, mmap_mode='r'):
+        """
+        Open an index saved by save(), memory-mapped read-only by default (i.e., safe to share between processes).
+        :param path:        Directory path.
+        :param mmap_mode:   Passed on to np.load for the codes (None reads them into memory).
+        :return: GroundTruthIndex
+        """
+        with open(os.path.join(path, METADATA)) as f:
+            metadata = json.load(f)
+        if metadata.get('version') != FORMAT_VERSION:
+            raise ValueError("Unsupported index version {} (expected {})".format(metadata.get('version'),
+                                                                                FORMAT_VERSION))
+        codes = np.load(os.path.join(path, 'codes.npy'), mmap_mode=mmap_mode, allow_pickle=False)
+        classes = np.load(os.path.join(path, 'classes.npy'), allow_pickle=False)
+        class_sizes = np.load(os.path.join(path, 'class_sizes.npy'), allow_pickle=False)
+        if len(codes) != metadata['n_samples'] or len(classes) != metadata['n_classes']:
+            raise ValueError("Index at '{}' does not match its metadata".format(path))
+        return cls(codes, classes, class_sizes, nsame=metadata['nsame'])
+
+    def pair_stats(self, cluster_ids):
+        """
+        Confusion stats of a cluster assignment, encoding only the predictions.
+        :param cluster_ids: Cluster assignment [ Nx1 ], in the order of the ground-truth.
+        :return: Confusion stats {TP, FP, TN, FN} (dictionary)
+        """
+        if len(cluster_ids) != self.n_samples:
+            raise ValueError("Expected {} cluster assignments, got {}".format(self.n_samples, len(cluster_ids)))
+        cluster_codes, clusters = factorize(cluster_ids)
+        tp = count_pairs(cell_counts(self.codes, cluster_codes, self.n_classes, len(clusters)))
+        npositive = count_pairs(np.bincount(cluster_codes, minlength=len(clusters)))
+
+        return stats_from_totals(tp, npositive, self.nsame, self.npairs)
+
+    def evaluate(self, cluster_ids):
+        """
+        :param cluster_ids: Cluster assignment [ Nx1 ].
+        :return: PairwiseReport
+        """
+        return PairwiseReport(self.pair_stats(cluster_ids))
+
+    def evaluate_batch(self, cluster_ids_batch):
+        """
+        :param cluster_ids_batch:   2D array [ BxN ] or iterable of B cluster assignments [ Nx1 ].
+        :return: PairwiseReport whose confusion stats and metrics are arrays [ Bx1 ]
+        """
+        stats = [self.pair_stats(cluster_ids) for cluster_ids in cluster_ids_batch]
+        return PairwiseReport({key: np.array([entry[key] for entry in stats], dtype=np.int64)
+                               for key in ('TP', 'FP', 'FN', 'TN')})
@@ -0,0 +1,110 @@
+import numpy as np
+from pairwise.contingency import count_pairs, stats_from_totals
+from pairwise.encoding import factorize
+from pairwise.report import SweepResult
+
+
+# Pairwise confusion stats at every level of an agglomerative hierarchy, in a single pass over its merges.
+#
+# Merging clusters A and B only creates pairs with one sample in each, i.e., |A||B| new positive pairs, of which
+# sum_c A[c] B[c] share a class (A[c] being the number of samples of class c in A). Hence, with a class histogram per
+# cluster, each merge updates TP and FP by iterating the histogram of the smaller cluster, which is then folded into
+# the larger one. FN and TN follow, as the pairs sharing a class are fixed by the ground-truth.
+
+
+class MergeTally:
+    """
+    Running confusion stats of a clustering that only changes by merging clusters, starting from singletons.
+    """
+
+    def __init__(self, true_codes, n_classes=None):
+        """
+        :param true_codes:  Ground-truth labels encoded as 0, .., C-1 [ Nx1 ].
+        :param n_classes:   Number of classes C (inferred from true_codes if not set).
+        """
+        self.true_codes = np.asarray(true_codes)
+        self.n_samples = len(self.true_codes)
+        self.tp = 0
+        self.npositive = 0  # pairs sharing a cluster
+        self.nsame = count_pairs(np.bincount(self.true_codes, minlength=n_classes or 0))
+        self.npairs = count_pairs([self.n_samples])
+        # class histogram and size of each cluster that is not a singleton (those are implied by their sample)
+        self._histograms = {}
+        self._sizes = {}
+
+    def histogram(self, cluster):
+        if cluster in self._histograms:
+            return self._histograms[cluster]
+        return {int(self.true_codes[cluster]): 1}
+
+    def size(self, cluster):
+        return self._sizes.get(cluster, 1)
+
+    def merge(self, a, b, new):
+        """
+        Merge clusters a and b into cluster new.
+        :param a:   ID of a cluster (IDs below N refer to the singleton of that sample).
+        :param b:   ID of another cluster.
+        :param new: ID of the merged cluster.
+        """
+        small, large = self.histogram(a), self.histogram(b)
+        size_small, size_large = self.size(a), self.size(b)
+        if size_small > size_large:
+            small, large = large, small
+            size_small, size_large = size_large, size_small
+
+        for label, count in small.items():
+            if label in large:
+                self.tp += count * large[label]
+                large[label] += count
+            else:
+                large[label] = count
+        self.npositive += size_small * size_large
+
+        for cluster in (a, b):
+            self._histograms.pop(cluster, None)
+            self._sizes.pop(cluster, None)
+        self._histograms[new] = large
+        self._sizes[new] = size_small + size_large
+
+    def pair_stats(self):
+        """
+        Current confusion stats.
+        :return: Confusion stats {TP, FP, TN, FN} (dictionary)
+        """
+        return stats_from_totals(self.tp, self.npositive, self.nsame, self.npairs)
+
+
+def linkage_curve(linkage, true_ids, thresholds=None):
+    """
+    Pairwise confusion stats of every level of a hierarchy, i.e., of cutting the dendrogram at each merge.
+    :param linkage:     SciPy linkage matrix [ (N-1)x4 ] (e.g., of scipy.cluster.hierarchy.linkage), or list of
+                        (a, b) merges following the same convention (i.e., the i-th merge creates cluster N+i).
+    :param true_ids:    Ground-truth label [ Nx1 ].
+    :param thresholds:  Distances to report stats at, as would fcluster(linkage, t, criterion='distance') for a
+                        monotonic linkage. Defaults to every level, starting with all samples as singletons (at 0).
+    :return: SweepResult over merge distances (or thresholds)
+    """
+    true_codes, classes = factorize(true_ids)
+    n_samples = len(true_codes)
+    merges = np.asarray(linkage, dtype=np.float64)
+    if not merges.size:
+        merges = merges.reshape(0, 2)
+    if len(merges) >= n_samples and n_samples:
+        raise ValueError("{} merges for {} samples".format(len(merges), n_samples))
+    heights = merges[:, 2] if merges.shape[1] > 2 else np.arange(1, len(merges) + 1, dtype=np.float64)
+
+    tally = MergeTally(true_codes, len(classes))
+    tp, npositive = np.zeros(len(merges) + 1, dtype=np.int64), np.zeros(len(merges) + 1, dtype=np.int64)
+    for i, (a, b) in enumerate(merges[:, :2].astype(np.int64).tolist()):
+        tally.merge(a, b, n_samples + i)
+        tp[i + 1], npositive[i + 1] = tally.tp, tally.npositive
+
+    values = np.r_[0.0, heights]
+    if thresholds is not None:
+        # level reached once all merges at or below the threshold are done
+        levels = np.searchsorted(heights, thresholds, side='right')
+        values, tp, npositive = np.asarray(thresholds), tp[levels], npositive[levels]
+
+    stats = stats_from_totals(tp, npositive, tally.nsame, tally.npairs)
+    return SweepResult(values, stats)
@@ -0,0 +1,256 @@
+import csv
+import os
+import numpy as np
+from pairwise.dependencies import import_optional
+from pairwise.streaming import ContingencyAccumulator
+
+
+# Read label vectors in bounded-memory chunks from memory-mapped and columnar sources.
+#
+# A source is an array (including np.memmap, whose slices are only paged in when read), a path to a .npy file (opened
+# with mmap_mode='r'), a CSV file with a header (labels read as strings), a Parquet file (read one record batch of the
+# label column at a time), an Arrow IPC/Feather file (memory-mapped, i.e., batches are zero-copy views), or an
+# in-memory Arrow array/table. Chunks of the ground-truth and of the predictions are re-cut to the same boundaries, then
+# reduced into a ContingencyAccumulator; peak memory is hence a few chunks plus the (cluster, class) cells, whatever the
+# number of rows. Sources with columns yield the rows of several columns together (e.g., keys and labels), such that a
+# file is read once whatever the number of columns needed.
+
+ARROW_SUFFIXES = ('.arrow', '.feather', '.ipc')
+
+
+def _column_name(names, column):
+    if column is None:
+        if len(names) != 1:
+            raise ValueError("Expected a column name among {}".format(names))
+        return names[0]
+    if column not in names:
+        raise ValueError("No column '{}' among {}".format(column, names))
+    return column
+
+
+def _to_numpy(array):
+    # Arrow array to NumPy: zero-copy for primitive types without nulls, decoded for strings and dictionaries
+    if array.null_count:
+        raise ValueError("Labels contain {} null values".format(array.null_count))
+    if hasattr(array, 'dictionary_decode'):
+        array = array.dictionary_decode()
+    return array.to_numpy(zero_copy_only=False)
+
+
+def _single_column(source, column):
+    if column is not None:
+        raise ValueError("Source {} has a single column, no column '{}' to select".format(source, column))
+
+
+def _table_chunks(data, columns, chunk_size):
+    # Arrow table or record batch, sliced into batches of the selected columns (zero-copy)
+    pa = import_optional('pyarrow')
+    names = [_column_name(data.schema.names, column) for column in columns]
+    if isinstance(data, pa.RecordBatch):
+        data = pa.Table.from_batches([data])
+    for batch in data.select(names).to_batches(max_chunksize=chunk_size):
+        yield tuple(_to_numpy(array) for array in batch.columns)
+
+
+def _array_chunks(data, chunk_size):
+    # Arrow array or chunked array
+    pa = import_optional('pyarrow')
+    chunks = data.chunks if isinstance(data, pa.ChunkedArray) else [data]
+    for chunk in chunks:
+        for start in range(0, len(chunk), chunk_size):
+            yield _to_numpy(chunk.slice(start, chunk_size))
+
+
+def _parquet_chunks(path, columns, chunk_size):
+    parquet = import_optional('pyarrow.parquet')
+    reader = parquet.ParquetFile(path)
+    names = [_column_name(reader.schema_arrow.names, column) for column in columns]
+    for batch in reader.iter_batches(batch_size=chunk_size, columns=names):
+        yield tuple(_to_numpy(batch.column(name)) for name in names)
+
+
+def _ipc_chunks(path, columns, chunk_size):
+    pa = import_optional('pyarrow')
+    with pa.memory_map(path, 'r') as source:
+        reader = pa.ipc.open_file(source)
+        for i in range(reader.num_record_batches):
+            yield from _table_chunks(reader.get_batch(i), columns, chunk_size)
+
+
+def _csv_chunks(path, columns, chunk_size):
+    with open(path, newline='') as f:
+        reader = csv.reader(f)
+        header = next(reader, [])
+        indices = [header.index(_column_name(header, column)) for column in columns]
+        rows = []
+        for row in reader:
+            rows.append([row[index] for index in indices])
+            if len(rows) == chunk_size:
+                yield tuple(np.array(values, dtype=object) for values in zip(*rows))
+                rows = []
+        if rows:
+            yield tuple(np.array(values, dtype=object) for values in zip(*rows))
+
+
+def iter_column_chunks(source, columns, chunk_size=1 << 22):
+    """
+    Read several columns of a table or file together, chunk by chunk (i.e., reading the source once).
+    :param source:      Path to a CSV, Parquet, or Arrow IPC/Feather file, or Arrow table or record batch.
+    :param columns:     Column names.
+    :param chunk_size:  Maximum number of rows per chunk.
+    :return: generator of tuples of arrays (one per column), of at most chunk_size each
+    """
+    if isinstance(source, (str, os.PathLike)):
+        path = os.fspath(source)
+        suffix = os.path.splitext(path)[1].lower()
+        if suffix == '.csv':
+            return _csv_chunks(path, columns, chunk_size)
+        elif suffix == '.parquet':
+            return _parquet_chunks(path, columns, chunk_size)
+        elif suffix in ARROW_SUFFIXES:
+            return _ipc_chunks(path, columns, chunk_size)
+        raise ValueError("Unsupported file type '{}' (expected .csv, .parquet, or {})".format(
+            suffix, ', '.join(ARROW_SUFFIXES)))
+    elif type(source).__name__ in ('Table', 'RecordBatch') and type(source).__module__.startswith('pyarrow'):
+        return _table_chunks(source, columns, chunk_size)
+    raise ValueError("Expected a table or file with columns, got {}".format(type(source).__name__))
+
+
+def iter_label_chunks(source, chunk_size=1 << 22, column=None):
+    """
+    Read a label vector chunk by chunk.
+    :param source:      Array (e.g., np.memmap), path to a .npy, CSV, Parquet, or Arrow IPC/Feather file, or Arrow
+                        array, chunked array, or table.
+    :param chunk_size:  Maximum number of labels per chunk.
+    :param column:      Column holding the labels (tables, CSV, Parquet, and Arrow IPC only; single-column sources raise
+                        ValueError if set).
+    :return: generator of label arrays, of at most chunk_size each
+    """
+    if isinstance(source, (str, os.PathLike)):
+        path = os.fspath(source)
+        suffix = os.path.splitext(path)[1].lower()
+        if suffix == '.npy':
+            _single_column("'{}'".format(path), column)
+            source = np.load(path, mmap_mode='r')
+        elif suffix in ('.csv', '.parquet') + ARROW_SUFFIXES:
+            return (chunk for chunk, in iter_column_chunks(path, [column], chunk_size))
+        else:
+            raise ValueError("Unsupported file type '{}' (expected .npy, .csv, .parquet, or {})".format(
+                suffix, ', '.join(ARROW_SUFFIXES)))
+    elif type(source).__module__.startswith('pyarrow'):
+        if type(source).__name__ in ('Table', 'RecordBatch'):
+            return (chunk for chunk, in iter_column_chunks(source, [column], chunk_size))
+        _single_column(type(source).__name__, column)
+        return _array_chunks(source, chunk_size)
+    else:
+        _single_column(type(source).__name__, column)
+    return (np.asarray(source[start:start + chunk_size]) for start in range(0, len(source), chunk_size))
+
+
+def rechunk(chunks, chunk_size):
+    """
+    Re-cut a stream of arrays into chunks of exactly chunk_size (but the last one), e.g., to align Parquet row groups.
+    """
+    pending, npending = [], 0
+    for chunk in chunks:
+        while len(chunk):
+            take = min(chunk_size - npending, len(chunk))
+            pending.append(chunk[:take])
+            npending += take
+            chunk = chunk[take:]
+            if npending == chunk_size:
+                yield pending[0] if len(pending) == 1 else np.concatenate(pending)
+                pending, npending = [], 0
+    if npending:
+        yield pending[0] if len(pending) == 1 else np.concatenate(pending)
+
+
+def iter_aligned_chunks(true_source, pred_source, chunk_size=1 << 22, true_column=None, pred_column=None):
+    """
+    Read ground-truth and predictions side by side, in chunks covering the same rows.
+    :return: generator of (true_chunk, pred_chunk) pairs
+    """
+    true_chunks = rechunk(iter_label_chunks(true_source, chunk_size, column=true_column), chunk_size)
+    pred_chunks = rechunk(iter_label_chunks(pred_source, chunk_size, column=pred_column), chunk_size)
+    n_rows = 0
+    for true_chunk in true_chunks:
+        pred_chunk = next(pred_chunks, None)
+        if pred_chunk is None or len(pred_chunk) != len(true_chunk):
+            raise ValueError("Predictions end before the ground-truth (row {})".format(
+                n_rows + (0 if pred_chunk is None else len(pred_chunk))))
+        n_rows += len(true_chunk)
+        yield true_chunk, pred_chunk
+    if next(pred_chunks, None) is not None:
+        raise ValueError("Predictions continue past the {} rows of the ground-truth".format(n_rows))
+
+
+def evaluate_files(true_source, pred_source, chunk_size=1 << 22, true_column=None, pred_column=None,
+                   buffer_cells=1 << 20):
+    """
+    Evaluate predictions against ground-truth too large to load at once (see iter_label_chunks for the sources).
+    :param true_source:     Ground-truth labels.
+    :param pred_source:     Cluster assignments, row-aligned with the ground-truth.
+    :param chunk_size:      Number of rows read at a time.
+    :param true_column:     Column of the ground-truth labels.
+    :param pred_column:     Column of the cluster assignments.
+    :param buffer_cells:    See ContingencyAccumulator.
+    :return: PairwiseReport
+    """
+    accumulator = ContingencyAccumulator(buffer_cells=buffer_cells)
+    for true_chunk, pred_chunk in iter_aligned_chunks(true_source, pred_source, chunk_size, true_column=true_column,
+                                                      pred_column=pred_column):
+        accumulator.update(true_chunk, pred_chunk)
+    return accumulator.report()
+
+
+def _is_text(keys):
+    return keys.dtype.kind in 'OUS'
+
+
+def evaluate_joined(true_source, pred_source, true_key, pred_key, true_column=None, pred_column=None,
+                    chunk_size=1 << 22, buffer_cells=1 << 20):
+    """
+    Evaluate predictions whose rows are matched to the ground-truth by key rather than by position. The ground-truth
+    keys and labels are held in memory, sorted by key, and each chunk of predictions is looked up by binary search.
+    Rows are evaluated only when their key is on both sides (numeric keys are compared as text against text keys).
+    :param true_source:     Ground-truth file (or table) with key and label columns.
+    :param pred_source:     Predictions file (or table) with key and cluster columns.
+    :param true_key:        Key column of the ground-truth.
+    :param pred_key:        Key column of the predictions.
+    :param true_column:     Label column of the ground-truth.
+    :param pred_column:     Cluster column of the predictions.
+    :return: PairwiseReport, {matched, unmatched (predictions without ground-truth), missing (ground-truth without
+             predictions)}
+    """
+    chunks = list(iter_column_chunks(true_source, [true_key, true_column], chunk_size))
+    keys = np.concatenate([key for key, _ in chunks]) if chunks else np.zeros(0, dtype=np.int64)
+    labels = np.concatenate([label for _, label in chunks]) if chunks else np.zeros(0, dtype=np.int64)
+
+    def sort_keys(keys):
+        order = np.argsort(keys, kind='stable')
+        keys = keys[order]
+        duplicates = np.flatnonzero(keys[1:] == keys[:-1])
+        if len(duplicates):
+            raise ValueError("Ground-truth has duplicate keys (e.g., {!r})".format(keys[duplicates[0]]))
+        return keys, order
+
+    sorted_keys, order = sort_keys(keys)
+    seen = np.zeros(len(keys), dtype=bool)
+    accumulator = ContingencyAccumulator(buffer_cells=buffer_cells)
+    unmatched = 0
+    for key_chunk, pred_chunk in iter_column_chunks(pred_source, [pred_key, pred_column], chunk_size):
+        if _is_text(key_chunk) != _is_text(sorted_keys):
+            if _is_text(key_chunk):
+                sorted_keys, order = sort_keys(keys.astype(str).astype(object))
+            else:
+                key_chunk = key_chunk.astype(str).astype(object)
+        index = np.minimum(np.searchsorted(sorted_keys, key_chunk), len(sorted_keys) - 1)
+        found = sorted_keys[index] == key_chunk if len(sorted_keys) else np.zeros(len(key_chunk), dtype=bool)
+        rows = order[index[found]]
+        if np.any(seen[rows]) or len(np.unique(rows)) != len(rows):
+            raise ValueError("Predictions have duplicate keys")
+        seen[rows] = True
+        unmatched += len(found) - int(np.count_nonzero(found))
+        accumulator.update(labels[rows], pred_chunk[found])
+    matched = int(np.count_nonzero(seen))
+    return accumulator.report(), {'matched': matched, 'unmatched': unmatched, 'missing': len(keys) - matched}
@@ -1,8 +1,15 @@
 import numpy as np
 import pairwise.helpers as helpers
-from sklearn.preprocessing import LabelEncoder
-from itertools import combinations
-from math import factorial
+from pairwise.attribution import error_breakdown
+from pairwise.contingency import build_contingency, pair_stats_batch, pairs, weighted_pair_stats
+from pairwise.encoding import factorize
+from pairwise.groundtruth import GroundTruthIndex
+from pairwise.instrumentation import NULL_RECORDER
+from pairwise.io import evaluate_files
+from pairwise.report import PairwiseReport
+import weakref
+from collections import OrderedDict
+from hashlib import blake2b
 
 
 # Calculate pair-wise metrics.
@@ -36,17 +43,26 @@ def nchoosek(n, k=2):
     """
     Determines number of combinations from expressions of form n choose k.
     n choose k = [n ; k] = n!/k!(n-k)! for 0 <= k <= n, where ! is factorial.
-    :param n:  The total number of items.
+
+    Computed in exact integer arithmetic without factorials, i.e., in constant time w.r.t. n. For k=2 (i.e., counting
+    pairs), n may also be an array of counts, which is handled vectorized.
+    :param n:  The total number of items (int or array of ints).
     :param k:  The number to choose each time.
     :return:   n choose k (see description above)
     """
-    if k > n or k==0:
+    if k == 2:
+        return pairs(n)
+    if np.ndim(n) > 0:
+        return np.array([nchoosek(m, k) for m in np.asarray(n).ravel().tolist()]).reshape(np.shape(n))
+    n = int(n)
+    if k > n or k == 0:
         # if elements to choose is less than elements to choose from then No. of combinations is 0
         return 0
-    elif n == 1 and k == 1:
-        # If there is 1 element to choose from (i.e., n=1), and more than 1 element to choose (k>1), return 1
-        return 1
-    return factorial(n) / (factorial(k) * factorial(n - k))
+    # multiplicative formula, exact since each partial product is itself a binomial coefficient
+    result = 1
+    for i in range(1, min(k, n - k) + 1):
+        result = result * (n - i + 1) // i
+    return result
 
 
 def align_pseudo_labels(*labels):
@@ -60,109 +76,198 @@ def align_pseudo_labels(*labels):
 
 
 def label_encoder(labels):
-    le = LabelEncoder()
-    le.fit(labels)
-    return le.transform(labels)
+    """
+    Encode labels as 0, .., M-1, where M is the number of unique labels (see pairwise.encoding.factorize).
+    :param labels:  Labels [ Nx1 ].
+    :return: codes [ Nx1 ]
+    """
+    return factorize(labels)[0]
+
+
+def fingerprint(labels):
+    """
+    Key of a label vector, used to recognize repeated inputs. Files mapped read-only (i.e., np.memmap opened with
+    mmap_mode='r') are keyed on identity, as their content cannot change and hashing would read them whole; other
+    inputs (including read-only views, whose base may still change) on a hash of their content.
+    :param labels:  Labels [ Nx1 ].
+    :return: Hashable key, or None for object arrays and writable memmaps (which are not hashed).
+    """
+    if isinstance(labels, np.memmap) and labels.mode == 'r':
+        return 'id', id(labels)
+    if isinstance(labels, np.memmap):
+        return None
+    labels = np.asarray(labels)
+    if labels.dtype.hasobject:
+        return None
+    digest = blake2b(np.ascontiguousarray(labels).view(np.uint8), digest_size=16).hexdigest()
+    return labels.dtype.str, labels.shape, digest
 
 
 class Metrics:
 
+    def __init__(self, cache_size=8, recorder=None):
+        """
+        :param cache_size:  Number of evaluations kept (least recently used are evicted); 0 disables caching.
+        :param recorder:    pairwise.instrumentation.Recorder timing the stages of each evaluation (default disabled).
+        """
+        self.cache_size = cache_size
+        self.recorder = recorder if recorder is not None else NULL_RECORDER
+        self._cache = OrderedDict()
+
     def __repr__(self):
         return "Class to evaluate pairwise measures using definitions of confusion stats."
 
-    def calculate_tp(self, true_ids, cluster_ids):
+    def clear_cache(self):
+        self._cache.clear()
+
+    def evaluate(self, true_ids, cluster_ids, sample_weight=None):
         """
-        Calculate the number of TP for a set of cluster assignments.
-        :param sample_assignments: Key-Value corresponding to cluster ID - list of labels for samples cluster ID contains.s
-        :return: Number of true positives.
+        Calculate confusion stats once and wrap them in a report exposing every pairwise metric. Reports are memoized
+        on the inputs (see fingerprint), so repeated calls on the same arrays do not recount pairs.
+        :param true_ids:        Ground-truth label [ Nx1 ], or GroundTruthIndex (i.e., already encoded).
+        :param cluster_ids:     Cluster assignment [ Nx1 ].
+        :param sample_weight:   Weight of each sample [ Nx1 ], a pair weighing the product of the weights of its samples
+                                (e.g., to down-weight near-duplicates); stats are then floats.
+        :return: PairwiseReport
+        """
+        with self.recorder.call('evaluate'):
+            if isinstance(true_ids, GroundTruthIndex):
+                if sample_weight is not None:
+                    raise ValueError("Sample weights are not supported with a GroundTruthIndex")
+                self.recorder.count(samples=len(true_ids), classes=true_ids.n_classes)
+                return true_ids.evaluate(cluster_ids)
+            key = None
+            if self.cache_size > 0:
+                inputs = (true_ids, cluster_ids) if sample_weight is None else (true_ids, cluster_ids, sample_weight)
+                key = tuple(fingerprint(labels) for labels in inputs)
+                if None in key:
+                    key = None
+                elif key in self._cache:
+                    report, refs = self._cache[key]
+                    # inputs keyed on identity must still be the same objects (i.e., not a new one at a reused id)
+                    if all(ref() is labels for ref, labels in zip(refs, inputs) if ref is not None):
+                        self._cache.move_to_end(key)
+                        self.recorder.count(cache_hits=1)
+                        return report
+
+            if sample_weight is not None:
+                with self.recorder.stage('encode'):
+                    true_codes, classes = factorize(true_ids)
+                    cluster_codes, clusters = factorize(cluster_ids)
+                self.recorder.count(samples=len(true_codes), classes=len(classes), clusters=len(clusters))
+                with self.recorder.stage('contingency'):
+                    stats = weighted_pair_stats(true_codes, cluster_codes, len(classes), len(clusters), sample_weight)
+                report = PairwiseReport(stats)
+            else:
+                contingency = self.contingency(true_ids, cluster_ids)
+                with self.recorder.stage('finalize'):
+                    report = PairwiseReport(contingency.pair_stats())
+            if key is not None:
+                refs = tuple(weakref.ref(labels) if part[0] == 'id' else None for part, labels in zip(key, inputs))
+                self._cache[key] = report, refs
+                self._cache.move_to_end(key)
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+            return report
+
+    def evaluate_batch(self, true_ids, cluster_ids_batch):
+        """
+        Evaluate many cluster assignments (e.g., a sweep over a clustering parameter) against the same ground-truth,
+        which is encoded only once for the whole batch.
+        :param true_ids:            Ground-truth label [ Nx1 ], or GroundTruthIndex.
+        :param cluster_ids_batch:   Cluster assignments as 2D array [ BxN ] or iterable of B label vectors [ Nx1 ].
+        :return: PairwiseReport whose confusion stats and metrics are arrays [ Bx1 ]
+        """
+        with self.recorder.call('evaluate_batch'):
+            if isinstance(true_ids, GroundTruthIndex):
+                return true_ids.evaluate_batch(cluster_ids_batch)
+            with self.recorder.stage('encode'):
+                true_codes, classes = factorize(true_ids)
+            with self.recorder.stage('contingency'):
+                stats = pair_stats_batch(true_codes, len(classes), cluster_ids_batch)
+            self.recorder.count(samples=len(true_codes), classes=len(classes), labelings=len(stats['TP']))
+            return PairwiseReport(stats)
+
+    def contingency(self, true_ids, cluster_ids, sparse=None):
+        """
+        Build the cluster x class contingency table in a single pass over the samples. The table is stored sparse (i.e.,
+        only non-empty cells) when dense K x C counts would be large relative to N, e.g., many tiny clusters.
+        :param true_ids:    Ground-truth label [ Nx1 ].
+        :param cluster_ids: Cluster assignment [ Nx1 ].
+        :param sparse:      Force the sparse (True) or dense (False) representation.
+        :return: Contingency or SparseContingency
+        """
+        with self.recorder.call('contingency'):
+            # calibrate labels such to start from 0,.., M, where M is # of unique labels (each vector encoded once)
+            with self.recorder.stage('encode'):
+                true_codes, classes = factorize(true_ids)
+                cluster_codes, clusters = factorize(cluster_ids)
+            self.recorder.count(samples=len(true_codes), classes=len(classes), clusters=len(clusters))
+            with self.recorder.stage('contingency'):
+                return build_contingency(true_codes, cluster_codes, len(classes), len(clusters), sparse=sparse)
+
+    def error_breakdown(self, true_ids, cluster_ids):
         """
-        # calibrate labels such to start from 0,.., M, where M is # of unique labels
-        true_ids, cluster_ids = align_pseudo_labels(true_ids, cluster_ids)
+        Per-cluster TP/FP and per-class TP/FN (e.g., to find the clusters merging the most classes).
+        :param true_ids:    Ground-truth label [ Nx1 ].
+        :param cluster_ids: Cluster assignment [ Nx1 ].
+        :return: ErrorBreakdown
+        """
+        return error_breakdown(true_ids, cluster_ids)
 
-        tp = 0  # TP (running sum)
-        for i, cluster_id in enumerate(np.unique(cluster_ids)):
-            # for each cluster, determine contents wrt to true labels
-            cluster = true_ids[cluster_ids == cluster_id]
-            # how many of each label type
-            unique, counts = np.unique(cluster, return_counts=True)
-            # count pairs for bins with more than 1 sample (i.e., 1 sample = 0 pairs, 0!)
-            tp += sum(nchoosek(c, 2) for c in counts if c > 1)
-        return tp
+    def evaluate_files(self, true_source, pred_source, chunk_size=1 << 22, true_column=None, pred_column=None):
+        """
+        Evaluate label vectors read in chunks (e.g., .npy memmaps or Parquet columns of 500M rows), in memory bounded by
+        the chunk size and the number of (cluster, class) cells (see pairwise.io.evaluate_files).
+        :param true_source: Ground-truth labels (array, path, or Arrow data).
+        :param pred_source: Cluster assignments, row-aligned with the ground-truth.
+        :return: PairwiseReport
+        """
+        with self.recorder.call('evaluate_files'):
+            return evaluate_files(true_source, pred_source, chunk_size=chunk_size, true_column=true_column,
+                                  pred_column=pred_column)
 
-    def calculate_fp(self, true_ids, cluster_ids):
+    def calculate_tp(self, true_ids, cluster_ids, sample_weight=None):
         """
-        Calculate the number of FP for a set of cluster assignments.
-        :param sample_assignments: Key-Value corresponding to cluster ID - list of labels for samples cluster ID contains.s
+        Calculate the number of TP for a set of cluster assignments.
+        :param true_ids:    Ground-truth label [ Nx1 ].
+        :param cluster_ids: Cluster assignment [ Nx1 ].
+        :param sample_weight: Weight of each sample [ Nx1 ] (see evaluate).
         :return: Number of true positives.
         """
-        # calibrate labels such to start from 0,.., M, where M is # of unique labels
-        true_ids, cluster_ids = align_pseudo_labels(true_ids, cluster_ids)
+        return self.evaluate(true_ids, cluster_ids, sample_weight).tp
 
-        fp = 0  # FP (running sum)
-        for i, cluster_id in enumerate(np.unique(cluster_ids)):
-            # for each cluster, determine contents wrt to true labels
-            cluster = true_ids[cluster_ids == cluster_id]
-            # how many of each label type
-            unique, counts = np.unique(cluster, return_counts=True)
-            pairs = list(combinations(unique, 2))
-            lut = dict(zip(unique, counts))
-            # sum of products from each count for each class
-            fp += sum(lut[pair[0]] * lut[pair[1]] for pair in pairs)
-        return fp
+    def calculate_fp(self, true_ids, cluster_ids, sample_weight=None):
+        """
+        Calculate the number of FP for a set of cluster assignments.
+        :param true_ids:    Ground-truth label [ Nx1 ].
+        :param cluster_ids: Cluster assignment [ Nx1 ].
+        :param sample_weight: Weight of each sample [ Nx1 ] (see evaluate).
+        :return: Number of false positives.
+        """
+        return self.evaluate(true_ids, cluster_ids, sample_weight).fp
 
-    def calculate_fn(self, true_ids, cluster_ids):
+    def calculate_fn(self, true_ids, cluster_ids, sample_weight=None):
         """
         Calculate the number of FN for a set of cluster assignments.
-        :param sample_assignments: Key-Value corresponding to cluster ID - list of labels for samples cluster ID contains.s
-        :return: Number of true positives.
+        :param true_ids:    Ground-truth label [ Nx1 ].
+        :param cluster_ids: Cluster assignment [ Nx1 ].
+        :param sample_weight: Weight of each sample [ Nx1 ] (see evaluate).
+        :return: Number of false negatives.
         """
-        # calibrate labels such to start from 0,.., M, where M is # of unique labels
-        true_ids, cluster_ids = align_pseudo_labels(true_ids, cluster_ids)
-
-        fn = 0  # FN (running sum)
-        for i, cluster_id in enumerate(np.sort(np.unique(cluster_ids)[:-1])):
-            # for each cluster, determine contents wrt to true labels
-            cluster = true_ids[cluster_ids == cluster_id]
-            # only look at larger values to not count same pair 2x (i.e., not look back, as prior already was calculated.
-            another = true_ids[cluster_ids > cluster_id]
-            # how many of each label in current cluster
-            unique, counts = np.unique(cluster, return_counts=True)
-            # how many of each in other clusters
-            other_unique, other_counts = np.unique(another, return_counts=True)
-
-            # make dictionaries and determine common keys to count
-            lut = dict(zip(unique, counts))
-            other_lut = dict(zip(other_unique, other_counts))
-
-            common = list(set(lut.keys()).intersection(set(other_lut.keys())))
+        return self.evaluate(true_ids, cluster_ids, sample_weight).fn
 
-            for key in common:
-                # number of elements in current * number outside
-                fn += lut[key] * other_lut[key]
-
-        return fn
-
-    def confusion_matrix_values(self, true_ids, cluster_ids):
+    def confusion_matrix_values(self, true_ids, cluster_ids, sample_weight=None):
         """
         Calculate TP, FP, TN, and FN and store in dictionary container.
         :param true_ids:    Ground-truth label [ Nx1 ].
         :param clabels:     Cluster assignment [ Nx1 ].
+        :param sample_weight: Weight of each sample [ Nx1 ] (see evaluate).
         :return: Confusion stats {TP, FP, TN, FN} (dictionary)
         """
-        true_ids, cluster_ids = align_pseudo_labels(true_ids, cluster_ids)
-
-        stats = {}
-        stats['TP'] = self.calculate_tp(true_ids, cluster_ids)
-        stats['FP'] = self.calculate_fp(true_ids, cluster_ids)
-        stats['FN'] = self.calculate_fn(true_ids, cluster_ids)
-        npairs = nchoosek(len(true_ids), 2)  # total number of pairs
-        npositive = stats['FP'] + stats['TP']  # total number of positive pairs
-        nnegative = npairs - npositive  # total number of negative pairs
-        stats['TN'] = nnegative - stats['FN']
+        return dict(self.evaluate(true_ids, cluster_ids, sample_weight).stats)
 
-        return stats
-
-    def precision(self, true_ids, cluster_ids):
+    def precision(self, true_ids, cluster_ids, sample_weight=None):
         """
         Calculate precision of the ith cluster w.r.t. assigned clusterins. True labels are used to determine those from same
         class and, hence, should be clustered together. It is assumed all N samples are clustered.
@@ -172,13 +277,13 @@ class Metrics:
         Precision = TP / (TP + FP) (per class)
         :param true_ids:    Ground-truth label [ Nx1 ].
         :param clabels:     Cluster assignment [ Nx1 ].
+        :param sample_weight: Weight of each sample [ Nx1 ] (see evaluate).
         :return: Precision value (float)
         """
 
-        stats = self.confusion_matrix_values(true_ids, cluster_ids)
-        return stats['TP'] / (stats['TP'] + stats['FP'])
+        return self.evaluate(true_ids, cluster_ids, sample_weight).precision
 
-    def recall(self, true_ids, cluster_ids):
+    def recall(self, true_ids, cluster_ids, sample_weight=None):
         """
         Calculate recall of the ith cluster w.r.t. clabels. Ground-truth is used to determine the observations from the same
         class (identity) and, hence, should be clustered together.
@@ -189,13 +294,12 @@ class Metrics:
 
         :param true_ids:    Ground-truth label [ Nx1 ].
         :param cluster_ids: Cluster assignment [ Nx1 ].
+        :param sample_weight: Weight of each sample [ Nx1 ] (see evaluate).
         :return: Recall value (float)
         """
-        stats = self.confusion_matrix_values(true_ids, cluster_ids)
-
-        return stats['TP'] / (stats['TP'] + stats['FN'])
+        return self.evaluate(true_ids, cluster_ids, sample_weight).recall
 
-    def accuracy(self, true_ids, cluster_ids):
+    def accuracy(self, true_ids, cluster_ids, sample_weight=None):
         """
         Calculate accuracy.
 
@@ -204,37 +308,95 @@ class Metrics:
         Acc = (TP + TN) / (TP + FP + FN + TN)
         :param true_ids:    Ground-truth label [ Nx1 ].
         :param cluster_ids: Cluster assignment [ Nx1 ].
+        :param sample_weight: Weight of each sample [ Nx1 ] (see evaluate).
         :return:
         """
-        stats = self.confusion_matrix_values(true_ids, cluster_ids)
+        return self.evaluate(true_ids, cluster_ids, sample_weight).accuracy
 
-        return (stats['TP'] + stats['TN']) / (stats['TP'] + stats['FP'] + stats['FN'] + stats['TN'])
-
-    def specificity(self, true_ids, cluster_ids):
+    def specificity(self, true_ids, cluster_ids, sample_weight=None):
         """
         Calculate specificity: Coverage of actual negative sample.
 
         Recall = TN / (TN + FP)
         :param true_ids:    Ground-truth label [ Nx1 ].
         :param cluster_ids: Cluster assignment [ Nx1 ].
+        :param sample_weight: Weight of each sample [ Nx1 ] (see evaluate).
         :return:
         """
-        stats = self.confusion_matrix_values(true_ids, cluster_ids)
-
-        return stats['TN'] / (stats['TN'] + stats['FP'])
+        return self.evaluate(true_ids, cluster_ids, sample_weight).specificity
 
-    def f1score(self, true_ids, cluster_ids):
+    def f1score(self, true_ids, cluster_ids, sample_weight=None):
         """
         Calculate F1-score: Hybrid metric useful for unbalanced classes.
 
         Recall = 2TP / (2TP + FP + FN)
         :param true_ids:    Ground-truth label [ Nx1 ].
         :param cluster_ids: Cluster assignment [ Nx1 ].
+        :param sample_weight: Weight of each sample [ Nx1 ] (see evaluate).
+        :return:
+        """
+        return self.evaluate(true_ids, cluster_ids, sample_weight).f1score
+
+
+    def fbeta_score(self, true_ids, cluster_ids, beta=1.0, sample_weight=None):
+        """
+        Calculate F-beta score: weighted harmonic mean of precision and recall, where recall is beta times as important.
+
+        F-beta = (1 + beta^2) TP / ((1 + beta^2) TP + beta^2 FN + FP)
+        :param true_ids:    Ground-truth label [ Nx1 ].
+        :param cluster_ids: Cluster assignment [ Nx1 ].
+        :param beta:        Weight of recall.
+        :param sample_weight: Weight of each sample [ Nx1 ] (see evaluate).
+        :return:
+        """
+        return PairwiseReport(self.evaluate(true_ids, cluster_ids, sample_weight).stats, beta=beta).fbeta
+
+    def jaccard(self, true_ids, cluster_ids, sample_weight=None):
+        """
+        Calculate pairwise Jaccard index: overlap of pairs sharing a cluster and pairs sharing a class.
+
+        Jaccard = TP / (TP + FP + FN)
+        :param true_ids:    Ground-truth label [ Nx1 ].
+        :param cluster_ids: Cluster assignment [ Nx1 ].
+        :param sample_weight: Weight of each sample [ Nx1 ] (see evaluate).
+        :return:
+        """
+        return self.evaluate(true_ids, cluster_ids, sample_weight).jaccard
+
+    def fowlkes_mallows(self, true_ids, cluster_ids, sample_weight=None):
+        """
+        Calculate Fowlkes-Mallows index: geometric mean of pairwise precision and recall.
+
+        FMI = TP / sqrt((TP + FP) (TP + FN))
+        :param true_ids:    Ground-truth label [ Nx1 ].
+        :param cluster_ids: Cluster assignment [ Nx1 ].
+        :param sample_weight: Weight of each sample [ Nx1 ] (see evaluate).
+        :return:
+        """
+        return self.evaluate(true_ids, cluster_ids, sample_weight).fowlkes_mallows
+
+    def adjusted_rand_index(self, true_ids, cluster_ids, sample_weight=None):
+        """
+        Calculate adjusted Rand index: Rand index (i.e., pairwise accuracy) corrected for chance.
+
+        ARI = 2 (TP TN - FN FP) / ((TP + FN) (FN + TN) + (TP + FP) (FP + TN))
+        :param true_ids:    Ground-truth label [ Nx1 ].
+        :param cluster_ids: Cluster assignment [ Nx1 ].
+        :param sample_weight: Weight of each sample [ Nx1 ] (see evaluate).
         :return:
         """
-        stats = self.confusion_matrix_values(true_ids, cluster_ids)
+        return self.evaluate(true_ids, cluster_ids, sample_weight).adjusted_rand_index
 
-        return 2 * stats['TP'] / (2 * stats['TP'] + stats['FP'] + stats['FN'])
+    def all_metrics(self, true_ids, cluster_ids, beta=1.0, sample_weight=None):
+        """
+        Calculate confusion stats and every pairwise metric from a single pass over the samples.
+        :param true_ids:    Ground-truth label [ Nx1 ].
+        :param cluster_ids: Cluster assignment [ Nx1 ].
+        :param beta:        Weight of recall in the F-beta score.
+        :param sample_weight: Weight of each sample [ Nx1 ] (see evaluate).
+        :return: Confusion stats and metrics (dictionary)
+        """
+        return PairwiseReport(self.evaluate(true_ids, cluster_ids, sample_weight).stats, beta=beta).to_dict()
 
 
 if __name__ == '__main__':
@@ -249,3 +411,5 @@ if __name__ == '__main__':
     print('Accuracy: {} '.format(mm.accuracy(DATA_SET_A['Y'], DATA_SET_A['YP'])))
     print('Specificity: {} '.format(mm.specificity(DATA_SET_A['Y'], DATA_SET_A['YP'])))
     print('F1: {} '.format(mm.f1score(DATA_SET_A['Y'], DATA_SET_A['YP'])))
+    print('F5: {} '.format(mm.fbeta_score(DATA_SET_A['Y'], DATA_SET_A['YP'], beta=5)))
+    print('ARI: {} '.format(mm.adjusted_rand_index(DATA_SET_A['Y'], DATA_SET_A['YP'])))
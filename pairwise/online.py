@@ -0,0 +1,185 @@
+import numpy as np
+from collections import Counter
+from pairwise.contingency import stats_from_totals
+from pairwise.encoding import factorize
+from pairwise.report import PairwiseReport
+
+
+# Live pairwise confusion stats of an online clustering, updated as samples are assigned, moved, or removed, and as
+# clusters are merged.
+#
+# Adding a sample of class c to cluster k creates one positive pair with each member of k (of which k[c] are TP) and
+# one pair sharing a class with each sample of c already assigned; removing it takes the same pairs away. Hence, with a
+# class histogram per cluster and a count per class, assign, remove, and move (remove then assign) are O(1). Merging
+# clusters A and B adds |A||B| positive pairs, of which sum_c A[c] B[c] are TP: the histogram of the smaller cluster is
+# iterated, folded into the larger one, and its members relabeled, i.e., O(smaller cluster). FN and TN follow from the
+# pairs sharing a class and the pairs overall, so the stats always equal those of a full recount over current samples.
+
+
+class OnlineEvaluator:
+    """
+    Mutable pairwise confusion stats of a changing cluster assignment.
+    """
+
+    def __init__(self, true_ids=None):
+        """
+        :param true_ids:    Ground-truth label of each sample [ Nx1 ], samples then being referred to by index; if not
+                            set, samples are any hashable ID, and their label is given to assign().
+        """
+        self._true_codes = factorize(true_ids)[0] if true_ids is not None else None
+        self.tp = 0
+        self.npositive = 0  # pairs sharing a cluster
+        self.nsame = 0  # pairs sharing a class
+        self._class_counts = Counter()
+        self._labels = {}  # class of each assigned sample
+        self._node_of_sample = {}
+        # clusters are internal nodes, such that merging relabels the members of the smaller cluster only
+        self._node_of_cluster = {}
+        self._cluster_of_node = {}
+        self._members = {}
+        self._histograms = {}
+        self._next_node = 0
+
+    def __repr__(self):
+        return "OnlineEvaluator({} samples, {} clusters)".format(len(self), len(self._node_of_cluster))
+
+    def __len__(self):
+        return len(self._node_of_sample)
+
+    def __contains__(self, sample):
+        return sample in self._node_of_sample
+
+    @classmethod
+    def from_labels(cls, true_ids, cluster_ids):
+        """
+        Start from a complete assignment of samples 0, .., N-1.
+        :param true_ids:    Ground-truth label [ Nx1 ].
+        :param cluster_ids: Cluster assignment [ Nx1 ].
+        :return: OnlineEvaluator
+        """
+        evaluator = cls(true_ids)
+        cluster_ids = np.asarray(cluster_ids)
+        if len(cluster_ids) != len(evaluator._true_codes):
+            raise ValueError("Label vectors differ in length: {} and {}".format(len(evaluator._true_codes),
+                                                                               len(cluster_ids)))
+        for sample, cluster in enumerate(cluster_ids.tolist()):
+            evaluator.assign(sample, cluster)
+        return evaluator
+
+    def _node(self, cluster):
+        node = self._node_of_cluster.get(cluster)
+        if node is None:
+            node = self._next_node
+            self._next_node += 1
+            self._node_of_cluster[cluster] = node
+            self._cluster_of_node[node] = cluster
+            self._members[node] = set()
+            self._histograms[node] = Counter()
+        return node
+
+    def _drop_node(self, node):
+        del self._node_of_cluster[self._cluster_of_node.pop(node)]
+        del self._members[node]
+        del self._histograms[node]
+
+    def _label(self, sample, label):
+        if self._true_codes is not None:
+            if label is not None:
+                raise ValueError("Labels are given by the ground-truth of the evaluator")
+            return int(self._true_codes[sample])
+        if label is None:
+            raise ValueError("Expected the label of sample {!r}".format(sample))
+        return label
+
+    def assign(self, sample, cluster, label=None):
+        """
+        Add a sample to a cluster (created if new).
+        :param sample:  Sample index (or ID, if the evaluator has no ground-truth).
+        :param cluster: Cluster ID.
+        :param label:   Class of the sample (only if the evaluator has no ground-truth).
+        """
+        if sample in self._node_of_sample:
+            raise ValueError("Sample {!r} is already assigned (to cluster {!r})".format(sample,
+                                                                                     self.cluster_of(sample)))
+        label = self._label(sample, label)
+        node = self._node(cluster)
+        histogram = self._histograms[node]
+        self.tp += histogram[label]
+        self.npositive += len(self._members[node])
+        self.nsame += self._class_counts[label]
+
+        histogram[label] += 1
+        self._members[node].add(sample)
+        self._class_counts[label] += 1
+        self._labels[sample] = label
+        self._node_of_sample[sample] = node
+
+    def remove(self, sample):
+        """
+        Take a sample out of the evaluation (e.g., discarded as noise).
+        """
+        node = self._node_of_sample.pop(sample)
+        label = self._labels.pop(sample)
+        histogram = self._histograms[node]
+        histogram[label] -= 1
+        self._members[node].discard(sample)
+        self._class_counts[label] -= 1
+
+        self.tp -= histogram[label]
+        self.npositive -= len(self._members[node])
+        self.nsame -= self._class_counts[label]
+        if not self._members[node]:
+            self._drop_node(node)
+        return label
+
+    def move(self, sample, cluster):
+        """
+        Reassign a sample to another cluster (created if new).
+        """
+        label = self.remove(sample)
+        self.assign(sample, cluster, label=None if self._true_codes is not None else label)
+
+    def merge(self, a, b):
+        """
+        Merge cluster b into cluster a (b no longer exists afterwards).
+        """
+        if a == b:
+            return
+        node_a, node_b = self._node_of_cluster[a], self._node_of_cluster[b]
+        small, large = (node_a, node_b) if len(self._members[node_a]) < len(self._members[node_b]) else (node_b, node_a)
+
+        histogram = self._histograms[large]
+        for label, count in self._histograms[small].items():
+            self.tp += count * histogram[label]
+            histogram[label] += count
+        self.npositive += len(self._members[small]) * len(self._members[large])
+        for sample in self._members[small]:
+            self._node_of_sample[sample] = large
+        self._members[large].update(self._members[small])
+
+        self._drop_node(small)
+        if large != node_a:
+            # the surviving node takes the name of cluster a
+            del self._node_of_cluster[self._cluster_of_node[large]]
+            self._node_of_cluster[a] = large
+            self._cluster_of_node[large] = a
+
+    def cluster_of(self, sample):
+        return self._cluster_of_node[self._node_of_sample[sample]]
+
+    def cluster_size(self, cluster):
+        return len(self._members[self._node_of_cluster[cluster]])
+
+    def members(self, cluster):
+        return set(self._members[self._node_of_cluster[cluster]])
+
+    def pair_stats(self):
+        """
+        Current confusion stats over the assigned samples.
+        :return: Confusion stats {TP, FP, TN, FN} (dictionary)
+        """
+        n_samples = len(self)
+        return stats_from_totals(self.tp, self.npositive, self.nsame, n_samples * (n_samples - 1) // 2)
+
+    def report(self):
+        return PairwiseReport(self.pair_stats())
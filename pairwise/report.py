@@ -0,0 +1,183 @@
+import numpy as np
+
+
+# Container for the confusion stats of one (or many) evaluations, with every pairwise metric derived from them. Stats
+# are counted once, while each metric is computed on first access and then kept. Results of parameter sweeps (i.e.,
+# pairwise.sweep, pairwise.hierarchy, and pairwise.graph) wrap a report whose stats are arrays over the swept values.
+
+
+class lazy_property:
+    """
+    Decorator for read-only properties evaluated once per instance (stored in the instance __dict__ thereafter).
+    """
+
+    def __init__(self, func):
+        self.func = func
+        self.__doc__ = func.__doc__
+        self.name = func.__name__
+
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self
+        value = self.func(instance)
+        instance.__dict__[self.name] = value
+        return value
+
+
+def safe_divide(numerator, denominator):
+    """
+    Divide, yielding NaN where the denominator is 0 (e.g., precision when no pair shares a cluster).
+    :param numerator:   Scalar or array.
+    :param denominator: Scalar or array.
+    :return: numerator / denominator
+    """
+    if np.ndim(numerator) == 0 and np.ndim(denominator) == 0:
+        return numerator / denominator if denominator else float('nan')
+    numerator = np.asarray(numerator, dtype=np.float64)
+    denominator = np.asarray(denominator, dtype=np.float64)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(denominator != 0, numerator / denominator, np.nan)
+
+
+class PairwiseReport:
+    """
+    Pairwise evaluation of a cluster assignment. Metrics are properties derived from a single set of confusion stats.
+    """
+
+    metric_names = ('precision', 'recall', 'accuracy', 'specificity', 'f1score', 'fbeta', 'jaccard', 'fowlkes_mallows',
+                    'adjusted_rand_index')
+
+    def __init__(self, stats, beta=1.0):
+        """
+        :param stats:   Confusion stats {TP, FP, TN, FN} (dictionary)
+        :param beta:    Weight of recall w.r.t. precision in the F-beta score.
+        """
+        self.stats = dict(stats)
+        self.beta = beta
+
+    def __repr__(self):
+        return "PairwiseReport(TP={TP}, FP={FP}, FN={FN}, TN={TN})".format(**self.stats)
+
+    @property
+    def tp(self):
+        return self.stats['TP']
+
+    @property
+    def fp(self):
+        return self.stats['FP']
+
+    @property
+    def fn(self):
+        return self.stats['FN']
+
+    @property
+    def tn(self):
+        return self.stats['TN']
+
+    @lazy_property
+    def precision(self):
+        """Precision = TP / (TP + FP)"""
+        return safe_divide(self.tp, self.tp + self.fp)
+
+    @lazy_property
+    def recall(self):
+        """Recall = TP / (TP + FN)"""
+        return safe_divide(self.tp, self.tp + self.fn)
+
+    @lazy_property
+    def accuracy(self):
+        """Acc = (TP + TN) / (TP + FP + FN + TN)"""
+        return safe_divide(self.tp + self.tn, self.tp + self.fp + self.fn + self.tn)
+
+    @lazy_property
+    def specificity(self):
+        """Specificity = TN / (TN + FP)"""
+        return safe_divide(self.tn, self.tn + self.fp)
+
+    @lazy_property
+    def f1score(self):
+        """F1 = 2TP / (2TP + FP + FN)"""
+        return safe_divide(2 * self.tp, 2 * self.tp + self.fp + self.fn)
+
+    @lazy_property
+    def fbeta(self):
+        """F-beta = (1 + b^2) TP / ((1 + b^2) TP + b^2 FN + FP)"""
+        weight = self.beta ** 2
+        return safe_divide((1 + weight) * self.tp, (1 + weight) * self.tp + weight * self.fn + self.fp)
+
+    @property
+    def rand_index(self):
+        """RI = (TP + TN) / (TP + FP + FN + TN), i.e., pairwise accuracy"""
+        return self.accuracy
+
+    @lazy_property
+    def jaccard(self):
+        """Jaccard = TP / (TP + FP + FN)"""
+        return safe_divide(self.tp, self.tp + self.fp + self.fn)
+
+    @lazy_property
+    def fowlkes_mallows(self):
+        """FMI = TP / sqrt((TP + FP) (TP + FN)), i.e., geometric mean of precision and recall"""
+        tp, fp, fn, _ = self._operands()
+        return safe_divide(tp, np.sqrt((tp + fp) * (tp + fn)))
+
+    @lazy_property
+    def adjusted_rand_index(self):
+        """ARI = 2 (TP TN - FN FP) / ((TP + FN) (FN + TN) + (TP + FP) (FP + TN)), i.e., RI corrected for chance"""
+        tp, fp, fn, tn = self._operands()
+        numerator = 2 * (tp * tn - fn * fp)
+        denominator = (tp + fn) * (fn + tn) + (tp + fp) * (fp + tn)
+        if np.ndim(denominator) == 0 and not denominator:
+            # perfect agreement, e.g., a single cluster for a single class
+            return 1.0
+        score = safe_divide(numerator, denominator)
+        return np.where((fn == 0) & (fp == 0), 1.0, score) if np.ndim(score) else score
+
+    def _operands(self):
+        # products of pair counts overflow int64 for large N, while Python ints (scalar stats) are exact
+        stats = (self.tp, self.fp, self.fn, self.tn)
+        if np.ndim(self.tp) == 0:
+            if isinstance(self.tp, (float, np.floating)):
+                # weighted stats
+                return tuple(float(value) for value in stats)
+            return tuple(int(value) for value in stats)
+        return tuple(np.asarray(value, dtype=np.float64) for value in stats)
+
+    def to_dict(self):
+        """
+        Confusion stats and all metrics in a single (flat) dictionary.
+        :return: dictionary
+        """
+        values = dict(self.stats)
+        values.update((name, getattr(self, name)) for name in self.metric_names)
+        return values
+
+
+class SweepResult:
+    """
+    Pairwise metrics of each value of a parameter sweep (sorted by value).
+    """
+
+    def __init__(self, values, stats):
+        """
+        :param values:  Parameter values [ Px1 ].
+        :param stats:   Confusion stats {TP, FP, TN, FN} of each value, i.e., arrays [ Px1 ] (dictionary)
+        """
+        self.values = np.asarray(values)
+        self.report = PairwiseReport(stats)
+
+    def __repr__(self):
+        return "SweepResult({} values)".format(len(self.values))
+
+    def best(self, metric):
+        """
+        Highest score of a metric and the parameter value reaching it.
+        :param metric:  Name of a metric of PairwiseReport (e.g., 'precision').
+        :return: (score, value)
+        """
+        scores = getattr(self.report, metric)
+        index = int(np.nanargmax(scores))
+        return scores[index], self.values[index]
+
+    def summary(self, metrics=('precision', 'recall', 'accuracy')):
+        return '\n'.join('{}: {} at {}'.format(metric, *self.best(metric)) for metric in metrics)
@@ -0,0 +1,270 @@
+import os
+import numpy as np
+from pairwise.contingency import count_pairs, stats_from_totals
+from pairwise.encoding import factorize
+from pairwise.report import PairwiseReport
+
+
+# Accumulate the cluster x class contingency over chunks of samples (e.g., read from a file too large for memory).
+#
+# Only the non-empty cells are kept, keyed by the raw cluster and class labels, as encoding is not shared across
+# chunks. Cells of incoming chunks are buffered and folded into the running state once the buffer outgrows it, so
+# memory is bounded by the number of distinct (cluster, class) cells rather than by the number of samples.
+#
+# The same cells are the unit to combine partial results of different shards of samples: pair counts themselves do not
+# add up (i.e., pairs with one sample in each shard are in neither), but the counts per cell do. Hence, accumulators
+# are merged (or saved and loaded) as cells, and pairs are only counted once all shards are combined.
+
+
+def chunk_cells(true_ids, cluster_ids):
+    """
+    Count samples per non-empty (cluster, class) cell of a chunk.
+    :param true_ids:    Ground-truth label [ Nx1 ].
+    :param cluster_ids: Cluster assignment [ Nx1 ].
+    :return: Cluster label, class label, and count of each cell (tuple of arrays)
+    """
+    true_ids = np.asarray(true_ids)
+    cluster_ids = np.asarray(cluster_ids)
+    if true_ids.shape != cluster_ids.shape:
+        raise ValueError("Label vectors differ in shape: {} and {}".format(true_ids.shape, cluster_ids.shape))
+    true_ids, cluster_ids = true_ids.ravel(), cluster_ids.ravel()
+
+    class_codes, classes = factorize(true_ids)
+    cluster_codes, clusters = factorize(cluster_ids)
+    keys = cluster_codes.astype(np.int64) * len(classes) + class_codes
+    keys, counts = np.unique(keys, return_counts=True)
+    return clusters[keys // len(classes)], classes[keys % len(classes)], counts.astype(np.int64)
+
+
+def reduce_cells(clusters, classes, counts):
+    """
+    Sum the counts of cells repeated across a collection of (cluster label, class label, count) triplets.
+    :return: Unique cells sorted by cluster, then class label (tuple of arrays)
+    """
+    cluster_labels, cluster_codes = np.unique(clusters, return_inverse=True)
+    class_labels, class_codes = np.unique(classes, return_inverse=True)
+    keys = cluster_codes.ravel().astype(np.int64) * len(class_labels) + class_codes.ravel()
+
+    order = np.argsort(keys, kind='stable')
+    keys = keys[order]
+    starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]]) if len(keys) else np.zeros(0, dtype=np.int64)
+    # integer sums (i.e., exact), as opposed to the float weights of bincount
+    summed = np.add.reduceat(np.asarray(counts, dtype=np.int64)[order], starts) if len(keys) else counts[:0]
+    keys = keys[starts]
+    return cluster_labels[keys // len(class_labels)], class_labels[keys % len(class_labels)], summed
+
+
+class ContingencyAccumulator:
+    """
+    Streaming counterpart of Metrics.confusion_matrix_values: feed (true, predicted) chunks via update(), then read
+    the confusion stats of all samples seen.
+    """
+
+    def __init__(self, buffer_cells=1 << 20):
+        """
+        :param buffer_cells:    Minimum number of buffered cells before folding them into the running state.
+        """
+        self.buffer_cells = buffer_cells
+        self.n_samples = 0
+        self._cells = None
+        self._pending = []
+        self._npending = 0
+
+    def __repr__(self):
+        return "ContingencyAccumulator({} samples)".format(self.n_samples)
+
+    def update(self, true_chunk, pred_chunk):
+        """
+        Add a chunk of samples.
+        :param true_chunk:  Ground-truth labels of the chunk.
+        :param pred_chunk:  Cluster assignments of the chunk.
+        :return: self
+        """
+        cells = chunk_cells(true_chunk, pred_chunk)
+        self._push(cells, int(cells[2].sum()))
+        return self
+
+    def merge(self, other):
+        """
+        Fold the samples of another accumulator (e.g., of a different shard) into this one.
+        :param other:   ContingencyAccumulator
+        :return: self
+        """
+        self._push(other.cells(), other.n_samples)
+        return self
+
+    def __add__(self, other):
+        return ContingencyAccumulator(buffer_cells=self.buffer_cells).merge(self).merge(other)
+
+    def state(self):
+        """
+        Compact, serializable state (i.e., the non-empty cells and the number of samples).
+        :return: dictionary of arrays
+        """
+        clusters, classes, counts = self.cells()
+        return {'clusters': clusters, 'classes': classes, 'counts': counts,
+                'n_samples': np.array(self.n_samples, dtype=np.int64)}
+
+    @classmethod
+    def from_state(cls, state, buffer_cells=1 << 20):
+        """
+        Restore an accumulator from ContingencyAccumulator.state().
+        :param state:   dictionary (or npz file) with clusters, classes, counts, and n_samples
+        :return: ContingencyAccumulator
+        """
+        accumulator = cls(buffer_cells=buffer_cells)
+        counts = np.asarray(state['counts'], dtype=np.int64)
+        if len(counts):
+            accumulator._cells = (np.asarray(state['clusters']), np.asarray(state['classes']), counts)
+        accumulator.n_samples = int(state['n_samples'])
+        return accumulator
+
+    def save(self, path):
+        """
+        Write state to an .npz file. Labels must be numeric or strings (object arrays are not supported).
+        :param path:    Output file.
+        """
+        np.savez(path, **self.state())
+
+    @classmethod
+    def load(cls, path, buffer_cells=1 << 20):
+        """
+        Read an accumulator written by ContingencyAccumulator.save().
+        :param path:    Input (.npz) file.
+        :return: ContingencyAccumulator
+        """
+        with np.load(path, allow_pickle=False) as state:
+            return cls.from_state(state, buffer_cells=buffer_cells)
+
+    def _push(self, cells, n_samples):
+        if not len(cells[2]):
+            return
+        self.n_samples += n_samples
+        self._pending.append(cells)
+        self._npending += len(cells[2])
+
+        nstate = len(self._cells[2]) if self._cells is not None else 0
+        if self._npending > max(nstate, self.buffer_cells):
+            self._consolidate()
+
+    def _consolidate(self):
+        parts = self._pending if self._cells is None else [self._cells] + self._pending
+        if parts:
+            self._cells = reduce_cells(*(np.concatenate(column) for column in zip(*parts)))
+        self._pending = []
+        self._npending = 0
+
+    def cells(self):
+        """
+        Non-empty cells of the contingency over all samples seen.
+        :return: Cluster label, class label, and count of each cell (tuple of arrays)
+        """
+        self._consolidate()
+        if self._cells is None:
+            return np.zeros(0), np.zeros(0), np.zeros(0, dtype=np.int64)
+        return self._cells
+
+    def pair_stats(self):
+        """
+        Calculate TP, FP, TN, and FN over all samples seen and store in dictionary container.
+        :return: Confusion stats {TP, FP, TN, FN} (dictionary)
+        """
+        clusters, classes, counts = self.cells()
+        cluster_codes = np.unique(clusters, return_inverse=True)[1].ravel()
+        class_codes = np.unique(classes, return_inverse=True)[1].ravel()
+        cluster_sizes = np.zeros(cluster_codes.max() + 1 if len(counts) else 0, dtype=np.int64)
+        class_sizes = np.zeros(class_codes.max() + 1 if len(counts) else 0, dtype=np.int64)
+        np.add.at(cluster_sizes, cluster_codes, counts)
+        np.add.at(class_sizes, class_codes, counts)
+
+        tp = count_pairs(counts)
+        npositive = count_pairs(cluster_sizes)
+        nsame = count_pairs(class_sizes)
+        return stats_from_totals(tp, npositive, nsame, count_pairs([self.n_samples]))
+
+    def report(self):
+        return PairwiseReport(self.pair_stats())
+
+
+def merge_accumulators(accumulators):
+    """
+    Combine partial accumulators (e.g., one per shard) into one.
+    :param accumulators:    Iterable of ContingencyAccumulator.
+    :return: ContingencyAccumulator
+    """
+    merged = ContingencyAccumulator()
+    for accumulator in accumulators:
+        merged.merge(accumulator)
+    return merged
+
+
+def reduce_shard(true_source, cluster_source, chunk_size=1 << 22, true_column=None, pred_column=None):
+    """
+    Partial state of a single shard, i.e., the work done by each worker of evaluate_shards(). The shard is read chunk by
+    chunk where it lives (see pairwise.io.iter_label_chunks for the sources).
+    :param true_source:     Ground-truth labels of the shard (e.g., path to a .npy or Parquet file, or array).
+    :param cluster_source:  Cluster assignments of the shard, row-aligned with the ground-truth.
+    :param chunk_size:      Number of rows read at a time.
+    :param true_column:     Column of the ground-truth labels.
+    :param pred_column:     Column of the cluster assignments.
+    :return: ContingencyAccumulator
+    """
+    # imported here, as pairwise.io builds on this module
+    from pairwise.io import iter_aligned_chunks
+
+    accumulator = ContingencyAccumulator()
+    for true_chunk, pred_chunk in iter_aligned_chunks(true_source, cluster_source, chunk_size, true_column=true_column,
+                                                      pred_column=pred_column):
+        accumulator.update(true_chunk, pred_chunk)
+    return accumulator
+
+
+def _reduce_shards(executor, shards, max_pending, kwargs):
+    # submit shards as they come, with at most max_pending in flight, yielding partials as they finish
+    from concurrent.futures import FIRST_COMPLETED, wait
+
+    pending = set()
+    for true_source, cluster_source in shards:
+        if len(pending) >= max_pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield future.result()
+        pending.add(executor.submit(reduce_shard, true_source, cluster_source, **kwargs))
+    for future in wait(pending)[0]:
+        yield future.result()
+
+
+def evaluate_shards(shards, n_jobs=None, chunk_size=1 << 22, true_column=None, pred_column=None):
+    """
+    Evaluate a cluster assignment split into shards, each reduced by a worker process that reads it itself, and merged.
+    Only the sources of each shard are sent to workers, and only the non-empty cells come back, so the coordinator never
+    holds the labels: shards are best given as files (e.g., one .npy or Parquet file per shard and side).
+    :param shards:      Iterable of (true_source, cluster_source) pairs (see pairwise.io.iter_label_chunks), consumed
+                        as workers become free.
+    :param n_jobs:      Number of worker processes (defaults to the number of CPUs).
+    :param chunk_size:  Number of rows read at a time by each worker.
+    :param true_column: Column of the ground-truth labels.
+    :param pred_column: Column of the cluster assignments.
+    :return: PairwiseReport
+    """
+    # imported here, as process pools pull in most of multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+
+    kwargs = dict(chunk_size=chunk_size, true_column=true_column, pred_column=pred_column)
+    with ProcessPoolExecutor(max_workers=n_jobs) as executor:
+        partials = _reduce_shards(executor, shards, 2 * (n_jobs or os.cpu_count() or 1), kwargs)
+        return merge_accumulators(partials).report()
+
+
+def evaluate_chunks(chunks, buffer_cells=1 << 20):
+    """
+    Evaluate a cluster assignment given as a stream of chunks, e.g.,
+        report = evaluate_chunks((true[i:i + n], pred[i:i + n]) for i in range(0, len(true), n))
+    :param chunks:          Iterable of (true_chunk, pred_chunk) pairs.
+    :param buffer_cells:    See ContingencyAccumulator.
+    :return: PairwiseReport
+    """
+    accumulator = ContingencyAccumulator(buffer_cells=buffer_cells)
+    for true_chunk, pred_chunk in chunks:
+        accumulator.update(true_chunk, pred_chunk)
+    return accumulator.report()
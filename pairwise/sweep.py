@@ -0,0 +1,151 @@
+import time
+import numpy as np
+from pairwise.contingency import pair_stats_batch
+from pairwise.dependencies import import_optional
+from pairwise.encoding import factorize
+from pairwise.instrumentation import NULL_RECORDER
+from pairwise.report import PairwiseReport, SweepResult
+
+
+# Sweep a clustering parameter (e.g., eps of DBSCAN), scoring each clustering against the same ground-truth.
+#
+# Clustering and scoring both run in a pool of worker processes. The feature matrix and the encoded ground-truth are
+# placed in shared memory once, which workers attach to when they start; tasks then only carry the parameter value,
+# and results only the four confusion stats. Results are yielded as they finish. Without multiprocessing.shared_memory
+# (Python < 3.8), the arrays are instead pickled once to each worker when it starts.
+
+# arrays attached by each worker process (see _init_worker)
+_SHARED = {}
+
+
+def dbscan(X, eps, **kwargs):
+    """
+    Default clustering of a sweep: DBSCAN with the swept value as eps (noise is labeled -1).
+    :param X:       Features [ NxD ].
+    :param eps:     Maximum distance between neighboring samples.
+    :param kwargs:  Other arguments of sklearn.cluster.DBSCAN (e.g., min_samples, metric).
+    :return: Cluster assignment [ Nx1 ]
+    """
+    cluster = import_optional('sklearn.cluster')
+    return cluster.DBSCAN(eps=eps, **kwargs).fit(X).labels_
+
+
+def _share(array):
+    try:
+        from multiprocessing import shared_memory
+    except ImportError:
+        return None, array
+    block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+    np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)[...] = array
+    return block, (block.name, array.shape, array.dtype.str)
+
+
+def _attach(spec):
+    if isinstance(spec, np.ndarray):
+        # passed by value (see _share)
+        return None, spec
+    from multiprocessing import shared_memory
+    name, shape, dtype = spec
+    block = shared_memory.SharedMemory(name=name)
+    return block, np.ndarray(shape, dtype=dtype, buffer=block.buf)
+
+
+def _init_worker(features, true_codes, n_classes, cluster_fn, cluster_kwargs):
+    blocks = []
+    for key, spec in (('X', features), ('true_codes', true_codes)):
+        block, _SHARED[key] = _attach(spec)
+        blocks.append(block)
+    # keep the blocks referenced, otherwise the memory is released under the arrays
+    _SHARED.update(blocks=blocks, n_classes=n_classes, cluster_fn=cluster_fn, cluster_kwargs=cluster_kwargs)
+
+
+def _score(X, true_codes, n_classes, cluster_fn, cluster_kwargs, value):
+    # timings travel back with the stats, as workers cannot report to the recorder of the parent process
+    start = time.perf_counter()
+    cluster_ids = cluster_fn(X, value, **cluster_kwargs)
+    clustered = time.perf_counter()
+    stats = pair_stats_batch(true_codes, n_classes, [cluster_ids])
+    seconds = {'cluster': clustered - start, 'score': time.perf_counter() - clustered}
+    return value, {key: int(count[0]) for key, count in stats.items()}, seconds
+
+
+def _run(value):
+    return _score(_SHARED['X'], _SHARED['true_codes'], _SHARED['n_classes'], _SHARED['cluster_fn'],
+                  _SHARED['cluster_kwargs'], value)
+
+
+def iter_sweep(X, true_ids, values, cluster_fn=dbscan, n_jobs=None, recorder=None, **cluster_kwargs):
+    """
+    Cluster and score for each parameter value, yielding results in order of completion.
+    :param X:               Features [ NxD ].
+    :param true_ids:        Ground-truth label [ Nx1 ].
+    :param values:          Parameter values to sweep.
+    :param cluster_fn:      Callable cluster_fn(X, value, **cluster_kwargs) returning a cluster assignment [ Nx1 ];
+                            must be picklable (i.e., defined at module level).
+    :param n_jobs:          Number of worker processes (defaults to the number of CPUs); 1 runs in this process.
+    :param recorder:        pairwise.instrumentation.Recorder adding up the time spent clustering and scoring.
+    :param cluster_kwargs:  Passed on to cluster_fn.
+    :return: generator of (value, confusion stats) tuples
+    """
+    recorder = recorder if recorder is not None else NULL_RECORDER
+    X = np.ascontiguousarray(X)
+    with recorder.stage('encode'):
+        true_codes, classes = factorize(true_ids)
+    recorder.count(samples=len(true_codes), classes=len(classes))
+    for value, stats, seconds in _iter_scores(X, true_codes, len(classes), values, cluster_fn, n_jobs, cluster_kwargs):
+        for stage, elapsed in seconds.items():
+            recorder.add_time(stage, elapsed)
+        recorder.count(values=1)
+        yield value, stats
+
+
+def _iter_scores(X, true_codes, n_classes, values, cluster_fn, n_jobs, cluster_kwargs):
+    if n_jobs == 1:
+        for value in values:
+            yield _score(X, true_codes, n_classes, cluster_fn, cluster_kwargs, value)
+        return
+
+    from concurrent.futures import ProcessPoolExecutor, as_completed
+
+    blocks = []
+    try:
+        block, features = _share(X)
+        blocks.append(block)
+        block, codes = _share(true_codes)
+        blocks.append(block)
+        with ProcessPoolExecutor(max_workers=n_jobs, initializer=_init_worker,
+                                 initargs=(features, codes, n_classes, cluster_fn, cluster_kwargs)) as executor:
+            futures = [executor.submit(_run, value) for value in values]
+            for future in as_completed(futures):
+                yield future.result()
+    finally:
+        for block in blocks:
+            if block is not None:
+                block.close()
+                block.unlink()
+
+
+def sweep(X, true_ids, values, cluster_fn=dbscan, n_jobs=None, callback=None, recorder=None, **cluster_kwargs):
+    """
+    Cluster and score for each parameter value across a pool of processes (see iter_sweep).
+    :param callback:    Called as callback(value, PairwiseReport) whenever a value finishes (e.g., for logging).
+    :param recorder:    pairwise.instrumentation.Recorder reporting the whole sweep as one call.
+    :return: SweepResult
+    """
+    values = list(values)
+    if len(set(values)) != len(values):
+        raise ValueError("Swept values must be unique (got {} values, {} distinct)".format(len(values),
+                                                                                        len(set(values))))
+    recorder = recorder if recorder is not None else NULL_RECORDER
+    results = {}
+    with recorder.call('sweep'):
+        for value, stats in iter_sweep(X, true_ids, values, cluster_fn=cluster_fn, n_jobs=n_jobs, recorder=recorder,
+                                       **cluster_kwargs):
+            results[value] = stats
+            if callback is not None:
+                callback(value, PairwiseReport(stats))
+
+    values = sorted(results)
+    stats = {key: np.array([results[value][key] for value in values], dtype=np.int64)
+             for key in ('TP', 'FP', 'FN', 'TN')}
+    return SweepResult(values, stats)
@@ -0,0 +1,133 @@
+import numpy as np
+from pairwise.encoding import factorize
+from pairwise.report import safe_divide
+
+
+# Verification-style evaluation over all N(N-1)/2 pairs of samples: each pair is scored (e.g., cosine similarity of
+# embeddings), and is genuine when both samples share a label, otherwise an impostor.
+#
+# Pairs are visited in blocks of rows of the (upper triangle of the) score matrix, with scores binned into a histogram
+# per kind of pair. Memory is hence O(N x block) for the scores plus O(bins), and every threshold-based curve (ROC,
+# PR, TAR@FAR) is read off the cumulative histograms, at the resolution of the bins.
+
+
+def score_histograms(labels, embeddings=None, scores=None, bins=4096, score_range=(-1.0, 1.0), block_size=1024):
+    """
+    Histograms of the scores of genuine and impostor pairs.
+    :param labels:      Identity of each sample [ Nx1 ].
+    :param embeddings:  Features [ NxD ], scored by cosine similarity.
+    :param scores:      Alternatively, precomputed similarity matrix [ NxN ] (e.g., np.memmap; only rows of the upper
+                        triangle are read, one block at a time).
+    :param bins:        Number of bins.
+    :param score_range: Range of the scores (scores outside are clipped to the first or last bin).
+    :param block_size:  Number of rows per block.
+    :return: bin edges [ (bins+1)x1 ], genuine counts [ binsx1 ], impostor counts [ binsx1 ]
+    """
+    if (embeddings is None) == (scores is None):
+        raise ValueError("Expected either embeddings or scores")
+    codes = factorize(labels)[0]
+    n_samples = len(codes)
+    if embeddings is not None:
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        embeddings = embeddings / np.maximum(np.linalg.norm(embeddings, axis=1, keepdims=True),
+                                             np.finfo(np.float32).tiny)
+
+    low, high = score_range
+    edges = np.linspace(low, high, bins + 1)
+    genuine = np.zeros(bins, dtype=np.int64)
+    impostor = np.zeros(bins, dtype=np.int64)
+    for start in range(0, n_samples - 1, block_size):
+        stop = min(start + block_size, n_samples)
+        if embeddings is not None:
+            block = embeddings[start:stop] @ embeddings[start + 1:].T
+        else:
+            block = np.asarray(scores[start:stop, start + 1:])
+        # upper triangle only: row i of the block pairs with samples i+1, ..
+        upper = np.arange(block.shape[1])[None, :] >= np.arange(block.shape[0])[:, None]
+        same = codes[start:stop, None] == codes[None, start + 1:]
+
+        indices = np.clip(((block - low) * (bins / (high - low))).astype(np.int64), 0, bins - 1)
+        genuine += np.bincount(indices[upper & same], minlength=bins)
+        impostor += np.bincount(indices[upper & ~same], minlength=bins)
+    return edges, genuine, impostor
+
+
+class VerificationCurves:
+    """
+    ROC and PR curves of pairwise verification, evaluated at each bin edge as threshold (pairs scoring at or above the
+    threshold are accepted).
+    """
+
+    def __init__(self, edges, genuine, impostor):
+        """
+        :param edges:       Bin edges [ (bins+1)x1 ].
+        :param genuine:     Histogram of genuine scores [ binsx1 ].
+        :param impostor:    Histogram of impostor scores [ binsx1 ].
+        """
+        self.thresholds = np.asarray(edges)[:-1]
+        # pairs accepted at each threshold, i.e., reversed cumulative sums
+        self.tp = np.cumsum(np.asarray(genuine)[::-1])[::-1]
+        self.fp = np.cumsum(np.asarray(impostor)[::-1])[::-1]
+        self.n_genuine = int(np.sum(genuine))
+        self.n_impostor = int(np.sum(impostor))
+
+    def __repr__(self):
+        return "VerificationCurves({} genuine, {} impostor pairs)".format(self.n_genuine, self.n_impostor)
+
+    @property
+    def tar(self):
+        """True accept rate (i.e., recall) at each threshold."""
+        return safe_divide(self.tp, self.n_genuine)
+
+    @property
+    def far(self):
+        """False accept rate at each threshold."""
+        return safe_divide(self.fp, self.n_impostor)
+
+    @property
+    def precision(self):
+        return safe_divide(self.tp, self.tp + self.fp)
+
+    def roc(self):
+        """
+        :return: FAR, TAR (arrays over thresholds, in increasing order of FAR)
+        """
+        return self.far[::-1], self.tar[::-1]
+
+    def pr(self):
+        """
+        :return: Recall, precision (arrays over thresholds, in increasing order of recall)
+        """
+        return self.tar[::-1], self.precision[::-1]
+
+    def auc(self):
+        """Area under the ROC curve (trapezoidal, between bin edges)."""
+        far, tar = self.roc()
+        far, tar = np.r_[0.0, far], np.r_[0.0, tar]
+        return float(np.sum(np.diff(far) * (tar[1:] + tar[:-1]) / 2))
+
+    def tar_at_far(self, far):
+        """
+        TAR at the lowest threshold whose FAR does not exceed each target.
+        :param far: Target FAR (scalar or array).
+        :return: (TAR, threshold) at each target
+        """
+        targets = np.atleast_1d(np.asarray(far, dtype=np.float64))
+        rates = self.far
+        tar, thresholds = np.zeros(len(targets)), np.full(len(targets), np.inf)
+        for i, target in enumerate(targets):
+            allowed = np.flatnonzero(rates <= target)
+            if len(allowed):
+                tar[i], thresholds[i] = self.tar[allowed[0]], self.thresholds[allowed[0]]
+        if np.ndim(far) == 0:
+            return tar[0], thresholds[0]
+        return tar, thresholds
+
+
+def verification_curves(labels, embeddings=None, scores=None, bins=4096, score_range=(-1.0, 1.0), block_size=1024):
+    """
+    ROC/PR curves and TAR@FAR over all pairs of samples (see score_histograms for the arguments).
+    :return: VerificationCurves
+    """
+    return VerificationCurves(*score_histograms(labels, embeddings=embeddings, scores=scores, bins=bins,
+                                                score_range=score_range, block_size=block_size))
@@ -15,12 +15,12 @@ VERSION = '0.1.0'
 
 # What packages are required for this module to be executed?
 REQUIRED = [
-    # 'requests', 'maya', 'records',
+    'numpy',
 ]
 
 # What packages are optional?
 EXTRAS = {
-    # 'fancy feature': ['django'],
+    'experiments': ['scikit-learn', 'pandas'],
 }
 
 here = os.path.abspath(os.path.dirname(__file__))
@@ -97,14 +97,15 @@ setup(
     # If package is a single module, use this instead of 'packages':
     # py_modules=['mypackage'],
 
-    # entry_points={
-    #     'console_scripts': ['mycli=mymodule:cli'],
-    # },
+    entry_points={
+        'console_scripts': ['pairwise-eval=pairwise.cli:main'],
+    },
     python_requires=REQUIRES_PYTHON,
     include_package_data=True,
+    install_requires=REQUIRED,
     extras_require=EXTRAS,
     license='MIT',
 
-    packages=find_packages(exclude=["tests", "*.tests", "*.tests.*", "tests.*", "docs"]),
+    packages=find_packages(exclude=["tests", "*.tests", "*.tests.*", "tests.*", "docs", "benchmarks"]),
 )
 
@@ -4,4 +4,37 @@ import sys
 import os
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
+from itertools import combinations
 from pairwise.metrics import Metrics, nchoosek
+from pairwise.encoding import factorize
+from pairwise.contingency import Contingency, SparseContingency, count_pairs, weighted_pair_stats
+from pairwise.report import PairwiseReport, SweepResult
+from pairwise.streaming import ContingencyAccumulator, evaluate_chunks, evaluate_shards, merge_accumulators
+from pairwise.sweep import iter_sweep, sweep
+from pairwise.hierarchy import MergeTally, linkage_curve
+from pairwise.graph import candidate_edges, threshold_curve
+from pairwise.verification import VerificationCurves, score_histograms, verification_curves
+from pairwise.attribution import ErrorBreakdown, error_breakdown
+from pairwise.error_pairs import iter_false_negatives, iter_false_positives
+from pairwise.bootstrap import BootstrapResult, bootstrap
+from pairwise.approximate import ApproximateReport, approximate_confusion
+from pairwise.instrumentation import NULL_RECORDER, LogReporter, Recorder
+from pairwise.io import evaluate_files, iter_column_chunks, iter_label_chunks
+from pairwise.cli import main
+from pairwise.online import OnlineEvaluator
+from pairwise.groundtruth import GroundTruthIndex
+
+
+def brute_force_stats(true_ids, cluster_ids):
+    """
+    Reference confusion stats by visiting every pair of samples (only feasible for small N).
+    """
+    stats = {'TP': 0, 'FP': 0, 'FN': 0, 'TN': 0}
+    for i, j in combinations(range(len(true_ids)), 2):
+        same_class = true_ids[i] == true_ids[j]
+        same_cluster = cluster_ids[i] == cluster_ids[j]
+        if same_cluster:
+            stats['TP' if same_class else 'FP'] += 1
+        else:
+            stats['FN' if same_class else 'TN'] += 1
+    return stats
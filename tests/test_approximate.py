@@ -0,0 +1,98 @@
+import numpy as np
+import pytest
+from .context import Metrics, approximate_confusion
+from pairwise.approximate import normal_quantile
+from pairwise.helpers import DATA_SET_A, DATA_SET_C
+
+mm = Metrics(cache_size=0)
+
+
+def synthetic(n_samples=200000, n_classes=5000, noise=0.1, seed=0):
+    rng = np.random.RandomState(seed)
+    true_ids = rng.zipf(1.5, size=n_samples) % n_classes
+    cluster_ids = np.where(rng.rand(n_samples) < noise, rng.randint(0, n_classes, size=n_samples), true_ids)
+    return true_ids, cluster_ids
+
+
+def test_normal_quantile():
+    assert normal_quantile(0.5) == pytest.approx(0.0, abs=1e-9)
+    assert normal_quantile(0.975) == pytest.approx(1.959964, abs=1e-6)
+
+
+@pytest.mark.parametrize("data", [DATA_SET_A, DATA_SET_C])
+def test_helpers_data(data):
+    """
+    Estimates are within bounds of the exact metrics of the example data
+    """
+    exact = mm.evaluate(data['Y'], data['YP'])
+    report = approximate_confusion(data['Y'], data['YP'], n_pairs=20000, random_state=0)
+    assert report.n_sampled == 20000
+    assert report.stats['TP'] + report.stats['FP'] == exact.tp + exact.fp
+    assert report.stats['TP'] + report.stats['FN'] == exact.tp + exact.fn
+    assert sum(report.stats.values()) == pytest.approx(sum(exact.stats.values()))
+    for metric in ('precision', 'recall'):
+        low, high = report.intervals[metric]
+        assert low <= getattr(exact, metric) <= high, metric
+    low, high = report.intervals['TP']
+    assert low <= exact.tp <= high
+
+
+def test_synthetic():
+    """
+    Estimates of large synthetic data are close to the exact metrics
+    """
+    true_ids, cluster_ids = synthetic()
+    exact = mm.evaluate(true_ids, cluster_ids)
+    report = approximate_confusion(true_ids, cluster_ids, n_pairs=50000, random_state=1)
+    for metric in ('precision', 'recall'):
+        low, high = report.intervals[metric]
+        assert low <= getattr(exact, metric) <= high, metric
+        assert high - low < 0.02
+    assert report.f1score == pytest.approx(exact.f1score, abs=0.01)
+
+    subsampled = approximate_confusion(true_ids, cluster_ids, n_pairs=50000, max_samples=50000, random_state=1)
+    assert subsampled.precision == pytest.approx(exact.precision, abs=0.05)
+    assert subsampled.recall == pytest.approx(exact.recall, abs=0.05)
+
+
+def test_list_input():
+    true_ids, cluster_ids = synthetic(n_samples=1000)
+    report = approximate_confusion(true_ids.tolist(), cluster_ids.tolist(), n_pairs=1000, max_samples=100,
+                                   random_state=0)
+    assert report.n_sampled == 1000
+
+
+def test_time_budget():
+    true_ids, cluster_ids = synthetic(n_samples=10000)
+    report = approximate_confusion(true_ids, cluster_ids, n_pairs=None, time_budget=0.05, random_state=0)
+    assert report.n_sampled > 0
+
+
+def test_budget_required():
+    with pytest.raises(ValueError):
+        approximate_confusion(DATA_SET_A['Y'], DATA_SET_A['YP'], n_pairs=None)
+
+
+def test_consistent_bounds():
+    """
+    Every estimate lies within its own bounds, and precision and recall follow from the estimated TP
+    """
+    true_ids, cluster_ids = synthetic(n_samples=20000)
+    for seed in range(5):
+        report = approximate_confusion(true_ids, cluster_ids, n_pairs=2000, random_state=seed)
+        assert report.intervals['TP'][0] <= report.tp <= report.intervals['TP'][1]
+        for metric in ('precision', 'recall'):
+            low, high = report.intervals[metric]
+            assert low <= getattr(report, metric) <= high, metric
+        assert report.precision == pytest.approx(report.tp / (report.tp + report.fp))
+        assert report.intervals['precision'][1] == pytest.approx(report.intervals['TP'][1] / (report.tp + report.fp))
+
+
+def test_no_pairs():
+    """
+    All singletons: nothing to sample, and nothing positive
+    """
+    labels = np.arange(100)
+    report = approximate_confusion(labels, labels, random_state=0)
+    assert report.n_sampled == 0
+    assert report.stats == {'TP': 0, 'FP': 0, 'FN': 0, 'TN': 4950}
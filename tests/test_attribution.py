@@ -0,0 +1,43 @@
+import numpy as np
+import pytest
+from .context import Metrics, brute_force_stats, error_breakdown
+from pairwise.helpers import DATA_SET_A
+
+mm = Metrics(cache_size=0)
+
+
+def test_breakdown():
+    """
+    Test pairwise.attribution.error_breakdown() on DATA_SET_A
+    """
+    breakdown = mm.error_breakdown(DATA_SET_A['Y'], DATA_SET_A['YP'])
+    # clusters: {0: 1x0, 5x1}, {1: 4x0, 1x1, 1x2}, {2: 2x1, 3x2}
+    assert breakdown.cluster_tp.tolist() == [10, 6, 4]
+    assert breakdown.cluster_fp.tolist() == [5, 9, 6]
+    assert breakdown.class_fn.tolist() == [4, 17, 3]
+    assert breakdown.cluster_tp.sum() == DATA_SET_A['stats']['TP']
+    assert breakdown.cluster_fp.sum() == DATA_SET_A['stats']['FP']
+    assert breakdown.class_fn.sum() == DATA_SET_A['stats']['FN']
+
+    clusters, fp = breakdown.worst_clusters(k=2)
+    assert clusters.tolist() == [1, 2] and fp.tolist() == [9, 6]
+    classes, fn = breakdown.worst_classes(k=1)
+    assert classes.tolist() == [1] and fn.tolist() == [17]
+    classes, splits = breakdown.most_split_classes(k=1)
+    assert classes.tolist() == [1] and splits.tolist() == [3]
+
+
+@pytest.mark.parametrize("sparse", [False, True])
+def test_breakdown_per_cluster(sparse):
+    """
+    FP of each cluster, counted pair by pair within the cluster
+    """
+    rng = np.random.RandomState(0)
+    true_ids = rng.randint(0, 5, size=150)
+    cluster_ids = np.array(['c{}'.format(c) for c in rng.randint(0, 12, size=150)])
+    breakdown = error_breakdown(true_ids, cluster_ids, sparse=sparse)
+    for cluster, fp in zip(breakdown.clusters, breakdown.cluster_fp):
+        members = true_ids[cluster_ids == cluster]
+        assert fp == brute_force_stats(members, np.zeros_like(members))['FP']
+    assert breakdown.class_fn.sum() == mm.calculate_fn(true_ids, cluster_ids)
+    assert len(breakdown.worst_clusters(k=100)[0]) == 12
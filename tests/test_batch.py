@@ -0,0 +1,38 @@
+import numpy as np
+import pytest
+from .context import Metrics
+from pairwise.helpers import DATA_SET_A, LABEL_SET_2, CLUSTER_SET_2
+
+mm = Metrics(cache_size=0)
+
+
+def test_batch_matches_single():
+    """
+    Test pairwise.metrics.Metrics.evaluate_batch() agrees with evaluating each assignment separately
+    """
+    rng = np.random.RandomState(0)
+    true_ids = rng.randint(0, 9, size=200)
+    batch = rng.randint(-1, 15, size=(6, 200))
+    report = mm.evaluate_batch(true_ids, batch)
+
+    for i, cluster_ids in enumerate(batch):
+        single = mm.evaluate(true_ids, cluster_ids)
+        for key in single.stats:
+            assert report.stats[key][i] == single.stats[key]
+        for name in single.metric_names:
+            assert getattr(report, name)[i] == pytest.approx(getattr(single, name))
+
+
+def test_batch_iterable():
+    """
+    Assignments may be passed lazily (e.g., a generator over clustering results)
+    """
+    labelings = (y for y in [DATA_SET_A['YP'], CLUSTER_SET_2])
+    report = mm.evaluate_batch(LABEL_SET_2, labelings)
+    assert report.precision[0] == DATA_SET_A['P']
+    assert report.tp[1] == mm.calculate_tp(LABEL_SET_2, CLUSTER_SET_2)
+
+
+def test_batch_shape_mismatch():
+    with pytest.raises(ValueError):
+        mm.evaluate_batch(DATA_SET_A['Y'], [DATA_SET_A['YP'][:-1]])
@@ -0,0 +1,44 @@
+import numpy as np
+import pytest
+from .context import Metrics
+from benchmarks.generators import CASES, make_labels
+from benchmarks.run_benchmarks import compare, main, run
+
+mm = Metrics(cache_size=0)
+
+
+@pytest.mark.parametrize("case", sorted(CASES))
+def test_generators(case):
+    true_ids, cluster_ids = make_labels(1000, **CASES[case])
+    assert len(true_ids) == len(cluster_ids) == 1000
+    stats = mm.confusion_matrix_values(true_ids, cluster_ids)
+    assert sum(stats.values()) == 1000 * 999 // 2
+    assert 0 < stats['TP'] and 0 < stats['FN']
+
+
+def test_generator_options():
+    true_ids, cluster_ids = make_labels(10000, singletons=0.2, noise=0.1, random_state=1)
+    assert 0.05 < np.mean(cluster_ids == -1) < 0.15
+    sizes = np.unique(cluster_ids[cluster_ids != -1], return_counts=True)[1]
+    assert np.sum(sizes == 1) > 1500
+    with pytest.raises(ValueError):
+        make_labels(10, skew='normal')
+
+
+def test_run_and_compare():
+    results = run([500], ['uniform'], targets=['confusion_matrix_values', 'sweep'], repeat=1, log=lambda line: None)
+    assert [row['target'] for row in results] == ['confusion_matrix_values', 'sweep']
+    assert all(row['seconds'] > 0 and row['peak_bytes'] > 0 for row in results)
+
+    baseline = {'results': [dict(row, seconds=row['seconds'] * 2) for row in results]}
+    assert compare(results, baseline) == []
+    baseline = {'results': [dict(results[0], seconds=results[0]['seconds'] / 2)]}
+    regressions = compare(results, baseline)
+    assert len(regressions) == 1 and regressions[0][2] == pytest.approx(2)
+
+
+def test_missing_baseline(tmp_path, capsys):
+    with pytest.raises(SystemExit) as exit_info:
+        main(['--sizes', '100', '--compare', str(tmp_path / 'baseline.json')])
+    assert exit_info.value.code == 2
+    assert 'no baseline' in capsys.readouterr().err
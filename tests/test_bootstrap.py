@@ -0,0 +1,82 @@
+import numpy as np
+from itertools import combinations
+import pytest
+from .context import Metrics, bootstrap
+from pairwise.bootstrap import _replicate_stats
+from pairwise.helpers import DATA_SET_A
+
+mm = Metrics(cache_size=0)
+
+
+class FixedDraws:
+    """
+    Stands in for np.random.RandomState, returning given multinomial draws
+    """
+
+    def __init__(self, draws):
+        self.draws = np.asarray(draws)
+
+    def multinomial(self, n, pvals, size):
+        assert self.draws.shape == (size, len(pvals)) and np.all(self.draws.sum(axis=1) == n)
+        return self.draws
+
+
+def cells(true_ids, cluster_ids):
+    table = mm.contingency(true_ids, cluster_ids, sparse=False)
+    rows, cols, counts = table.cells()
+    return rows, cols, counts, table.n_clusters, table.n_classes
+
+
+def test_sample_replicate():
+    """
+    Stats of resampled cell counts equal those of the corresponding resampled labels
+    """
+    rows, cols, counts, n_clusters, n_classes = cells(DATA_SET_A['Y'], DATA_SET_A['YP'])
+    draws = np.array([counts, counts[::-1], np.r_[17, np.zeros(len(counts) - 1, dtype=int)]])
+    stats = _replicate_stats(rows, cols, counts, n_clusters, n_classes, 3, 'sample', FixedDraws(draws))
+    for b, draw in enumerate(draws):
+        expected = mm.confusion_matrix_values(np.repeat(cols, draw), np.repeat(rows, draw))
+        assert {key: stats[key][b] for key in expected} == expected
+
+
+def test_class_replicate():
+    """
+    Stats of class multiplicities equal counting pairs of labels with classes repeated, except pairs across copies
+    """
+    true_ids, cluster_ids = DATA_SET_A['Y'], DATA_SET_A['YP']
+    rows, cols, counts, n_clusters, n_classes = cells(true_ids, cluster_ids)
+    draws = np.array([[1, 1, 1], [3, 0, 0], [0, 2, 1]])
+    stats = _replicate_stats(rows, cols, counts, n_clusters, n_classes, 3, 'class', FixedDraws(draws))
+    for b, multiplicity in enumerate(draws):
+        samples = [(label, copy, cluster) for label, copies in enumerate(multiplicity) for copy in range(copies)
+                   for cluster in cluster_ids[true_ids == label]]
+        expected = {'TP': 0, 'FP': 0, 'FN': 0, 'TN': 0}
+        for (label_a, copy_a, cluster_a), (label_b, copy_b, cluster_b) in combinations(samples, 2):
+            if label_a == label_b and copy_a != copy_b:
+                continue
+            if cluster_a == cluster_b:
+                expected['TP' if label_a == label_b else 'FP'] += 1
+            else:
+                expected['FN' if label_a == label_b else 'TN'] += 1
+        assert {key: stats[key][b] for key in expected} == expected
+
+
+@pytest.mark.parametrize("level", ['sample', 'class'])
+def test_intervals(level):
+    """
+    Test pairwise.bootstrap.bootstrap() intervals cover the estimate
+    """
+    rng = np.random.RandomState(0)
+    true_ids = rng.randint(0, 30, size=2000)
+    cluster_ids = np.where(rng.rand(2000) < 0.8, true_ids, rng.randint(0, 40, size=2000))
+    result = bootstrap(true_ids, cluster_ids, n_replicates=400, level=level, random_state=0, batch_cells=5000)
+    assert len(result.replicates.tp) == 400
+    assert result.estimate.stats == mm.confusion_matrix_values(true_ids, cluster_ids)
+    for metric, (estimate, low, high) in result.summary().items():
+        assert low <= estimate <= high, metric
+    assert 0 < result.standard_error('precision') < 0.1
+
+
+def test_unknown_level():
+    with pytest.raises(ValueError):
+        bootstrap(DATA_SET_A['Y'], DATA_SET_A['YP'], level='cluster')
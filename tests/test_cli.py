@@ -0,0 +1,90 @@
+import csv
+import json
+import numpy as np
+import pytest
+from .context import Metrics, main
+from pairwise.io import evaluate_joined
+
+mm = Metrics(cache_size=0)
+
+
+@pytest.fixture
+def labels():
+    rng = np.random.RandomState(0)
+    true_ids = rng.randint(0, 40, size=3000)
+    cluster_ids = np.where(rng.rand(3000) < 0.8, true_ids, rng.randint(0, 50, size=3000))
+    return true_ids, cluster_ids
+
+
+def write_csv(path, header, rows):
+    with open(str(path), 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(header)
+        writer.writerows(rows)
+
+
+def run(argv, tmp_path):
+    assert main(argv + ['-o', str(tmp_path / 'report.json')]) == 0
+    with open(str(tmp_path / 'report.json')) as f:
+        return json.load(f)
+
+
+def test_aligned_files(labels, tmp_path):
+    """
+    Each prediction file is reported (in order), with stats as Metrics computes them
+    """
+    true_ids, cluster_ids = labels
+    np.save(str(tmp_path / 'true.npy'), true_ids)
+    np.save(str(tmp_path / 'a.npy'), cluster_ids)
+    np.save(str(tmp_path / 'b.npy'), true_ids)
+    report = run([str(tmp_path / name) for name in ('true.npy', 'a.npy', 'b.npy')] + ['--chunk-size', '1000',
+                                                                                       '--jobs', '2', '--beta', '2'],
+                 tmp_path)
+    first, second = report['results']
+    assert first['predictions'].endswith('a.npy') and second['predictions'].endswith('b.npy')
+    expected = mm.evaluate(true_ids, cluster_ids)
+    assert {key: first['metrics'][key] for key in expected.stats} == expected.stats
+    assert first['metrics']['fbeta'] == pytest.approx(mm.fbeta_score(true_ids, cluster_ids, beta=2))
+    assert second['metrics']['precision'] == 1.0 and second['metrics']['FP'] == 0
+
+
+def test_key_join(labels, tmp_path):
+    """
+    Shuffled predictions with missing and unknown keys are joined on the ground-truth keys
+    """
+    true_ids, cluster_ids = labels
+    order = np.random.RandomState(1).permutation(len(true_ids))[:2500]
+    write_csv(tmp_path / 'truth.csv', ['label', 'path'], [(label, 'img{}'.format(i)) for i, label in
+                                                          enumerate(true_ids)])
+    write_csv(tmp_path / 'pred.csv', ['path', 'cluster'], [('img{}'.format(i), cluster_ids[i]) for i in order] +
+              [('unknown', 0)])
+    report = run([str(tmp_path / 'truth.csv'), str(tmp_path / 'pred.csv'), '--key', 'path', '--truth-column', 'label',
+                  '--pred-column', 'cluster', '--chunk-size', '700'], tmp_path)
+    result, = report['results']
+    assert result['join'] == {'matched': 2500, 'unmatched': 1, 'missing': 500}
+    expected = mm.confusion_matrix_values(true_ids[order], cluster_ids[order])
+    assert {key: result['metrics'][key] for key in expected} == expected
+
+
+def test_numeric_and_text_keys(labels, tmp_path):
+    true_ids, cluster_ids = labels
+    keys = np.arange(len(true_ids)) * 7
+    write_csv(tmp_path / 'pred.csv', ['id', 'cluster'], zip(keys[::-1], cluster_ids[::-1]))
+    pa = pytest.importorskip('pyarrow')
+    truth = pa.table({'id': keys, 'label': true_ids})
+    report, join = evaluate_joined(truth, str(tmp_path / 'pred.csv'), 'id', 'id', true_column='label',
+                                   pred_column='cluster', chunk_size=1000)
+    assert join == {'matched': len(keys), 'unmatched': 0, 'missing': 0}
+    assert report.stats == mm.confusion_matrix_values(true_ids, cluster_ids)
+
+
+def test_errors(labels, tmp_path, capsys):
+    true_ids, cluster_ids = labels
+    np.save(str(tmp_path / 'true.npy'), true_ids)
+    np.save(str(tmp_path / 'short.npy'), cluster_ids[:10])
+    assert main([str(tmp_path / 'true.npy'), str(tmp_path / 'short.npy')]) == 1
+    assert 'error' in capsys.readouterr().err
+    write_csv(tmp_path / 'truth.csv', ['path', 'label'], [('a', 1), ('a', 2)])
+    assert main([str(tmp_path / 'truth.csv'), str(tmp_path / 'truth.csv'), '--key', 'path', '--truth-column', 'label',
+                 '--pred-column', 'label']) == 1
+    assert 'duplicate' in capsys.readouterr().err
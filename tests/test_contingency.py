@@ -0,0 +1,99 @@
+import numpy as np
+import pytest
+from .context import Contingency, Metrics, SparseContingency, brute_force_stats, count_pairs, \
+    evaluate_chunks
+from pairwise.helpers import DATA_SET_A, LABEL_SET_2, CLUSTER_SET_2
+
+mm = Metrics()
+
+
+def test_table():
+    """
+    Test pairwise.metrics.Metrics.contingency() counts samples per (cluster, class)
+    """
+    table = mm.contingency(DATA_SET_A['Y'], DATA_SET_A['YP'])
+    assert table.table.tolist() == [[1, 5, 0], [4, 1, 1], [0, 2, 3]]
+    assert table.cluster_sizes.tolist() == [6, 6, 5]
+    assert table.class_sizes.tolist() == [5, 8, 4]
+    assert table.n_samples == DATA_SET_A['N']
+
+
+def test_pair_stats():
+    """
+    Test pairwise.contingency.Contingency.pair_stats() against expected stats
+    """
+    stats = mm.contingency(DATA_SET_A['Y'], DATA_SET_A['YP']).pair_stats()
+    assert stats == DATA_SET_A['stats']
+
+
+def test_noise_label():
+    """
+    DBSCAN noise (i.e., -1) is treated as any other cluster ID
+    """
+    assert mm.confusion_matrix_values(LABEL_SET_2, CLUSTER_SET_2) == brute_force_stats(LABEL_SET_2, CLUSTER_SET_2)
+
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_random_labels(seed):
+    """
+    Compare against counting each pair explicitly
+    """
+    rng = np.random.RandomState(seed)
+    true_ids = rng.randint(0, 7, size=120)
+    cluster_ids = rng.randint(-1, 12, size=120)
+    assert mm.confusion_matrix_values(true_ids, cluster_ids) == brute_force_stats(true_ids, cluster_ids)
+
+
+def test_count_pairs():
+    assert count_pairs([0, 1, 2, 4, 10]) == 0 + 0 + 1 + 6 + 45
+
+
+def test_mismatched_shapes():
+    with pytest.raises(ValueError):
+        Contingency.from_codes([0, 1, 1], [0, 1])
+
+
+def test_count_pairs_large():
+    """
+    Sums beyond int64 fall back to exact Python integers
+    """
+    assert count_pairs([2 ** 33, 2 ** 33]) == 2 * (2 ** 33 * (2 ** 33 - 1) // 2)
+
+
+@pytest.mark.parametrize("seed", [0, 1])
+def test_sparse_matches_dense(seed):
+    """
+    Test pairwise.contingency.SparseContingency gives the same cells and stats as the dense table
+    """
+    rng = np.random.RandomState(seed)
+    true_ids = rng.randint(0, 7, size=300)
+    cluster_ids = rng.randint(-1, 40, size=300)
+    dense = mm.contingency(true_ids, cluster_ids, sparse=False)
+    sparse = mm.contingency(true_ids, cluster_ids, sparse=True)
+    assert isinstance(sparse, SparseContingency)
+    assert np.array_equal(sparse.toarray(), dense.table)
+    assert np.array_equal(sparse.cluster_sizes, dense.cluster_sizes)
+    assert np.array_equal(sparse.class_sizes, dense.class_sizes)
+    assert sparse.pair_stats() == dense.pair_stats() == brute_force_stats(true_ids, cluster_ids)
+
+
+def test_sparse_many_clusters_and_classes():
+    """
+    Dense K x C would need 10^10 cells; the sparse table only holds the non-empty ones
+    """
+    rng = np.random.RandomState(0)
+    true_ids = rng.randint(0, 100000, size=200000)
+    cluster_ids = true_ids // 2 + rng.randint(0, 2, size=200000) * 50000
+    table = mm.contingency(true_ids, cluster_ids)
+    assert isinstance(table, SparseContingency)
+    assert table.n_clusters * table.n_classes > 10 ** 9
+    assert len(table.counts) <= len(true_ids)
+    stats = table.pair_stats()
+    assert sum(stats.values()) == count_pairs([len(true_ids)])
+    assert stats == evaluate_chunks([(true_ids, cluster_ids)]).stats
+
+
+def test_to_scipy():
+    pytest.importorskip('scipy.sparse')
+    table = mm.contingency(DATA_SET_A['Y'], DATA_SET_A['YP'], sparse=True)
+    assert table.to_scipy().toarray().tolist() == [[1, 5, 0], [4, 1, 1], [0, 2, 3]]
@@ -0,0 +1,45 @@
+import numpy as np
+import pytest
+from .context import Metrics, factorize
+from pairwise.helpers import DATA_SET_A
+
+
+@pytest.mark.parametrize("labels", [
+    np.array([3, 1, 1, 7, 3]),                          # sparse integers
+    np.array([-1, 0, 2, -1, 5]),                        # DBSCAN noise
+    np.array([0, 1, 2, 1, 0]),                          # already encoded
+    np.array([10 ** 12, 5, 5, 10 ** 9]),                # IDs too far apart for a lookup table
+    np.array([-128, 127, 0], dtype=np.int8),
+    np.array(['b', 'a', 'b', 'c']),
+    np.array([1.0, 3.0, 1.0]),
+    np.array([0.5, 0.1, 0.5]),
+    np.array([True, False, True]),
+    np.array(['x', ('t', 1), 'x', 7], dtype=object),
+])
+def test_factorize(labels):
+    """
+    Test pairwise.encoding.factorize() codes are 0, .., M-1 and map back to the labels
+    """
+    codes, uniques = factorize(labels)
+    assert len(uniques) == len(set(labels.tolist()))
+    assert sorted(set(codes.tolist())) == list(range(len(uniques)))
+    assert uniques[codes].tolist() == labels.tolist()
+    assert codes.dtype == np.uint8
+
+
+def test_factorize_dtype():
+    """
+    Codes use the smallest unsigned integer type
+    """
+    assert factorize(np.arange(300))[0].dtype == np.uint16
+    assert factorize(np.arange(70000))[0].dtype == np.uint32
+
+
+def test_label_types():
+    """
+    Same confusion stats whatever the type of the labels
+    """
+    mm = Metrics(cache_size=0)
+    true_ids = np.array(['id{}'.format(i) for i in DATA_SET_A['Y']], dtype=object)
+    cluster_ids = DATA_SET_A['YP'].astype(float) * 100 - 1
+    assert mm.confusion_matrix_values(true_ids, cluster_ids) == DATA_SET_A['stats']
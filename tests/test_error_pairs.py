@@ -0,0 +1,69 @@
+import numpy as np
+from itertools import combinations
+from .context import Metrics, iter_false_negatives, iter_false_positives
+from pairwise.helpers import DATA_SET_A, LABEL_SET_2, CLUSTER_SET_2
+
+mm = Metrics(cache_size=0)
+
+
+def brute_force_pairs(true_ids, cluster_ids):
+    fp, fn = set(), set()
+    for i, j in combinations(range(len(true_ids)), 2):
+        if cluster_ids[i] == cluster_ids[j] and true_ids[i] != true_ids[j]:
+            fp.add((cluster_ids[i], i, j))
+        elif cluster_ids[i] != cluster_ids[j] and true_ids[i] == true_ids[j]:
+            fn.add((true_ids[i], i, j))
+    return fp, fn
+
+
+def test_all_pairs():
+    """
+    Test pairwise.error_pairs generates each FP and FN pair exactly once
+    """
+    for true_ids, cluster_ids in [(DATA_SET_A['Y'], DATA_SET_A['YP']), (LABEL_SET_2, CLUSTER_SET_2)]:
+        fp, fn = brute_force_pairs(true_ids, cluster_ids)
+        generated = list(iter_false_positives(true_ids, cluster_ids))
+        assert len(generated) == len(set(generated)) == mm.calculate_fp(true_ids, cluster_ids)
+        assert set(generated) == fp
+        generated = list(iter_false_negatives(true_ids, cluster_ids, shuffle=True, random_state=0))
+        assert len(generated) == mm.calculate_fn(true_ids, cluster_ids)
+        assert set(generated) == fn
+
+
+def test_limits():
+    fp, _ = brute_force_pairs(DATA_SET_A['Y'], DATA_SET_A['YP'])
+    pairs = list(iter_false_positives(DATA_SET_A['Y'], DATA_SET_A['YP'], limit=7))
+    assert len(pairs) == 7 and set(pairs) <= fp
+    pairs = list(iter_false_positives(DATA_SET_A['Y'], DATA_SET_A['YP'], per_group=2))
+    assert len(pairs) == 6
+    assert sorted(cluster for cluster, _, _ in pairs) == [0, 0, 1, 1, 2, 2]
+
+
+def test_lazy_on_large_input():
+    """
+    First pairs are produced without enumerating all (i.e., ~10^11 here)
+    """
+    rng = np.random.RandomState(0)
+    true_ids = rng.randint(0, 1000, size=10 ** 6)
+    cluster_ids = rng.randint(0, 2, size=10 ** 6)
+    pairs = list(iter_false_positives(true_ids, cluster_ids, limit=5, shuffle=True, random_state=1))
+    assert len(pairs) == 5
+    for cluster, i, j in pairs:
+        assert cluster_ids[i] == cluster_ids[j] == cluster and true_ids[i] != true_ids[j]
+
+
+def test_shuffled_pairs_spread():
+    """
+    First pairs of a shuffled group are spread over its samples and sub-groups, rather than all sharing a sample
+    """
+    rng = np.random.RandomState(0)
+    true_ids = rng.randint(0, 10, size=1000)
+    cluster_ids = np.zeros(1000, dtype=int)
+    pairs = list(iter_false_positives(true_ids, cluster_ids, per_group=50, shuffle=True, random_state=0))
+    assert len(pairs) == 50
+    samples = [i for _, i, _ in pairs] + [j for _, _, j in pairs]
+    assert max(np.bincount(samples)) <= 2
+    assert len(set(true_ids[samples])) == 10
+    for _, i, j in pairs:
+        assert true_ids[i] != true_ids[j]
+    assert pairs != list(iter_false_positives(true_ids, cluster_ids, per_group=50, shuffle=True, random_state=1))
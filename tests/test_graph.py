@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+from .context import Metrics, threshold_curve, candidate_edges
+
+mm = Metrics(cache_size=0)
+
+
+def components(n, sources, targets):
+    """
+    Reference connected components by relabeling until stable
+    """
+    labels = np.arange(n)
+    changed = True
+    while changed:
+        low = np.minimum(labels[sources], labels[targets])
+        before = labels.copy()
+        np.minimum.at(labels, sources, low)
+        np.minimum.at(labels, targets, low)
+        changed = not np.array_equal(before, labels)
+    return labels
+
+
+def toy_data(seed=0, n=120):
+    rng = np.random.RandomState(seed)
+    true_ids = rng.randint(0, 5, size=n)
+    X = true_ids[:, None] * 2.0 + rng.normal(scale=0.7, size=(n, 3))
+    return X, true_ids
+
+
+@pytest.mark.parametrize("metric", ['euclidean', 'cosine'])
+def test_threshold_curve(metric):
+    """
+    Test pairwise.graph.threshold_curve() against scoring the components at each threshold
+    """
+    X, true_ids = toy_data()
+    thresholds = [0.9, 0.1, 0.5, 2.0] if metric == 'euclidean' else [0.2, 0.01, 0.05]
+    result = threshold_curve(true_ids, thresholds, X=X, metric=metric, block_size=32)
+    sources, targets, distances = candidate_edges(X, max(thresholds), metric=metric)
+    for i, t in enumerate(thresholds):
+        within = distances <= t
+        expected = mm.confusion_matrix_values(true_ids, components(len(X), sources[within], targets[within]))
+        assert {key: result.report.stats[key][i] for key in expected} == expected
+    assert result.values.tolist() == thresholds
+
+
+def test_edge_list():
+    """
+    Edges of a (kNN) graph are used as given
+    """
+    true_ids = np.array([0, 0, 1, 1, 1])
+    edges = (np.array([0, 2, 3, 1]), np.array([1, 3, 4, 2]), np.array([0.1, 0.2, 0.3, 0.9]))
+    result = threshold_curve(true_ids, [0.0, 0.25, 0.5, 1.0], edges=edges)
+    assert result.report.tp.tolist() == [0, 2, 4, 4]
+    assert result.report.fp.tolist() == [0, 0, 0, 6]
+
+
+def test_edges_or_features():
+    with pytest.raises(ValueError):
+        threshold_curve([0, 1], [0.5])
@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+from concurrent.futures import ProcessPoolExecutor
+from .context import GroundTruthIndex, Metrics
+from pairwise.helpers import DATA_SET_A
+
+mm = Metrics(cache_size=0)
+
+
+def score_saved(path, cluster_ids):
+    # worker of test_shared_between_processes
+    return GroundTruthIndex.load(path).pair_stats(cluster_ids)
+
+
+def test_from_labels():
+    index = GroundTruthIndex.from_labels(DATA_SET_A['Y'])
+    assert len(index) == 17 and index.n_classes == 3
+    assert index.nsame == DATA_SET_A['stats']['TP'] + DATA_SET_A['stats']['FN']
+    assert index.evaluate(DATA_SET_A['YP']).stats == DATA_SET_A['stats']
+    assert mm.evaluate(index, DATA_SET_A['YP']).stats == DATA_SET_A['stats']
+    with pytest.raises(ValueError):
+        index.evaluate(DATA_SET_A['YP'][:-1])
+
+
+def test_save_and_load(tmp_path):
+    """
+    Saved index is memory-mapped read-only and evaluates as the raw labels do
+    """
+    rng = np.random.RandomState(0)
+    names = np.array(['person-{}'.format(i) for i in rng.randint(0, 300, size=5000)], dtype=object)
+    cluster_ids = rng.randint(0, 400, size=5000)
+    GroundTruthIndex.from_labels(names).save(str(tmp_path / 'index'))
+
+    index = GroundTruthIndex.load(str(tmp_path / 'index'))
+    assert isinstance(index.codes, np.memmap) and not index.codes.flags.writeable
+    assert set(index.classes.tolist()) == set(names.tolist())
+    assert index.evaluate(cluster_ids).stats == mm.confusion_matrix_values(names, cluster_ids)
+    batch = index.evaluate_batch([cluster_ids, cluster_ids[::-1]])
+    assert batch.stats['TP'][1] == mm.calculate_tp(names, cluster_ids[::-1])
+    assert mm.evaluate_batch(index, [cluster_ids]).stats['FP'][0] == mm.calculate_fp(names, cluster_ids)
+
+
+def test_shared_between_processes(tmp_path):
+    rng = np.random.RandomState(1)
+    true_ids = rng.randint(0, 50, size=2000)
+    GroundTruthIndex.from_labels(true_ids).save(str(tmp_path))
+    batch = [rng.randint(0, 60, size=2000) for _ in range(4)]
+    with ProcessPoolExecutor(max_workers=2) as executor:
+        results = list(executor.map(score_saved, [str(tmp_path)] * len(batch), batch))
+    assert results == [mm.confusion_matrix_values(true_ids, cluster_ids) for cluster_ids in batch]
+
+
+def test_invalid(tmp_path):
+    with pytest.raises(ValueError):
+        GroundTruthIndex.from_labels(np.array([1, 'a'], dtype=object)).save(str(tmp_path / 'mixed'))
+    GroundTruthIndex.from_labels([0, 1]).save(str(tmp_path))
+    (tmp_path / 'index.json').write_text('{"version": 0}')
+    with pytest.raises(ValueError):
+        GroundTruthIndex.load(str(tmp_path))
@@ -0,0 +1,48 @@
+import numpy as np
+import pytest
+from .context import Metrics, brute_force_stats, linkage_curve
+from pairwise.helpers import DATA_SET_A
+
+mm = Metrics(cache_size=0)
+
+
+def test_merges():
+    """
+    Test pairwise.hierarchy.linkage_curve() on a list of merges, level by level
+    """
+    true_ids = np.array([0, 0, 1, 1, 0])
+    # 5 = {0, 1}, 6 = {2, 3}, 7 = {0, 1, 4}, 8 = everything
+    merges = [(0, 1), (2, 3), (5, 4), (6, 7)]
+    levels = [np.arange(5), [5, 5, 2, 3, 4], [5, 5, 6, 6, 4], [7, 7, 6, 6, 7], [8, 8, 8, 8, 8]]
+    result = linkage_curve(merges, true_ids)
+    assert result.values.tolist() == [0, 1, 2, 3, 4]
+    for i, cluster_ids in enumerate(levels):
+        expected = brute_force_stats(true_ids, np.asarray(cluster_ids))
+        assert {key: result.report.stats[key][i] for key in expected} == expected
+
+
+@pytest.mark.parametrize("method", ['single', 'average', 'complete'])
+def test_scipy_linkage(method):
+    """
+    Stats at each threshold match scoring fcluster at that threshold
+    """
+    hierarchy = pytest.importorskip('scipy.cluster.hierarchy')
+    rng = np.random.RandomState(0)
+    true_ids = rng.randint(0, 8, size=150)
+    X = true_ids[:, None] + rng.normal(scale=0.6, size=(150, 2))
+    Z = hierarchy.linkage(X, method=method)
+
+    thresholds = np.quantile(Z[:, 2], [0.1, 0.5, 0.9, 0.99])
+    result = linkage_curve(Z, true_ids, thresholds=thresholds)
+    for i, t in enumerate(thresholds):
+        expected = mm.confusion_matrix_values(true_ids, hierarchy.fcluster(Z, t, criterion='distance'))
+        assert {key: result.report.stats[key][i] for key in expected} == expected
+
+    full = linkage_curve(Z, true_ids)
+    assert len(full.values) == len(true_ids)
+    assert full.report.fp[0] == 0 and full.report.fn[-1] == 0
+
+
+def test_too_many_merges():
+    with pytest.raises(ValueError):
+        linkage_curve([(0, 1), (2, 3)], DATA_SET_A['Y'][:2])
@@ -0,0 +1,49 @@
+import os
+import subprocess
+import sys
+import pytest
+
+# seconds allowed to import every module of pairwise, on top of NumPy
+IMPORT_BUDGET = 0.25
+
+HEAVY_MODULES = ('sklearn', 'scipy', 'pandas', 'pyarrow', 'matplotlib')
+
+SCRIPT = """
+import pkgutil, sys, time
+import numpy
+start = time.perf_counter()
+import pairwise
+for module in pkgutil.iter_modules(pairwise.__path__):
+    __import__('pairwise.' + module.name)
+print(time.perf_counter() - start)
+print(' '.join(sorted(set(name.split('.')[0] for name in sys.modules))))
+"""
+
+
+def import_package():
+    root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+    output = subprocess.check_output([sys.executable, '-c', SCRIPT], cwd=root, universal_newlines=True)
+    seconds, modules = output.strip().split('\n')
+    return float(seconds), set(modules.split())
+
+
+def test_no_heavy_imports():
+    """
+    Importing pairwise only requires NumPy
+    """
+    _, modules = import_package()
+    assert not modules.intersection(HEAVY_MODULES)
+
+
+def test_import_budget():
+    """
+    Importing pairwise stays within the time budget (best of a few runs, to be robust to a busy machine)
+    """
+    seconds = min(import_package()[0] for _ in range(3))
+    assert seconds < IMPORT_BUDGET, "importing pairwise took {:.3f}s".format(seconds)
+
+
+def test_missing_optional():
+    from pairwise.dependencies import import_optional
+    with pytest.raises(ImportError, match="pip install"):
+        import_optional('sklearn.not_a_module')
@@ -0,0 +1,87 @@
+import numpy as np
+from .context import LogReporter, Metrics, NULL_RECORDER, Recorder, sweep
+from .test_sweep import grid
+from pairwise.helpers import DATA_SET_A
+
+
+def test_disabled_by_default():
+    mm = Metrics()
+    assert mm.recorder is NULL_RECORDER and not mm.recorder.enabled
+    assert mm.confusion_matrix_values(DATA_SET_A['Y'], DATA_SET_A['YP']) == DATA_SET_A['stats']
+
+
+def test_evaluate_stages():
+    """
+    Each evaluation is reported once, with its stages and counters (nested contingency call folded in)
+    """
+    records = []
+    recorder = Recorder(reporters=[records.append])
+    mm = Metrics(recorder=recorder)
+    assert mm.evaluate(DATA_SET_A['Y'], DATA_SET_A['YP']).stats == DATA_SET_A['stats']
+    mm.evaluate(DATA_SET_A['Y'], DATA_SET_A['YP'])
+
+    assert [record['name'] for record in records] == ['evaluate', 'evaluate']
+    first, cached = records
+    assert set(first['stages']) == {'encode', 'contingency', 'finalize'}
+    assert first['counters'] == {'samples': 17, 'classes': 3, 'clusters': 3}
+    assert first['seconds'] >= sum(first['stages'].values())
+    assert cached['stages'] == {} and cached['counters'] == {'cache_hits': 1}
+
+    summary = recorder.summary()
+    assert summary['calls'] == {'evaluate': 2}
+    assert summary['counters'] == {'samples': 17, 'classes': 3, 'clusters': 3, 'cache_hits': 1}
+    recorder.reset()
+    assert recorder.summary()['calls'] == {}
+
+
+def test_batch_and_memory():
+    recorder = Recorder(trace_memory=True)
+    mm = Metrics(recorder=recorder)
+    rng = np.random.RandomState(0)
+    true_ids = rng.randint(0, 50, size=100000)
+    mm.evaluate_batch(true_ids, [true_ids, true_ids[::-1]])
+    assert recorder.calls == {'evaluate_batch': 1}
+    assert recorder.counters['labelings'] == 2
+    assert recorder.peak_bytes > 100000
+
+
+def test_memory_already_traced():
+    """
+    Peak allocation is that of the call, not of earlier allocations traced by someone else
+    """
+    import sys
+    import tracemalloc
+    records = []
+    mm = Metrics(cache_size=0, recorder=Recorder(reporters=[records.append], trace_memory=True))
+    tracemalloc.start()
+    try:
+        np.ones(10 ** 7).sum()  # 80 MB, freed before the call
+        mm.evaluate(DATA_SET_A['Y'], DATA_SET_A['YP'])
+        assert tracemalloc.is_tracing()
+    finally:
+        tracemalloc.stop()
+    if sys.version_info >= (3, 9):
+        assert records[0]['peak_bytes'] < 10 ** 6
+    else:
+        assert 'peak_bytes' not in records[0]
+
+
+def test_sweep_stages():
+    records = []
+    recorder = Recorder(reporters=[records.append])
+    rng = np.random.RandomState(0)
+    X = rng.rand(200, 2)
+    true_ids = grid(X, 0.5)
+    sweep(X, true_ids, [0.25, 0.5], cluster_fn=grid, n_jobs=1, recorder=recorder)
+    record, = records
+    assert record['name'] == 'sweep' and record['counters']['values'] == 2
+    assert set(record['stages']) == {'encode', 'cluster', 'score'}
+
+
+def test_log_reporter():
+    lines = []
+    reporter = LogReporter(write=lines.append, min_seconds=0.5)
+    reporter({'name': 'evaluate', 'seconds': 0.1, 'stages': {}, 'counters': {}})
+    reporter({'name': 'evaluate', 'seconds': 1.0, 'stages': {'encode': 0.25}, 'counters': {'clusters': 7},
+              'peak_bytes': 2 ** 20})
+    assert lines == ['[evaluate] 1.0000s encode=0.2500s clusters=7 peak=1.0MB']
@@ -0,0 +1,113 @@
+import numpy as np
+import pytest
+from .context import Metrics, evaluate_files, iter_column_chunks, iter_label_chunks
+from pairwise.io import rechunk
+
+mm = Metrics(cache_size=0)
+
+
+def labels(n=10000, seed=0):
+    rng = np.random.RandomState(seed)
+    true_ids = rng.randint(0, 80, size=n)
+    cluster_ids = np.where(rng.rand(n) < 0.7, true_ids, rng.randint(0, 100, size=n))
+    return true_ids, cluster_ids
+
+
+def test_rechunk():
+    chunks = [np.arange(5), np.arange(5, 6), np.arange(6, 13)]
+    assert [chunk.tolist() for chunk in rechunk(chunks, 4)] == [[0, 1, 2, 3], [4, 5, 6, 7], [8, 9, 10, 11], [12]]
+    assert list(rechunk([], 4)) == []
+
+
+def test_memmap(tmp_path):
+    """
+    .npy files are memory-mapped and read chunk by chunk
+    """
+    true_ids, cluster_ids = labels()
+    np.save(str(tmp_path / 'true.npy'), true_ids)
+    np.save(str(tmp_path / 'pred.npy'), cluster_ids)
+    chunks = list(iter_label_chunks(tmp_path / 'true.npy', chunk_size=3000))
+    assert [len(chunk) for chunk in chunks] == [3000, 3000, 3000, 1000]
+    expected = mm.confusion_matrix_values(true_ids, cluster_ids)
+    assert evaluate_files(str(tmp_path / 'true.npy'), str(tmp_path / 'pred.npy'), chunk_size=3000).stats == expected
+    memmap = np.load(str(tmp_path / 'pred.npy'), mmap_mode='r')
+    assert mm.evaluate_files(true_ids, memmap, chunk_size=777).stats == expected
+    # single-column sources have no column to select
+    for source in (tmp_path / 'pred.npy', memmap, cluster_ids):
+        with pytest.raises(ValueError):
+            iter_label_chunks(source, column='cluster')
+
+
+def test_parquet(tmp_path):
+    """
+    Parquet columns (with row groups unaligned with chunks, and string labels) agree with in-memory labels
+    """
+    pa = pytest.importorskip('pyarrow')
+    parquet = pytest.importorskip('pyarrow.parquet')
+    true_ids, cluster_ids = labels()
+    names = np.array(['id-{}'.format(i) for i in true_ids], dtype=object)
+    parquet.write_table(pa.table({'name': names, 'true': true_ids}), str(tmp_path / 'true.parquet'),
+                        row_group_size=1500)
+    parquet.write_table(pa.table({'cluster': cluster_ids}), str(tmp_path / 'pred.parquet'), row_group_size=4000)
+
+    expected = mm.confusion_matrix_values(true_ids, cluster_ids)
+    for column in ('true', 'name'):
+        report = evaluate_files(tmp_path / 'true.parquet', tmp_path / 'pred.parquet', chunk_size=2500,
+                                true_column=column)
+        assert report.stats == expected
+    with pytest.raises(ValueError):
+        list(iter_label_chunks(tmp_path / 'true.parquet'))
+
+
+def test_arrow(tmp_path):
+    pa = pytest.importorskip('pyarrow')
+    true_ids, cluster_ids = labels()
+    table = pa.table({'true': pa.array(true_ids).dictionary_encode(), 'cluster': cluster_ids})
+    with pa.OSFile(str(tmp_path / 'labels.arrow'), 'wb') as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            for batch in table.to_batches(max_chunksize=3333):
+                writer.write_batch(batch)
+
+    expected = mm.confusion_matrix_values(true_ids, cluster_ids)
+    path = tmp_path / 'labels.arrow'
+    assert evaluate_files(path, path, chunk_size=1000, true_column='true', pred_column='cluster').stats == expected
+    assert evaluate_files(table, table.column('cluster'), chunk_size=4096, true_column='true').stats == expected
+    with pytest.raises(ValueError):
+        list(iter_label_chunks(pa.array([1, None, 2])))
+    with pytest.raises(ValueError):
+        list(iter_label_chunks(table.column('cluster'), column='cluster'))
+
+
+def test_column_chunks(tmp_path):
+    """
+    Several columns are read together, in chunks covering the same rows
+    """
+    true_ids, cluster_ids = labels(n=1000)
+    with open(str(tmp_path / 'labels.csv'), 'w') as f:
+        f.write('true,cluster\n' + ''.join('{},{}\n'.format(*row) for row in zip(true_ids, cluster_ids)))
+    chunks = list(iter_column_chunks(tmp_path / 'labels.csv', ['cluster', 'true'], chunk_size=300))
+    assert [len(cluster) for cluster, _ in chunks] == [300, 300, 300, 100]
+    assert np.concatenate([cluster for cluster, _ in chunks]).astype(int).tolist() == cluster_ids.tolist()
+    assert np.concatenate([true for _, true in chunks]).astype(int).tolist() == true_ids.tolist()
+    with pytest.raises(ValueError):
+        iter_column_chunks(true_ids, ['true'])
+
+    pa = pytest.importorskip('pyarrow')
+    parquet = pytest.importorskip('pyarrow.parquet')
+    parquet.write_table(pa.table({'true': true_ids, 'cluster': cluster_ids}), str(tmp_path / 'labels.parquet'),
+                        row_group_size=450)
+    for cluster, true in iter_column_chunks(tmp_path / 'labels.parquet', ['cluster', 'true'], chunk_size=300):
+        assert len(cluster) == len(true)
+    columns = [np.concatenate(column) for column in zip(*iter_column_chunks(tmp_path / 'labels.parquet',
+                                                                            ['cluster', 'true'], chunk_size=300))]
+    assert columns[0].tolist() == cluster_ids.tolist() and columns[1].tolist() == true_ids.tolist()
+
+
+def test_misaligned():
+    true_ids, cluster_ids = labels(n=100)
+    with pytest.raises(ValueError):
+        evaluate_files(true_ids, cluster_ids[:90], chunk_size=30)
+    with pytest.raises(ValueError):
+        evaluate_files(true_ids[:90], cluster_ids, chunk_size=30)
+    with pytest.raises(ValueError):
+        iter_label_chunks('labels.txt')
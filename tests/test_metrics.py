@@ -1,5 +1,6 @@
+import numpy as np
 import pytest
-from .context import Metrics, nchoosek
+from .context import Metrics, count_pairs, nchoosek
 from pairwise.helpers import DATA_SET_A, DATA_SET_B, DATA_SET_C
 
 mm = Metrics()
@@ -68,3 +69,19 @@ def test_nchoosek(n, expected):
     :param expected:    result calculated and hard-coded for testing
     """
     assert nchoosek(n) == expected
+
+
+def test_nchoosek_exact():
+    """
+    Test nchoosek is exact for large n (i.e., no float division of factorials) and vectorized over arrays
+    """
+    n = 2 * 10 ** 6
+    assert nchoosek(n) == n * (n - 1) // 2
+    assert nchoosek(2 ** 40) == 2 ** 40 * (2 ** 40 - 1) // 2
+    assert nchoosek(np.array([0, 1, 2, 4, 10])).tolist() == [0, 0, 1, 6, 45]
+    # fewer items than chosen, as before exact arithmetic (i.e., no unsigned wrap-around of negative n)
+    assert nchoosek(-1) == nchoosek(-5) == 0
+    assert nchoosek(np.array([-3, 4])).tolist() == [0, 6]
+    assert count_pairs([-1]) == 0 and count_pairs([-3, 4]) == 6
+    assert nchoosek(np.array([2 ** 32 - 1]))[0] == (2 ** 32 - 1) * (2 ** 32 - 2) // 2
+    assert nchoosek(6, 3) == 20
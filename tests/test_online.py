@@ -0,0 +1,79 @@
+import numpy as np
+import pytest
+from .context import Metrics, OnlineEvaluator
+from pairwise.helpers import DATA_SET_A
+
+mm = Metrics(cache_size=0)
+
+
+def recount(evaluator, true_ids):
+    samples = sorted(evaluator._node_of_sample)
+    clusters = [evaluator.cluster_of(sample) for sample in samples]
+    return mm.confusion_matrix_values(np.asarray(true_ids)[samples], np.asarray(clusters))
+
+
+def test_from_labels():
+    evaluator = OnlineEvaluator.from_labels(DATA_SET_A['Y'], DATA_SET_A['YP'])
+    assert evaluator.pair_stats() == DATA_SET_A['stats']
+    assert evaluator.report().precision == pytest.approx(DATA_SET_A['P'], abs=1e-2)
+
+
+def test_random_updates():
+    """
+    Stats after every assign, move, merge, and remove equal a full recount of the current assignment
+    """
+    rng = np.random.RandomState(0)
+    true_ids = rng.randint(0, 8, size=200)
+    evaluator = OnlineEvaluator(true_ids)
+    for sample in range(100):
+        evaluator.assign(sample, int(rng.randint(0, 20)))
+    assert evaluator.pair_stats() == recount(evaluator, true_ids)
+
+    unassigned = list(range(100, 200))
+    for step in range(1000):
+        action = rng.randint(4)
+        assigned = sorted(evaluator._node_of_sample)
+        clusters = sorted(evaluator._node_of_cluster)
+        if action == 0 and unassigned:
+            evaluator.assign(unassigned.pop(), int(rng.randint(0, 30)))
+        elif action == 1:
+            evaluator.move(assigned[rng.randint(len(assigned))], int(rng.randint(0, 30)))
+        elif action == 2 and len(clusters) > 1:
+            a, b = rng.choice(clusters, size=2, replace=False).tolist()
+            size = evaluator.cluster_size(a) + evaluator.cluster_size(b)
+            evaluator.merge(a, b)
+            assert evaluator.cluster_size(a) == size
+            with pytest.raises(KeyError):
+                evaluator.cluster_size(b)
+        elif action == 3 and len(assigned) > 2:
+            sample = assigned[rng.randint(len(assigned))]
+            evaluator.remove(sample)
+            unassigned.append(sample)
+        assert evaluator.pair_stats() == recount(evaluator, true_ids), step
+
+
+def test_labels_given_on_assign():
+    evaluator = OnlineEvaluator()
+    for sample, (label, cluster) in enumerate(zip(DATA_SET_A['Y'].tolist(), DATA_SET_A['YP'].tolist())):
+        evaluator.assign('img{}'.format(sample), cluster, label=label)
+    assert evaluator.pair_stats() == DATA_SET_A['stats']
+    evaluator.move('img0', 'new')
+    assert evaluator.cluster_of('img0') == 'new' and evaluator.members('new') == {'img0'}
+    with pytest.raises(ValueError):
+        evaluator.assign('img1', 0, label=0)
+    with pytest.raises(ValueError):
+        evaluator.assign('img17', 0)
+
+
+def test_merge_keeps_name():
+    """
+    Merging a small cluster into a larger one keeps the name of the first cluster either way
+    """
+    evaluator = OnlineEvaluator([0, 0, 0, 1])
+    evaluator.assign(0, 'a')
+    for sample in (1, 2, 3):
+        evaluator.assign(sample, 'b')
+    evaluator.merge('a', 'b')
+    assert [evaluator.cluster_of(sample) for sample in range(4)] == ['a'] * 4
+    assert evaluator.pair_stats() == {'TP': 3, 'FP': 3, 'FN': 0, 'TN': 0}
+    assert len(evaluator) == 4 and 3 in evaluator
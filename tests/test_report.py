@@ -0,0 +1,133 @@
+import numpy as np
+import pytest
+from .context import Metrics, PairwiseReport
+from pairwise.helpers import DATA_SET_A
+from pairwise.metrics import fingerprint
+
+
+def test_report_metrics():
+    """
+    Test each metric of pairwise.report.PairwiseReport against expected values
+    """
+    report = Metrics().evaluate(DATA_SET_A['Y'], DATA_SET_A['YP'])
+    assert report.stats == DATA_SET_A['stats']
+    assert report.precision == DATA_SET_A['P']
+    assert report.recall == DATA_SET_A['R']
+    assert report.accuracy == DATA_SET_A['Acc']
+    assert report.specificity == DATA_SET_A['Specificity']
+    assert report.f1score == DATA_SET_A['F1']
+
+
+def test_undefined_metric():
+    """
+    Precision is NaN when no two samples share a cluster
+    """
+    report = PairwiseReport({'TP': 0, 'FP': 0, 'FN': 3, 'TN': 3})
+    assert np.isnan(report.precision)
+    assert report.recall == 0
+
+
+def test_memoized():
+    """
+    Repeated calls on identical content return the cached report
+    """
+    mm = Metrics(cache_size=2)
+    report = mm.evaluate(DATA_SET_A['Y'], DATA_SET_A['YP'])
+    assert mm.evaluate(DATA_SET_A['Y'].copy(), DATA_SET_A['YP'].copy()) is report
+    assert mm.precision(DATA_SET_A['Y'], DATA_SET_A['YP']) == DATA_SET_A['P']
+    assert len(mm._cache) == 1
+
+
+def test_lru_eviction():
+    mm = Metrics(cache_size=2)
+    y = DATA_SET_A['Y']
+    first = mm.evaluate(y, DATA_SET_A['YP'])
+    mm.evaluate(y, np.zeros_like(y))
+    mm.evaluate(y, y)
+    assert len(mm._cache) == 2
+    assert mm.evaluate(y, DATA_SET_A['YP']) is not first
+
+
+def test_memoized_memmap(tmp_path):
+    """
+    Read-only memmaps are keyed on identity (i.e., not read again to hash them), writable ones are not cached
+    """
+    np.save(str(tmp_path / 'true.npy'), DATA_SET_A['Y'])
+    np.save(str(tmp_path / 'pred.npy'), DATA_SET_A['YP'])
+    true_ids = np.load(str(tmp_path / 'true.npy'), mmap_mode='r')
+    cluster_ids = np.load(str(tmp_path / 'pred.npy'), mmap_mode='r')
+    assert fingerprint(true_ids) == ('id', id(true_ids))
+    mm = Metrics(cache_size=2)
+    report = mm.evaluate(true_ids, cluster_ids)
+    assert mm.evaluate(true_ids, cluster_ids) is report
+    assert mm.evaluate(true_ids, np.load(str(tmp_path / 'pred.npy'), mmap_mode='r')) is not report
+
+    writable = np.load(str(tmp_path / 'pred.npy'), mmap_mode='r+')
+    assert fingerprint(writable) is None
+    assert mm.evaluate(true_ids, writable) is not mm.evaluate(true_ids, writable)
+
+
+def test_memoized_readonly_view():
+    """
+    Read-only views are hashed, as their base may change between calls
+    """
+    base = np.array([0, 0, 1, 1, 2, 2])
+    view = base.view()
+    view.flags.writeable = False
+    cluster_ids = np.array([0, 0, 1, 1, 2, 2])
+    mm = Metrics(cache_size=2)
+    assert mm.confusion_matrix_values(view, cluster_ids) == {'TP': 3, 'FP': 0, 'FN': 0, 'TN': 12}
+    base[:] = range(6)
+    assert mm.confusion_matrix_values(view, cluster_ids) == {'TP': 0, 'FP': 3, 'FN': 0, 'TN': 12}
+
+
+def test_cache_disabled():
+    mm = Metrics(cache_size=0)
+    assert mm.evaluate(DATA_SET_A['Y'], DATA_SET_A['YP']) is not mm.evaluate(DATA_SET_A['Y'], DATA_SET_A['YP'])
+
+
+def test_fbeta():
+    """
+    F-5 of DATA_SET_A, and F-1 coinciding with f1score
+    """
+    mm = Metrics()
+    assert mm.fbeta_score(DATA_SET_A['Y'], DATA_SET_A['YP'], beta=5) == pytest.approx(DATA_SET_A['F5'], abs=1e-3)
+    assert mm.fbeta_score(DATA_SET_A['Y'], DATA_SET_A['YP']) == pytest.approx(DATA_SET_A['F1'])
+    assert mm.all_metrics(DATA_SET_A['Y'], DATA_SET_A['YP'], beta=5)['fbeta'] == pytest.approx(0.456, abs=1e-3)
+
+
+def test_jaccard():
+    mm = Metrics()
+    assert mm.jaccard(DATA_SET_A['Y'], DATA_SET_A['YP']) == 20 / 64
+
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_against_sklearn(seed):
+    """
+    Test ARI and Fowlkes-Mallows of pairwise.metrics.Metrics against scikit-learn
+    """
+    cluster = pytest.importorskip('sklearn.metrics.cluster')
+    rng = np.random.RandomState(seed)
+    true_ids = rng.randint(0, 6, size=400)
+    cluster_ids = np.where(rng.rand(400) < 0.7, true_ids, rng.randint(0, 9, size=400))
+    mm = Metrics()
+    assert mm.adjusted_rand_index(true_ids, cluster_ids) == pytest.approx(
+        cluster.adjusted_rand_score(true_ids, cluster_ids))
+    assert mm.fowlkes_mallows(true_ids, cluster_ids) == pytest.approx(
+        cluster.fowlkes_mallows_score(true_ids, cluster_ids))
+
+    report = mm.evaluate_batch(true_ids, [cluster_ids, true_ids])
+    assert report.adjusted_rand_index[0] == pytest.approx(cluster.adjusted_rand_score(true_ids, cluster_ids))
+    assert report.adjusted_rand_index[1] == 1.0
+
+
+def test_all_metrics():
+    """
+    Every metric of a report is derived from the same confusion stats
+    """
+    values = Metrics().all_metrics(DATA_SET_A['Y'], DATA_SET_A['YP'])
+    for key, expected in DATA_SET_A['stats'].items():
+        assert values[key] == expected
+    assert values['precision'] == DATA_SET_A['P']
+    assert values['accuracy'] == DATA_SET_A['RI']
+    assert set(PairwiseReport.metric_names) <= set(values)
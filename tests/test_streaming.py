@@ -0,0 +1,94 @@
+import numpy as np
+import pytest
+from .context import ContingencyAccumulator, Metrics, evaluate_chunks, evaluate_shards, merge_accumulators
+from pairwise.helpers import DATA_SET_A, LABEL_SET_2, CLUSTER_SET_2
+
+mm = Metrics(cache_size=0)
+
+
+def chunked(true_ids, cluster_ids, size):
+    for i in range(0, len(true_ids), size):
+        yield true_ids[i:i + size], cluster_ids[i:i + size]
+
+
+@pytest.mark.parametrize("size", [1, 4, 17])
+def test_chunks_match_metrics(size):
+    """
+    Test pairwise.streaming.evaluate_chunks() agrees with Metrics regardless of chunk size
+    """
+    report = evaluate_chunks(chunked(DATA_SET_A['Y'], DATA_SET_A['YP'], size))
+    assert report.stats == DATA_SET_A['stats']
+    report = evaluate_chunks(chunked(LABEL_SET_2, CLUSTER_SET_2, size))
+    assert report.stats == mm.confusion_matrix_values(LABEL_SET_2, CLUSTER_SET_2)
+
+
+def test_consolidation():
+    """
+    Small buffer forces the running state to be folded many times
+    """
+    rng = np.random.RandomState(0)
+    true_ids = rng.randint(0, 50, size=5000)
+    cluster_ids = np.array(['c{}'.format(c) for c in rng.randint(0, 80, size=5000)])
+    accumulator = ContingencyAccumulator(buffer_cells=16)
+    for true_chunk, pred_chunk in chunked(true_ids, cluster_ids, 333):
+        accumulator.update(true_chunk, pred_chunk)
+    assert accumulator.n_samples == 5000
+    assert accumulator.pair_stats() == mm.confusion_matrix_values(true_ids, cluster_ids)
+    assert accumulator.cells()[2].sum() == 5000
+
+
+def test_empty():
+    accumulator = ContingencyAccumulator()
+    accumulator.update([], [])
+    assert accumulator.pair_stats() == {'TP': 0, 'FP': 0, 'FN': 0, 'TN': 0}
+
+
+def random_shards(seed=0, n=3000, nshards=4):
+    rng = np.random.RandomState(seed)
+    true_ids = rng.randint(0, 40, size=n)
+    cluster_ids = rng.randint(-1, 60, size=n)
+    bounds = np.linspace(0, n, nshards + 1).astype(int)
+    shards = [(true_ids[a:b], cluster_ids[a:b]) for a, b in zip(bounds[:-1], bounds[1:])]
+    return true_ids, cluster_ids, shards
+
+
+def test_merge():
+    """
+    Test pairwise.streaming.ContingencyAccumulator.merge() recovers pairs that cross shards
+    """
+    true_ids, cluster_ids, shards = random_shards()
+    partials = [ContingencyAccumulator().update(*shard) for shard in shards]
+    expected = mm.confusion_matrix_values(true_ids, cluster_ids)
+    assert merge_accumulators(partials).pair_stats() == expected
+    assert merge_accumulators(partials[::-1]).pair_stats() == expected
+    assert (partials[0] + partials[1] + partials[2] + partials[3]).pair_stats() == expected
+
+
+def test_save_load(tmp_path):
+    true_ids, cluster_ids, shards = random_shards(seed=1)
+    for i, shard in enumerate(shards):
+        ContingencyAccumulator().update(*shard).save(str(tmp_path / 'part{}.npz'.format(i)))
+    partials = [ContingencyAccumulator.load(str(tmp_path / 'part{}.npz'.format(i))) for i in range(len(shards))]
+    merged = merge_accumulators(partials)
+    assert merged.n_samples == len(true_ids)
+    assert merged.pair_stats() == mm.confusion_matrix_values(true_ids, cluster_ids)
+
+
+def test_evaluate_shards():
+    true_ids, cluster_ids, shards = random_shards(seed=2)
+    report = evaluate_shards(shards, n_jobs=2)
+    assert report.stats == mm.confusion_matrix_values(true_ids, cluster_ids)
+
+
+def test_evaluate_shard_files(tmp_path):
+    """
+    Shards given as files, lazily and more of them than workers, are read by the workers themselves
+    """
+    true_ids, cluster_ids, shards = random_shards(seed=3)
+    for i, (true_shard, cluster_shard) in enumerate(shards):
+        np.save(str(tmp_path / 'true{}.npy'.format(i)), true_shard)
+        np.save(str(tmp_path / 'pred{}.npy'.format(i)), cluster_shard)
+    paths = ((str(tmp_path / 'true{}.npy'.format(i)), str(tmp_path / 'pred{}.npy'.format(i)))
+             for i in range(len(shards)))
+    report = evaluate_shards(paths, n_jobs=1, chunk_size=100)
+    assert report.stats == mm.confusion_matrix_values(true_ids, cluster_ids)
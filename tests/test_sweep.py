@@ -0,0 +1,79 @@
+import numpy as np
+import pytest
+from .context import Metrics, SweepResult, sweep, iter_sweep
+
+mm = Metrics(cache_size=0)
+
+
+def grid(X, width):
+    """
+    Toy clustering: bin samples along the first feature
+    """
+    return np.floor(X[:, 0] / width).astype(int)
+
+
+def toy_data(seed=0, n=300):
+    rng = np.random.RandomState(seed)
+    true_ids = rng.randint(0, 6, size=n)
+    X = (true_ids + rng.normal(scale=0.3, size=n))[:, None]
+    return X, true_ids
+
+
+@pytest.mark.parametrize("n_jobs", [1, 2])
+def test_sweep(n_jobs):
+    """
+    Test pairwise.sweep.sweep() scores each value as Metrics does
+    """
+    X, true_ids = toy_data()
+    values = [0.25, 0.5, 1.0, 2.0, 4.0]
+    result = sweep(X, true_ids, values[::-1], cluster_fn=grid, n_jobs=n_jobs)
+    assert result.values.tolist() == values
+    for i, width in enumerate(values):
+        expected = mm.confusion_matrix_values(true_ids, grid(X, width))
+        assert {key: result.report.stats[key][i] for key in expected} == expected
+
+    assert isinstance(result, SweepResult)
+    score, value = result.best('precision')
+    assert score == np.nanmax(result.report.precision)
+    assert result.report.precision[values.index(value)] == score
+
+
+def test_without_shared_memory(monkeypatch):
+    """
+    Without multiprocessing.shared_memory (Python < 3.8), workers get the arrays by value
+    """
+    import multiprocessing
+    import sys
+    from pairwise.sweep import _share
+    monkeypatch.setitem(sys.modules, 'multiprocessing.shared_memory', None)
+    monkeypatch.delattr(multiprocessing, 'shared_memory', raising=False)
+    X, true_ids = toy_data(seed=2)
+    assert _share(X)[0] is None
+    result = sweep(X, true_ids, [0.5, 2.0], cluster_fn=grid, n_jobs=2)
+    for i, width in enumerate([0.5, 2.0]):
+        expected = mm.confusion_matrix_values(true_ids, grid(X, width))
+        assert {key: result.report.stats[key][i] for key in expected} == expected
+
+
+def test_iter_sweep_streams():
+    X, true_ids = toy_data(seed=1)
+    seen = [value for value, _ in iter_sweep(X, true_ids, [0.5, 1.0, 2.0], cluster_fn=grid, n_jobs=2)]
+    assert sorted(seen) == [0.5, 1.0, 2.0]
+
+
+def test_dbscan_sweep():
+    pytest.importorskip('sklearn')
+    X, true_ids = toy_data(seed=2)
+    result = sweep(X, true_ids, [0.05, 0.2], n_jobs=1, min_samples=3)
+    assert len(result.report.precision) == 2
+
+
+def test_sweep_result_reexported():
+    import pairwise.sweep
+    assert pairwise.sweep.SweepResult is SweepResult
+
+
+def test_duplicate_values():
+    X, true_ids = toy_data()
+    with pytest.raises(ValueError):
+        sweep(X, true_ids, [0.5, 1.0, 2.0, 1.0], cluster_fn=grid, n_jobs=1)
@@ -0,0 +1,73 @@
+import numpy as np
+import pytest
+from .context import score_histograms, verification_curves
+
+
+def toy_data(seed=0, n=90):
+    rng = np.random.RandomState(seed)
+    labels = rng.randint(0, 9, size=n)
+    centers = rng.normal(size=(9, 16))
+    embeddings = centers[labels] + rng.normal(scale=0.8, size=(n, 16))
+    return labels, embeddings
+
+
+def brute_force(labels, scores, threshold):
+    i, j = np.triu_indices(len(labels), k=1)
+    genuine = labels[i] == labels[j]
+    accepted = scores[i, j] >= threshold
+    return np.sum(accepted & genuine), np.sum(accepted & ~genuine), np.sum(genuine), np.sum(~genuine)
+
+
+def test_histograms_count_every_pair():
+    labels, embeddings = toy_data()
+    _, genuine, impostor = score_histograms(labels, embeddings=embeddings, bins=64, block_size=7)
+    same = labels[:, None] == labels[None, :]
+    assert genuine.sum() == (same.sum() - len(labels)) // 2
+    assert genuine.sum() + impostor.sum() == len(labels) * (len(labels) - 1) // 2
+
+
+def test_curves_match_brute_force():
+    """
+    Test pairwise.verification.verification_curves() against thresholding every pair (at the bin edges)
+    """
+    rng = np.random.RandomState(1)
+    labels = rng.randint(0, 5, size=40)
+    # scores on a grid, such that no score falls ambiguously close to a bin edge
+    scores = np.round(rng.uniform(-1, 1, size=(40, 40)) * 8) / 8 + 1 / 32
+    curves = verification_curves(labels, scores=scores, bins=16, block_size=6)
+    for k, threshold in enumerate(curves.thresholds):
+        tp, fp, n_genuine, n_impostor = brute_force(labels, scores, threshold)
+        assert curves.tp[k] == tp and curves.fp[k] == fp
+        assert curves.tar[k] == tp / n_genuine and curves.far[k] == fp / n_impostor
+
+
+def test_embeddings_and_memmap_agree(tmp_path):
+    labels, embeddings = toy_data(seed=2)
+    normed = (embeddings / np.linalg.norm(embeddings, axis=1, keepdims=True)).astype(np.float32)
+    scores = np.lib.format.open_memmap(str(tmp_path / 'scores.npy'), mode='w+', dtype=np.float32,
+                                       shape=(len(labels), len(labels)))
+    scores[:] = normed @ normed.T
+    scores.flush()
+
+    a = verification_curves(labels, embeddings=embeddings, bins=128, block_size=16)
+    b = verification_curves(labels, scores=np.load(str(tmp_path / 'scores.npy'), mmap_mode='r'), bins=128,
+                            block_size=5)
+    assert np.array_equal(a.tp, b.tp) and np.array_equal(a.fp, b.fp)
+    assert 0.5 < a.auc() <= 1
+
+
+def test_tar_at_far():
+    labels, embeddings = toy_data(seed=3)
+    curves = verification_curves(labels, embeddings=embeddings, bins=256)
+    tar, thresholds = curves.tar_at_far([1e-2, 1e-1, 1.0])
+    assert np.all(np.diff(tar) >= 0)
+    assert tar[-1] == 1.0
+    for target, threshold in zip([1e-2, 1e-1], thresholds):
+        assert curves.far[curves.thresholds == threshold][0] <= target
+    far, tar = curves.roc()
+    assert np.all(np.diff(far) >= 0)
+
+
+def test_scores_or_embeddings():
+    with pytest.raises(ValueError):
+        score_histograms([0, 1])
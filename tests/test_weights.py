@@ -0,0 +1,81 @@
+import numpy as np
+import pytest
+from itertools import combinations
+from .context import Metrics, weighted_pair_stats
+from pairwise.helpers import DATA_SET_A
+
+mm = Metrics(cache_size=0)
+
+
+def brute_force_weighted(true_ids, cluster_ids, weights):
+    stats = {'TP': 0.0, 'FP': 0.0, 'FN': 0.0, 'TN': 0.0}
+    for i, j in combinations(range(len(true_ids)), 2):
+        same_class = true_ids[i] == true_ids[j]
+        if cluster_ids[i] == cluster_ids[j]:
+            stats['TP' if same_class else 'FP'] += weights[i] * weights[j]
+        else:
+            stats['FN' if same_class else 'TN'] += weights[i] * weights[j]
+    return stats
+
+
+def test_unit_weights():
+    """
+    Unit weights give the unweighted stats (exactly)
+    """
+    weights = np.ones(len(DATA_SET_A['Y']))
+    assert mm.confusion_matrix_values(DATA_SET_A['Y'], DATA_SET_A['YP'], sample_weight=weights) == DATA_SET_A['stats']
+
+
+@pytest.mark.parametrize("n_clusters", [5, 300])
+def test_matches_pairs(n_clusters):
+    """
+    Closed form (dense or sparse cells) equals summing the product of weights over every pair
+    """
+    rng = np.random.RandomState(n_clusters)
+    true_ids = rng.randint(0, 6, size=300)
+    cluster_ids = rng.randint(0, n_clusters, size=300)
+    weights = rng.rand(300) * 3
+    stats = mm.confusion_matrix_values(true_ids, cluster_ids, sample_weight=weights)
+    expected = brute_force_weighted(true_ids, cluster_ids, weights)
+    for key in expected:
+        assert stats[key] == pytest.approx(expected[key], rel=1e-9)
+
+
+def test_integer_weights_repeat_samples():
+    """
+    An integer weight acts as that many copies of the sample, but for pairs among copies of the same sample
+    """
+    true_ids, cluster_ids = DATA_SET_A['Y'], DATA_SET_A['YP']
+    weights = np.arange(len(true_ids)) % 3 + 1
+    stats = mm.confusion_matrix_values(true_ids, cluster_ids, sample_weight=weights)
+    repeated = mm.confusion_matrix_values(np.repeat(true_ids, weights), np.repeat(cluster_ids, weights))
+    copies = int(np.sum(weights * (weights - 1) // 2))
+    assert stats['TP'] == repeated['TP'] - copies
+    assert stats['FP'] == repeated['FP'] and stats['TN'] == repeated['TN'] and stats['FN'] == repeated['FN']
+
+
+def test_metrics_and_cache():
+    cached = Metrics()
+    true_ids, cluster_ids = DATA_SET_A['Y'], DATA_SET_A['YP']
+    weights = np.linspace(0.5, 2, len(true_ids))
+    weighted = cached.precision(true_ids, cluster_ids, sample_weight=weights)
+    assert cached.precision(true_ids, cluster_ids) == pytest.approx(DATA_SET_A['P'], abs=1e-2)
+    assert cached.precision(true_ids, cluster_ids, sample_weight=weights) == weighted != cached.precision(true_ids,
+                                                                                                          cluster_ids)
+    scores = cached.all_metrics(true_ids, cluster_ids, sample_weight=weights)
+    assert scores['precision'] == weighted and -1 <= scores['adjusted_rand_index'] <= 1
+    # zero weight drops a sample
+    weights = np.ones(len(true_ids))
+    weights[0] = 0
+    assert cached.confusion_matrix_values(true_ids, cluster_ids, sample_weight=weights) == \
+        mm.confusion_matrix_values(true_ids[1:], cluster_ids[1:])
+
+
+def test_invalid_weights():
+    codes = np.zeros(3, dtype=np.int64)
+    with pytest.raises(ValueError):
+        weighted_pair_stats(codes, codes, 1, 1, [1.0, 2.0])
+    with pytest.raises(ValueError):
+        weighted_pair_stats(codes, codes, 1, 1, [1.0, -1.0, 1.0])
+    with pytest.raises(ValueError, match='differ in shape'):
+        mm.confusion_matrix_values([0, 1, 1], [0, 1], sample_weight=[1, 1, 1])